@@ -0,0 +1,123 @@
+"""
+BrainHealth AI - Chat Answer Cache
+Answers to recently asked questions, keyed by a normalized form of the question
+
+"What are the symptoms of a stroke?", "stroke symptoms" and "Symptoms of
+strokes??" all normalize to the same key: lowercase words, punctuation and
+stopwords dropped, light stemming (as in the FAQ analyzer), then sorted and
+de-duplicated. Unlike the FAQ analyzer, the key keeps negations ("no signs of
+stroke" is not "signs of stroke") and the stopwords the intent rules key on. Entries are evicted least-recently-used beyond `max_entries` or
+`max_bytes` of answer text, and expire after `ttl` seconds.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from faq_retrieval import STOPWORDS, stem
+
+# Words (and "n't" contractions) that turn a question around, all keyed as "not"
+NEGATIONS = frozenset("""
+no not nor never none nothing without cannot cant dont doesnt didnt isnt arent wasnt wont
+""".split())
+# Words the intent rules key on (help: emergency, who: risk factors)
+RULE_WORDS = frozenset("help who".split())
+CACHE_STOPWORDS = STOPWORDS - NEGATIONS - RULE_WORDS
+QUESTION_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'t)?")
+
+
+def normalize_question(text: str) -> str:
+    words = set()
+    for word in QUESTION_WORD_PATTERN.findall(text.lower().replace('\u2019', "'")):
+        if word in NEGATIONS or word.endswith("n't"):
+            words.add("not")
+        elif word not in CACHE_STOPWORDS:
+            words.add(stem(word))
+    return " ".join(sorted(words))
+
+
+class AnswerCache:
+    """LRU + TTL cache of (answer, source) by normalized question, with hit-rate counters"""
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 8 * 1024 ** 2, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (answer, source, size, stored_at)
+        self._entries: "OrderedDict[str, Tuple[str, str, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.hits_by_source: Dict[str, int] = {}
+
+    def get(self, question: str, sources: Optional[Iterable[str]] = None) -> Optional[Tuple[str, str]]:
+        """(answer, source) for an equivalent question, optionally only from the given sources"""
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is not None and now - entry[3] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None or (sources is not None and entry[1] not in sources):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.hits_by_source[entry[1]] = self.hits_by_source.get(entry[1], 0) + 1
+            return entry[0], entry[1]
+
+    def put(self, question: str, answer: str, source: str):
+        key = normalize_question(question)
+        if not key:
+            return
+        size = len(answer.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (answer, source, size, time.time())
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key: str):
+        self.bytes -= self._entries.pop(key)[2]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "hits_by_source": dict(self.hits_by_source),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def prometheus(self, name: str) -> str:
+        """Text exposition lines: hit/miss counters and current size"""
+        return (
+            f"# TYPE {name}_hits_total counter\n{name}_hits_total {self.hits}\n"
+            f"# TYPE {name}_misses_total counter\n{name}_misses_total {self.misses}\n"
+            f"# TYPE {name}_entries gauge\n{name}_entries {len(self._entries)}\n"
+            f"# TYPE {name}_bytes gauge\n{name}_bytes {self.bytes}\n"
+        )
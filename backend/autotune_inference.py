@@ -0,0 +1,199 @@
+"""
+Autotune CPU inference for the stroke model on this machine
+Benchmarks stroke_cnn_model.h5 across TensorFlow thread pool sizes, XLA on/off
+and batch sizes, then writes the fastest profile to models/inference_profile.json
+which load_stroke_detection_model applies at startup. TensorFlow's own default
+(intra=0 inter=0: pools sized by TensorFlow, no XLA) is always measured and is
+the baseline the result is reported against.
+
+Thread pools can only be set before TensorFlow initializes, so every
+configuration is measured in a fresh subprocess.
+
+Usage: python autotune_inference.py [--quick] [--output PATH]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from inference_profile import cpu_limit
+
+MODEL_PATH = 'models/stroke_cnn_model.h5'
+OUTPUT_PATH = 'models/inference_profile.json'
+INPUT_SHAPE = (128, 128, 1)
+BATCH_SIZES = (1, 2, 4, 8, 16, 32)
+# A batch size within this fraction of the best throughput is preferred if smaller
+THROUGHPUT_TOLERANCE = 0.95
+
+
+def benchmark_worker(args):
+    """Measure one thread/XLA configuration across batch sizes, print a JSON result"""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(args.intra)
+    tf.config.threading.set_inter_op_parallelism_threads(args.inter)
+    from tensorflow import keras
+
+    model = keras.models.load_model(MODEL_PATH)
+    if args.xla:
+        model.jit_compile = True
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for batch_size in args.batch_sizes:
+        batch = rng.random((batch_size,) + INPUT_SHAPE, dtype=np.float32)
+        # Warm-up builds (and for XLA compiles) the predict function for this shape
+        for _ in range(3):
+            model.predict(batch, batch_size=batch_size, verbose=0)
+
+        timings = []
+        deadline = time.perf_counter() + args.seconds
+        while len(timings) < 5 or (time.perf_counter() < deadline and len(timings) < 500):
+            start = time.perf_counter()
+            model.predict(batch, batch_size=batch_size, verbose=0)
+            timings.append(time.perf_counter() - start)
+
+        timings = np.array(timings) * 1000
+        p50 = float(np.percentile(timings, 50))
+        results[batch_size] = {
+            "latency_ms_p50": round(p50, 3),
+            "latency_ms_p95": round(float(np.percentile(timings, 95)), 3),
+            "throughput_ips": round(batch_size / p50 * 1000, 1),
+        }
+    print("RESULT " + json.dumps(results))
+
+
+def run_config(intra, inter, xla, args):
+    command = [
+        sys.executable, os.path.abspath(__file__), '--worker',
+        '--intra', str(intra), '--inter', str(inter),
+        '--seconds', str(args.seconds),
+        '--batch-sizes', ','.join(str(b) for b in args.batch_sizes),
+    ]
+    if xla:
+        command.append('--xla')
+    env = {**os.environ, 'TF_CPP_MIN_LOG_LEVEL': '2'}
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, timeout=600, env=env)
+    except subprocess.TimeoutExpired:
+        print("   ⏱️ timed out")
+        return None
+    for line in output.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return {int(k): v for k, v in json.loads(line[len('RESULT '):]).items()}
+    print(f"   ❌ failed: {output.stderr.strip().splitlines()[-1] if output.stderr.strip() else 'no output'}")
+    return None
+
+
+def best_batch_size(results):
+    """Smallest batch size that gets (nearly) the best per-image throughput"""
+    best = max(r["throughput_ips"] for r in results.values())
+    return min(b for b, r in results.items() if r["throughput_ips"] >= best * THROUGHPUT_TOLERANCE)
+
+
+def describe_threads(intra, inter):
+    return "TF default threads" if (intra, inter) == (0, 0) else f"intra={intra} inter={inter}"
+
+
+def thread_candidates(cpus):
+    return sorted({1, 2, 4, 8, 16, cpus} & set(range(1, cpus + 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--quick', action='store_true', help='fewer configurations, shorter runs')
+    parser.add_argument('--seconds', type=float, default=2.0, help='measurement time per batch size')
+    parser.add_argument('--batch-sizes', default=','.join(str(b) for b in BATCH_SIZES))
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--intra', type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument('--inter', type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument('--xla', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+
+    if args.worker:
+        benchmark_worker(args)
+        return
+
+    if not os.path.exists(MODEL_PATH):
+        print(f"❌ Model not found: {MODEL_PATH} (train it first)")
+        sys.exit(1)
+
+    cpus = cpu_limit()
+    intra_options = thread_candidates(cpus)
+    inter_options = [1, 2] if cpus > 1 else [1]
+    if args.quick:
+        args.seconds = min(args.seconds, 0.5)
+        intra_options = sorted({1, cpus})
+        inter_options = [1]
+
+    print("=" * 60)
+    print("STROKE MODEL - CPU INFERENCE AUTOTUNE")
+    print("=" * 60)
+    print(f"CPUs available: {cpus}")
+
+    # (0, 0) leaves both pools to TensorFlow, as a server without a profile runs
+    thread_configs = [(0, 0)] + list(itertools.product(intra_options, inter_options))
+    measurements = []
+    for (intra, inter), xla in itertools.product(thread_configs, (False, True)):
+        print(f"\n⚙️ {describe_threads(intra, inter)} xla={'on' if xla else 'off'}")
+        results = run_config(intra, inter, xla, args)
+        if results is None:
+            continue
+        for batch_size, r in sorted(results.items()):
+            print(f"   batch {batch_size:>3}: p50 {r['latency_ms_p50']:8.2f} ms  "
+                  f"p95 {r['latency_ms_p95']:8.2f} ms  {r['throughput_ips']:8.1f} img/s")
+        measurements.append({"intra": intra, "inter": inter, "xla": xla, "results": results})
+
+    if not measurements:
+        print("\n❌ No configuration could be benchmarked")
+        sys.exit(1)
+
+    # Requests are scored one scan at a time, so single-scan latency picks the configuration;
+    # the batch size then applies to batched work (robust TTA / MC-dropout passes)
+    single = min(args.batch_sizes)
+    best = min(measurements, key=lambda m: m["results"][single]["latency_ms_p50"])
+    batch_size = best_batch_size(best["results"])
+    baseline = next(
+        (m for m in measurements if m["intra"] == 0 and m["inter"] == 0 and not m["xla"]),
+        None
+    )
+
+    profile = {
+        "intra_op_threads": best["intra"],
+        "inter_op_threads": best["inter"],
+        "jit_compile": best["xla"],
+        "batch_size": batch_size,
+        "latency_ms_p50": best["results"][single]["latency_ms_p50"],
+        "throughput_ips": best["results"][batch_size]["throughput_ips"],
+        "baseline_latency_ms_p50": baseline["results"][single]["latency_ms_p50"] if baseline else None,
+        "cpu_limit": cpus,
+        "model": MODEL_PATH,
+        "tuned_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+    print("\n" + "=" * 60)
+    print(f"✅ Best: {describe_threads(best['intra'], best['inter'])} "
+          f"xla={'on' if profile['jit_compile'] else 'off'} batch={batch_size}")
+    print(f"Single-scan latency: {profile['latency_ms_p50']} ms (p50)")
+    if baseline is not None:
+        speedup = profile['baseline_latency_ms_p50'] / max(profile['latency_ms_p50'], 1e-9)
+        print(f"TF default (intra=0 inter=0, no XLA): {profile['baseline_latency_ms_p50']} ms (p50), "
+              f"{speedup:.2f}x speedup")
+    else:
+        print("⚠️ TF default configuration failed, no baseline to compare with")
+    print(f"Saved to: {args.output}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
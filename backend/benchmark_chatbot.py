@@ -0,0 +1,154 @@
+"""
+Benchmark the HuggingFace chatbot in fp32 and dynamically quantized int8
+Reports load time, resident memory added by the model, weight size, and
+generation latency for single prompts and for a full micro-batch
+
+Each variant runs in a fresh subprocess so its memory is measured on a clean
+process (allocator caches from the other variant would distort RSS).
+
+Usage: python benchmark_chatbot.py [--model NAME] [--runs 5] [--batch 8] [--max-new-tokens 60]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from chat_model import DEFAULT_CHATBOT_MODEL
+
+PROMPTS = [
+    "What are the warning signs of a stroke?",
+    "How can I lower my blood pressure naturally?",
+    "I feel tired all the time since my stroke.",
+    "Is it safe to exercise after a stroke?",
+    "What foods are good for brain health?",
+    "My father has trouble speaking, what can we do?",
+    "How long does rehabilitation usually take?",
+    "Can stress cause a stroke?",
+]
+
+
+def benchmark_worker(args):
+    """Measure one variant, print a JSON result"""
+    import torch
+
+    from chat_generation import generate_replies
+    from chat_model import load_chat_model
+    from procmem import memory_summary
+
+    torch.manual_seed(0)
+    before = memory_summary()
+    start = time.perf_counter()
+    chat = load_chat_model(args.model, quantize=args.quantize)
+    load_seconds = time.perf_counter() - start
+    after = memory_summary()
+
+    state = chat.model.state_dict()
+    weight_bytes = sum(v.numel() * v.element_size() for v in state.values() if torch.is_tensor(v))
+    # Quantized linear layers keep packed int8 weights outside state_dict tensors
+    weight_bytes += sum(
+        w.numel() * w.element_size()
+        for m in chat.model.modules()
+        if hasattr(m, '_packed_params') and callable(getattr(m, 'weight', None))
+        for w in [m.weight()]
+    )
+
+    def timed(prompts):
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            generate_replies(chat.tokenizer, chat.model, prompts, args.max_new_tokens)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    # Warm-up (first call allocates buffers and, for int8, packs weights)
+    generate_replies(chat.tokenizer, chat.model, PROMPTS[:1], args.max_new_tokens)
+    single = timed(PROMPTS[:1])
+    batch_prompts = (PROMPTS * (args.batch // len(PROMPTS) + 1))[:args.batch]
+    batch = timed(batch_prompts)
+    sample = generate_replies(chat.tokenizer, chat.model, PROMPTS[:1], args.max_new_tokens)[0]
+
+    print("RESULT " + json.dumps({
+        "load_seconds": round(load_seconds, 2),
+        "rss_added_mb": round(after["rss_mb"] - before["rss_mb"], 1) if before and after else None,
+        "weights_mb": round(weight_bytes / 1024 ** 2, 1),
+        "single_ms_p50": round(float(np.percentile(single, 50)), 1),
+        "batch_ms_p50": round(float(np.percentile(batch, 50)), 1),
+        "batch_per_prompt_ms": round(float(np.percentile(batch, 50)) / args.batch, 1),
+        "sample_reply": sample,
+    }))
+
+
+def run_variant(quantize: bool, args):
+    command = [
+        sys.executable, os.path.abspath(__file__), '--worker',
+        '--model', args.model, '--runs', str(args.runs),
+        '--batch', str(args.batch), '--max-new-tokens', str(args.max_new_tokens),
+    ]
+    if quantize:
+        command.append('--quantize')
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, timeout=1800)
+    except subprocess.TimeoutExpired:
+        print("   ⏱️ timed out")
+        return None
+    for line in output.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+    print(f"   ❌ failed: {output.stderr.strip().splitlines()[-1] if output.stderr.strip() else 'no output'}")
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.getenv('CHATBOT_MODEL', DEFAULT_CHATBOT_MODEL))
+    parser.add_argument('--runs', type=int, default=5, help='timed generations per measurement')
+    parser.add_argument('--batch', type=int, default=8, help='prompts per batched generate() call')
+    parser.add_argument('--max-new-tokens', type=int, default=60)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--quantize', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        benchmark_worker(args)
+        return
+
+    print("=" * 60)
+    print("CHATBOT - FP32 VS INT8 (DYNAMIC QUANTIZATION) BENCHMARK")
+    print("=" * 60)
+    print(f"Model: {args.model}")
+
+    results = {}
+    for name, quantize in (("fp32", False), ("int8", True)):
+        print(f"\n⚙️ {name}")
+        result = run_variant(quantize, args)
+        if result is None:
+            continue
+        results[name] = result
+        print(f"   load:          {result['load_seconds']:8.2f} s")
+        print(f"   RSS added:     {result['rss_added_mb']} MB")
+        print(f"   weights:       {result['weights_mb']:8.1f} MB")
+        print(f"   1 prompt:      {result['single_ms_p50']:8.1f} ms (p50)")
+        print(f"   {args.batch} prompts:     {result['batch_ms_p50']:8.1f} ms (p50, "
+              f"{result['batch_per_prompt_ms']} ms/prompt)")
+        print(f"   sample reply:  {result['sample_reply']!r}")
+
+    if len(results) == 2:
+        fp32, int8 = results["fp32"], results["int8"]
+        print("\n" + "=" * 60)
+        if fp32["rss_added_mb"] and int8["rss_added_mb"]:
+            print(f"Memory: {fp32['rss_added_mb']} MB -> {int8['rss_added_mb']} MB "
+                  f"({fp32['rss_added_mb'] / int8['rss_added_mb']:.1f}x smaller)")
+        print(f"Single-prompt latency: {fp32['single_ms_p50']} ms -> {int8['single_ms_p50']} ms "
+              f"({fp32['single_ms_p50'] / int8['single_ms_p50']:.1f}x)")
+        print(f"Batched latency: {fp32['batch_ms_p50']} ms -> {int8['batch_ms_p50']} ms "
+              f"({fp32['batch_ms_p50'] / int8['batch_ms_p50']:.1f}x)")
+        print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
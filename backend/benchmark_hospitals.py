@@ -0,0 +1,111 @@
+"""
+Benchmark nearby-hospital queries on a synthetic facility set
+Facilities are clustered around random "cities" (like real OSM data); the grid
+index is compared with a brute-force haversine over every facility, and every
+query's results are checked against the brute-force answer
+
+Usage: python benchmark_hospitals.py [--facilities 300000] [--queries 500] [--index models/hospitals.npz]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from hospital_index import save_facilities, HospitalIndex, haversine_km, FLAG_HOSPITAL, FLAG_NEUROLOGY
+
+
+def synthetic_facilities(count: int, cities: int = 2000, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    centers_lat = rng.uniform(-55, 65, cities)
+    centers_lon = rng.uniform(-180, 180, cities)
+    # City sizes are heavy-tailed: a few metropolises hold most facilities
+    weights = rng.pareto(1.2, cities) + 1
+    city = rng.choice(cities, count, p=weights / weights.sum())
+    lats = np.clip(centers_lat[city] + rng.normal(0, 0.15, count), -89.9, 89.9)
+    lons = (centers_lon[city] + rng.normal(0, 0.15, count) + 180) % 360 - 180
+    neurology = rng.random(count) < 0.05
+    return [
+        {"lat": float(lat), "lon": float(lon), "name": f"Facility {i}",
+         "flags": FLAG_HOSPITAL | (FLAG_NEUROLOGY if neuro else 0)}
+        for i, (lat, lon, neuro) in enumerate(zip(lats, lons, neurology))
+    ], (centers_lat, centers_lon, weights)
+
+
+def timed(function, queries):
+    timings = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(function(*query))
+        timings.append((time.perf_counter() - start) * 1000)
+    return results, timings
+
+
+def report(label: str, timings):
+    print(f"   {label:<28} p50 {np.percentile(timings, 50):7.3f} ms   p99 {np.percentile(timings, 99):7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--facilities', type=int, default=300000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--index', help='benchmark an existing index instead of synthetic data')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("NEARBY HOSPITALS - GRID INDEX VS BRUTE FORCE")
+    print("=" * 60)
+
+    rng = np.random.default_rng(7)
+    if args.index:
+        index = HospitalIndex(args.index)
+        picks = rng.choice(index.count, args.queries)
+        query_lats = index.lat[picks] + rng.normal(0, 0.05, args.queries)
+        query_lons = index.lon[picks] + rng.normal(0, 0.05, args.queries)
+    else:
+        facilities, (centers_lat, centers_lon, weights) = synthetic_facilities(args.facilities)
+        path = os.path.join(tempfile.mkdtemp(), 'hospitals.npz')
+        save_facilities(path, facilities)
+        index = HospitalIndex(path)
+        # Users live where the facilities are
+        city = rng.choice(len(centers_lat), args.queries, p=weights / weights.sum())
+        query_lats = centers_lat[city] + rng.normal(0, 0.1, args.queries)
+        query_lons = centers_lon[city] + rng.normal(0, 0.1, args.queries)
+    print(f"Facilities: {index.count}, queries: {args.queries}")
+
+    def brute_force(lat, lon, radius, k, flags):
+        distances = haversine_km(lat, lon, index.lat, index.lon)
+        rows = np.flatnonzero((distances <= radius) & ((index.flags & flags) == flags))
+        return rows[np.argsort(distances[rows], kind='stable')][:k]
+
+    cases = [
+        ("radius 10 km, k=20", 10, 20, 0),
+        ("radius 50 km, k=20", 50, 20, 0),
+        ("20 nearest, any distance", None, 20, 0),
+        ("5 nearest neurology", None, 5, FLAG_NEUROLOGY),
+    ]
+    for label, radius, k, flags in cases:
+        queries = [(lat, lon) for lat, lon in zip(query_lats, query_lons)]
+        if radius is None:
+            indexed, index_ms = timed(lambda lat, lon: index.nearest(lat, lon, k, flags)[0], queries)
+            # The farthest of the k nearest bounds the brute-force search
+            limits = [index.distances(lat, lon, rows).max() if len(rows) else np.inf
+                      for (lat, lon), rows in zip(queries, indexed)]
+            brute, brute_ms = timed(lambda lat, lon, limit: brute_force(lat, lon, limit, k, flags),
+                                    [(lat, lon, limit) for (lat, lon), limit in zip(queries, limits)])
+        else:
+            indexed, index_ms = timed(lambda lat, lon: index.within(lat, lon, radius, k, flags)[0], queries)
+            brute, brute_ms = timed(lambda lat, lon: brute_force(lat, lon, radius, k, flags), queries)
+        mismatches = sum(set(a.tolist()) != set(b.tolist()) for a, b in zip(indexed, brute))
+        print(f"\n📍 {label} ({np.mean([len(r) for r in indexed]):.1f} results on average)")
+        report("grid index", index_ms)
+        report("brute force", brute_ms)
+        print(f"   speed-up {np.percentile(brute_ms, 50) / np.percentile(index_ms, 50):.0f}x, "
+              f"mismatches: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
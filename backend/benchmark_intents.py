@@ -0,0 +1,125 @@
+"""
+Benchmark the compiled intent matcher against the original if/elif chain
+Reports per-message matching time and the messages where the two disagree
+(mostly substring mis-fires of the old chain, e.g. "hi" inside "this")
+
+Usage: python benchmark_intents.py [iterations]
+"""
+
+import sys
+import time
+
+from intent_matcher import IntentMatcher
+
+# Keyword lists of the original get_rule_based_response, in branch order
+LEGACY_CHAIN = [
+    ("greeting", ['hello', 'hi', 'hey', 'greetings']),
+    ("symptoms", ['symptom', 'symptoms', 'signs', 'warning']),
+    ("prevention", ['prevent', 'prevention', 'avoid', 'reduce risk']),
+    ("types", ['type', 'types', 'kind', 'ischemic', 'hemorrhagic']),
+    ("risk_factors", ['risk', 'factor', 'causes', 'who']),
+    ("treatment", ['treatment', 'treat', 'cure', 'therapy', 'recover']),
+    ("diet", ['diet', 'food', 'eat', 'nutrition']),
+    ("recovery", ['recovery', 'recover', 'rehabilitation', 'after stroke']),
+    ("emergency", ['emergency', '108', '112', 'urgent', 'help']),
+    ("brain_health", ['brain', 'memory', 'cognition', 'mental']),
+]
+
+MESSAGES = [
+    "hello",
+    "What are the symptoms of a stroke?",
+    "How can I prevent a stroke?",
+    "which foods are good for the brain",
+    "Is this headache something to worry about?",
+    "what kinds of stroke are there",
+    "tell me about ischemic stroke",
+    "who is at risk of stroke",
+    "how is a stroke treated in hospital",
+    "what should I eat to lower my blood pressure",
+    "how long does recovery take after a stroke",
+    "my father cannot speak properly, what should I do, this is urgent",
+    "ways to keep my memory sharp",
+    "Thanks, that was helpful",
+    "can stroke be cured completely",
+    "what is the success rate of rehabilitation",
+    "does smoking cause strokes",
+    "what is a TIA",
+    "I think my mother is having a stroke right now",
+    "which exercises help my brain",
+]
+
+
+def legacy_intent(message: str):
+    message_lower = message.lower()
+    for name, words in LEGACY_CHAIN:
+        if any(word in message_lower for word in words):
+            return name
+    return None
+
+
+def time_per_message(match, messages, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message in messages:
+            match(message)
+    return (time.perf_counter() - start) / (iterations * len(messages)) * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    start = time.perf_counter()
+    matcher = IntentMatcher.from_file('data/intents.json')
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    print("=" * 60)
+    print("RULE-BASED CHATBOT - INTENT MATCHING BENCHMARK")
+    print("=" * 60)
+    print(f"Compile time: {compile_ms:.2f} ms")
+
+    legacy_us = time_per_message(legacy_intent, MESSAGES, iterations)
+    compiled_us = time_per_message(matcher.match, MESSAGES, iterations)
+    print(f"\nif/elif chain:    {legacy_us:7.2f} µs/message")
+    print(f"Compiled matcher: {compiled_us:7.2f} µs/message  ({legacy_us / compiled_us:.1f}x)")
+
+    # Long messages: the chain rescans the whole text for every keyword
+    long_messages = [" ".join(MESSAGES)[::-1] + " " + message for message in MESSAGES]
+    legacy_long = time_per_message(legacy_intent, long_messages, max(iterations // 10, 1))
+    compiled_long = time_per_message(matcher.match, long_messages, max(iterations // 10, 1))
+    print(f"\nLong messages ({len(long_messages[0])} chars):")
+    print(f"if/elif chain:    {legacy_long:7.2f} µs/message")
+    print(f"Compiled matcher: {compiled_long:7.2f} µs/message  ({legacy_long / compiled_long:.1f}x)")
+
+    # Scaling: a table ten times larger (e.g. once more topics are added)
+    scaled_chain = LEGACY_CHAIN + [
+        (f"topic_{n}", [f"{word}{n}" for word in ('alpha', 'beta', 'gamma', 'delta')])
+        for n in range(len(LEGACY_CHAIN) * 9)
+    ]
+    scaled_matcher = IntentMatcher(
+        [{"name": name, "keywords": words, "response": name} for name, words in scaled_chain], ""
+    )
+
+    def scaled_legacy(message):
+        message_lower = message.lower()
+        for name, words in scaled_chain:
+            if any(word in message_lower for word in words):
+                return name
+        return None
+
+    unmatched = [message for message in MESSAGES if legacy_intent(message) is None] or MESSAGES
+    legacy_scaled = time_per_message(scaled_legacy, unmatched, iterations)
+    compiled_scaled = time_per_message(scaled_matcher.match, unmatched, iterations)
+    print(f"\n{len(scaled_chain)} intents / {sum(len(w) for _, w in scaled_chain)} keywords, no-match messages:")
+    print(f"if/elif chain:    {legacy_scaled:7.2f} µs/message")
+    print(f"Compiled matcher: {compiled_scaled:7.2f} µs/message  ({legacy_scaled / compiled_scaled:.1f}x)")
+
+    print("\nDisagreements (old -> new):")
+    for message in MESSAGES:
+        old, new = legacy_intent(message), matcher.match(message)
+        if old != new:
+            print(f"  {message!r}: {old} -> {new}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
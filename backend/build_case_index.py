@@ -0,0 +1,99 @@
+"""
+Build the similar-case retrieval index
+Runs every scan in training_data through the stroke model's penultimate layer,
+writes the embeddings as a memory-mapped float16 matrix and builds an IVF
+index over them (see case_index.py)
+
+Usage: python build_case_index.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+from tensorflow import keras
+
+from case_index import save_index, CaseIndex
+from result_store import model_fingerprint
+
+TRAIN_DATA_DIR = 'training_data'
+MODEL_PATH = 'models/stroke_cnn_model.h5'
+INDEX_DIR = 'models/case_index'
+IMG_SIZE = (128, 128)
+BATCH_SIZE = 64
+
+print("=" * 60)
+print("SIMILAR CASE INDEX - BUILD")
+print("=" * 60)
+
+if not os.path.exists(MODEL_PATH):
+    print(f"❌ Model not found: {MODEL_PATH}")
+    sys.exit(1)
+
+model = keras.models.load_model(MODEL_PATH)
+# Penultimate layer = the input of the final sigmoid Dense layer
+embedding_model = keras.Model(inputs=model.input, outputs=model.layers[-1].input)
+print(f"✅ Model loaded, embedding dimension: {embedding_model.output_shape[-1]}")
+
+paths = []
+labels = []
+embeddings = []
+batch = []
+
+
+def flush_batch():
+    if batch:
+        embeddings.append(embedding_model.predict(np.stack(batch), verbose=0))
+    batch.clear()
+
+
+start = time.time()
+for class_name in sorted(os.listdir(TRAIN_DATA_DIR)):
+    class_dir = os.path.join(TRAIN_DATA_DIR, class_name)
+    if not os.path.isdir(class_dir):
+        continue
+    files = sorted(os.listdir(class_dir))
+    print(f"\n📂 {class_name}: {len(files)} images")
+
+    for filename in files:
+        path = os.path.join(class_dir, filename)
+        try:
+            image = Image.open(path)
+            # Same preprocessing as main.preprocess_image
+            processed = np.array(image.convert('L').resize(IMG_SIZE)) / 255.0
+        except Exception as e:
+            print(f"⚠️ Skipping {filename}: {e}")
+            continue
+
+        batch.append(processed[..., np.newaxis])
+        paths.append(path)
+        labels.append(class_name)
+        if len(batch) >= BATCH_SIZE:
+            flush_batch()
+
+flush_batch()
+
+if not paths:
+    print("❌ No training images found")
+    sys.exit(1)
+
+embeddings = np.concatenate(embeddings)
+print(f"\n🧮 Embedded {len(paths)} scans in {time.time() - start:.1f}s")
+
+save_index(INDEX_DIR, embeddings, paths, labels, model_path=MODEL_PATH, model_id=model_fingerprint(MODEL_PATH))
+index = CaseIndex(INDEX_DIR)
+
+# Quick latency check against a few training scans
+probe = embeddings[:: max(len(embeddings) // 20, 1)]
+start = time.perf_counter()
+for query in probe:
+    index.search(query, k=5)
+search_ms = (time.perf_counter() - start) / len(probe) * 1000
+
+print("\n" + "=" * 60)
+print(f"✅ Index built: {index.count} cases, {index.nlist} clusters, dim {index.dim}")
+print(f"⚡ Average top-5 search: {search_ms:.2f} ms")
+print(f"Saved to: {INDEX_DIR}")
+print("=" * 60)
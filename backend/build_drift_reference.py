@@ -0,0 +1,115 @@
+"""
+Build the reference profile used by the input drift monitor
+Summarizes every scan in training_data the same way the detection path does
+and writes binned distributions to models/drift_reference.json
+
+Usage: python build_drift_reference.py [--no-model]
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from drift import (
+    scan_summary, bin_index, INTENSITY_BINS, MEAN_INTENSITY_BINS,
+    CONFIDENCE_BINS, SIZE_BINS, MODES
+)
+
+TRAIN_DATA_DIR = 'training_data'
+MODEL_PATH = 'models/stroke_cnn_model.h5'
+OUTPUT_PATH = 'models/drift_reference.json'
+IMG_SIZE = (128, 128)
+BATCH_SIZE = 64
+
+print("=" * 60)
+print("DRIFT MONITOR - REFERENCE PROFILE")
+print("=" * 60)
+
+model = None
+if '--no-model' not in sys.argv and os.path.exists(MODEL_PATH):
+    try:
+        from tensorflow import keras
+        model = keras.models.load_model(MODEL_PATH)
+        print(f"✅ Model loaded for confidence reference: {MODEL_PATH}")
+    except Exception as e:
+        print(f"⚠️ Skipping confidence reference, model not loaded: {e}")
+
+intensity = np.zeros(INTENSITY_BINS)
+mean_intensity = np.zeros(MEAN_INTENSITY_BINS)
+sizes = np.zeros(len(SIZE_BINS))
+modes = np.zeros(len(MODES))
+confidence = np.zeros(CONFIDENCE_BINS)
+samples = 0
+batch = []
+
+
+def flush_batch():
+    """Score the pending batch with the model to build the confidence distribution"""
+    if model is not None and batch:
+        predictions = model.predict(np.stack(batch), verbose=0)[:, 0] * 100
+        for value in predictions:
+            confidence[bin_index(float(value), CONFIDENCE_BINS, 0.0, 100.0)] += 1
+    batch.clear()
+
+
+for class_name in sorted(os.listdir(TRAIN_DATA_DIR)):
+    class_dir = os.path.join(TRAIN_DATA_DIR, class_name)
+    if not os.path.isdir(class_dir):
+        continue
+    files = sorted(os.listdir(class_dir))
+    print(f"\n📂 {class_name}: {len(files)} images")
+
+    for filename in files:
+        try:
+            image = Image.open(os.path.join(class_dir, filename))
+            image.load()
+        except Exception as e:
+            print(f"⚠️ Skipping {filename}: {e}")
+            continue
+
+        # Same preprocessing as main.preprocess_image
+        processed = np.array(image.convert('L').resize(IMG_SIZE)) / 255.0
+        processed = processed[..., np.newaxis]
+
+        summary = scan_summary(image, processed)
+        intensity += summary["intensity"]
+        mean_intensity[bin_index(summary["mean_intensity"], MEAN_INTENSITY_BINS)] += 1
+        sizes[summary["size_bin"]] += 1
+        modes[MODES.index(summary["mode"])] += 1
+        samples += 1
+
+        batch.append(processed)
+        if len(batch) >= BATCH_SIZE:
+            flush_batch()
+
+flush_batch()
+
+if samples == 0:
+    print("❌ No training images found")
+    sys.exit(1)
+
+def distribution(counts):
+    return np.round(counts / counts.sum(), 6).tolist()
+
+
+reference = {
+    "samples": samples,
+    "intensity": distribution(intensity),
+    "mean_intensity": distribution(mean_intensity),
+    "size": distribution(sizes),
+    "mode": distribution(modes),
+}
+if model is not None:
+    reference["confidence"] = distribution(confidence)
+
+os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+with open(OUTPUT_PATH, 'w') as f:
+    json.dump(reference, f)
+
+print("\n" + "=" * 60)
+print(f"✅ Reference profile built from {samples} scans")
+print(f"Saved to: {OUTPUT_PATH}")
+print("=" * 60)
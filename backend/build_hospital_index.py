@@ -0,0 +1,207 @@
+"""
+Build the nearby-hospital index from a local OpenStreetMap extract
+Keeps every hospital plus clinics and doctors with a neurology speciality
+(or "neuro"/"stroke" in the name) and writes them as the columnar store read
+by hospital_index.py
+
+Inputs:
+- .osm.pbf                    needs pyosmium (pip install osmium); nodes and
+                              closed or open ways (placed at the mean of their
+                              nodes); multipolygon relations are skipped
+- .geojson / .json            FeatureCollection, e.g. an Overpass or osmium export;
+                              tags either flat in properties or under properties.tags
+- .geojsonl / .geojsonseq     one feature per line
+
+Extracts: https://download.geofabrik.de (country or region .osm.pbf)
+
+Usage: python build_hospital_index.py EXTRACT [--output models/hospitals.npz] [--cell-degrees 0.1]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+from hospital_index import (
+    save_facilities, HospitalIndex, DEFAULT_CELL_DEGREES,
+    FLAG_HOSPITAL, FLAG_NEUROLOGY, FLAG_EMERGENCY
+)
+
+NEUROLOGY_SPECIALITIES = ('neuro', 'stroke')  # neurology, neurosurgery, neuropsychiatry...
+NEUROLOGY_NAME = re.compile(r'neuro|stroke', re.IGNORECASE)
+CLINIC_TYPES = {'clinic', 'doctors', 'doctor', 'centre'}
+# Tags worth looking at before building a dict of all of an element's tags
+SELECTOR_KEYS = ('amenity', 'healthcare')
+
+
+def facility_flags(tags: Dict[str, str]) -> int:
+    """Flag bits of a facility worth indexing, 0 for anything else"""
+    speciality = tags.get('healthcare:speciality', '').lower()
+    neurology = any(s in speciality for s in NEUROLOGY_SPECIALITIES) or bool(
+        NEUROLOGY_NAME.search(tags.get('name', ''))
+    )
+    hospital = tags.get('amenity') == 'hospital' or tags.get('healthcare') == 'hospital'
+    clinic = tags.get('amenity') in CLINIC_TYPES or tags.get('healthcare') in CLINIC_TYPES
+    if not (hospital or (clinic and neurology)):
+        return 0
+    flags = FLAG_HOSPITAL if hospital else 0
+    if neurology:
+        flags |= FLAG_NEUROLOGY
+    if tags.get('emergency') == 'yes':
+        flags |= FLAG_EMERGENCY
+    return flags
+
+
+def first_value(tags: Dict[str, str], *keys: str) -> str:
+    for key in keys:
+        if tags.get(key):
+            # OSM separates multiple values with ';'
+            return tags[key].split(';')[0].strip()
+    return ''
+
+
+def format_address(tags: Dict[str, str]) -> str:
+    if tags.get('addr:full'):
+        return tags['addr:full']
+    street = f"{tags.get('addr:housenumber', '')} {tags.get('addr:street', '')}".strip()
+    parts = [street, tags.get('addr:city', ''), tags.get('addr:postcode', '')]
+    return ", ".join(part for part in parts if part)
+
+
+def make_facility(tags: Dict[str, str], lat: float, lon: float) -> Optional[Dict]:
+    flags = facility_flags(tags)
+    if not flags or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return {
+        "lat": lat,
+        "lon": lon,
+        "flags": flags,
+        "name": tags.get('name') or tags.get('name:en') or ("Hospital" if flags & FLAG_HOSPITAL else "Neurology clinic"),
+        "address": format_address(tags),
+        "phone": first_value(tags, 'phone', 'contact:phone'),
+        "url": first_value(tags, 'website', 'contact:website', 'url'),
+    }
+
+
+def representative_point(geometry: Dict) -> Optional[Tuple[float, float]]:
+    """(lat, lon) of a GeoJSON geometry: the point itself, else the mean of the outer ring / line"""
+    kind = geometry.get('type')
+    coordinates = geometry.get('coordinates')
+    if not coordinates:
+        return None
+    if kind == 'Point':
+        points = [coordinates]
+    elif kind in ('LineString', 'MultiPoint'):
+        points = coordinates
+    elif kind == 'Polygon':
+        points = coordinates[0]
+    elif kind == 'MultiPolygon':
+        points = coordinates[0][0]
+    else:
+        return None
+    if len(points) > 1 and points[0] == points[-1]:
+        points = points[:-1]
+    return (sum(p[1] for p in points) / len(points), sum(p[0] for p in points) / len(points))
+
+
+def read_geojson(path: str) -> Iterator[Dict]:
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.geojsonl', '.geojsonseq', '.jsonl')):
+            # GeoJSON text sequences may prefix records with an RS character
+            features = (json.loads(line.strip('\x1e \n')) for line in f if line.strip('\x1e \n'))
+        else:
+            features = json.load(f).get('features', [])
+        for feature in features:
+            properties = feature.get('properties') or {}
+            tags = properties['tags'] if isinstance(properties.get('tags'), dict) else properties
+            if not any(key in tags for key in SELECTOR_KEYS):
+                continue
+            point = representative_point(feature.get('geometry') or {})
+            if point is None:
+                continue
+            facility = make_facility({k: str(v) for k, v in tags.items() if v is not None}, *point)
+            if facility is not None:
+                yield facility
+
+
+def read_pbf(path: str) -> Iterator[Dict]:
+    try:
+        import osmium
+    except ImportError:
+        print("❌ Reading .pbf extracts needs pyosmium: pip install osmium")
+        print("   (or convert the extract to GeoJSON, e.g. with `osmium export`)")
+        sys.exit(1)
+
+    facilities = []
+
+    class FacilityHandler(osmium.SimpleHandler):
+        def node(self, node):
+            if any(key in node.tags for key in SELECTOR_KEYS):
+                facility = make_facility({t.k: t.v for t in node.tags}, node.location.lat, node.location.lon)
+                if facility is not None:
+                    facilities.append(facility)
+
+        def way(self, way):
+            if not any(key in way.tags for key in SELECTOR_KEYS):
+                return
+            points = [(n.location.lat, n.location.lon) for n in way.nodes if n.location.valid()]
+            if len(points) > 1 and points[0] == points[-1]:
+                points = points[:-1]
+            if not points:
+                return
+            lat = sum(p[0] for p in points) / len(points)
+            lon = sum(p[1] for p in points) / len(points)
+            facility = make_facility({t.k: t.v for t in way.tags}, lat, lon)
+            if facility is not None:
+                facilities.append(facility)
+
+    # locations=True keeps node coordinates so ways can be placed
+    FacilityHandler().apply_file(path, locations=True)
+    return iter(facilities)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('extract', help='OSM extract: .osm.pbf, .geojson or .geojsonl')
+    parser.add_argument('--output', default=os.getenv('HOSPITAL_INDEX_PATH', 'models/hospitals.npz'))
+    parser.add_argument('--cell-degrees', type=float, default=DEFAULT_CELL_DEGREES,
+                        help='grid cell size in degrees (smaller for very dense extracts)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("NEARBY HOSPITALS - INDEX BUILD")
+    print("=" * 60)
+
+    if not os.path.exists(args.extract):
+        print(f"❌ Extract not found: {args.extract}")
+        sys.exit(1)
+
+    start = time.time()
+    reader = read_pbf if args.extract.endswith('.pbf') else read_geojson
+    facilities = list(reader(args.extract))
+    print(f"✅ Parsed {args.extract} in {time.time() - start:.1f}s")
+    if not facilities:
+        print("❌ No hospitals or neurology facilities found")
+        sys.exit(1)
+
+    output = args.output if args.output.endswith('.npz') else args.output + '.npz'
+    save_facilities(output, facilities, cell_degrees=args.cell_degrees)
+    index = HospitalIndex(output)
+    stats = index.stats()
+    print(f"\n🏥 Facilities:  {stats['facilities']}")
+    print(f"🧠 Neurology:   {stats['neurology']}")
+    print(f"🚑 Emergency:   {stats['emergency']}")
+    print(f"🗺️ Grid cells:  {stats['occupied_cells']} occupied ({args.cell_degrees}°)")
+    print(f"💾 Saved to {output} ({os.path.getsize(output) / 1024 ** 2:.1f} MB)")
+
+    sample = facilities[0]
+    start = time.perf_counter()
+    index.search(sample['lat'], sample['lon'], radius_km=10, k=20)
+    print(f"⏱️ Sample 10 km query: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
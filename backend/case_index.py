@@ -0,0 +1,165 @@
+"""
+BrainHealth AI - Similar Case Index
+Approximate nearest-neighbour search over embeddings of the training scans
+
+Embeddings (penultimate-layer activations, L2-normalized) are stored as a
+memory-mapped float16 matrix, so only the rows a query touches are paged in.
+An IVF (inverted file) index built with spherical k-means narrows each query
+to the few closest clusters; scoring is a single vectorized dot product.
+
+Files in the index directory (written by build_case_index.py):
+- embeddings.f16  raw float16 matrix, shape (count, dim)
+- ivf.npz         centroids, row order grouped by cluster, cluster offsets
+- cases.json      dim, count, model fingerprint, image path and label of every row
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def train_ivf(embeddings: np.ndarray, nlist: int, iterations: int = 20, seed: int = 42):
+    """
+    Spherical k-means over unit vectors
+    Returns: (centroids, order, offsets) where rows of cluster c are
+    order[offsets[c]:offsets[c + 1]]
+    """
+    rng = np.random.default_rng(seed)
+    data = np.asarray(embeddings, dtype=np.float32)
+    nlist = max(1, min(nlist, len(data)))
+    centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+        counts = np.bincount(assignments, minlength=nlist)
+        empty = counts == 0
+        # Re-seed empty clusters with random points
+        sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+        centroids = normalize(sums)
+
+    assignments = np.argmax(data @ centroids.T, axis=1)
+    order = np.argsort(assignments, kind='stable').astype(np.int32)
+    offsets = np.searchsorted(assignments[order], np.arange(nlist + 1)).astype(np.int64)
+    return centroids, order, offsets
+
+
+def save_index(directory: str, embeddings: np.ndarray, paths: List[str], labels: List[str],
+               nlist: Optional[int] = None, model_path: str = '', model_id: str = ''):
+    """Write the memory-mapped embeddings, IVF structure and case metadata
+    (model_id: result_store.model_fingerprint of the model that made the embeddings)"""
+    os.makedirs(directory, exist_ok=True)
+    embeddings = normalize(embeddings)
+    count, dim = embeddings.shape
+
+    matrix = np.memmap(os.path.join(directory, 'embeddings.f16'), dtype=np.float16, mode='w+', shape=(count, dim))
+    matrix[:] = embeddings.astype(np.float16)
+    matrix.flush()
+    del matrix
+
+    nlist = nlist or int(np.clip(np.sqrt(count), 1, 256))
+    centroids, order, offsets = train_ivf(embeddings, nlist)
+    np.savez(os.path.join(directory, 'ivf.npz'), centroids=centroids, order=order, offsets=offsets)
+
+    with open(os.path.join(directory, 'cases.json'), 'w') as f:
+        json.dump({"dim": dim, "count": count, "model": model_path, "model_id": model_id,
+                   "paths": paths, "labels": labels}, f)
+
+
+class CaseIndex:
+    """Read-only IVF index over the memory-mapped case embeddings"""
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, 'cases.json')) as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.count = meta["count"]
+        # Embeddings only compare with queries from the same weights ('' for older indexes)
+        self.model_id = meta.get("model_id", '')
+        self.paths = meta["paths"]
+        self.labels = np.array(meta["labels"])
+        self.label_names = sorted(set(meta["labels"]))
+        self.embeddings = np.memmap(os.path.join(directory, 'embeddings.f16'), dtype=np.float16,
+                                    mode='r', shape=(self.count, self.dim))
+        ivf = np.load(os.path.join(directory, 'ivf.npz'))
+        self.centroids = ivf["centroids"]
+        self.order = ivf["order"]
+        self.offsets = ivf["offsets"]
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def _candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probe = np.argsort(-(self.centroids @ query))[:nprobe]
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+
+    def search(self, query: np.ndarray, k: int = 5, nprobe: int = 8) -> Dict[str, List[Dict]]:
+        """
+        Top-k most similar cases per label (e.g. k stroke and k normal cases)
+        The probe is widened until every label has k candidates or all clusters are searched
+        """
+        query = normalize(query.reshape(-1))
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Embedding has {query.shape[0]} dimensions, index expects {self.dim}")
+
+        nprobe = max(1, min(nprobe, self.nlist))
+        while True:
+            rows = self._candidates(query, nprobe)
+            labels = self.labels[rows]
+            enough = all(np.count_nonzero(labels == name) >= k for name in self.label_names)
+            if enough or nprobe >= self.nlist:
+                break
+            nprobe = min(nprobe * 2, self.nlist)
+
+        rows = np.sort(rows)  # sequential reads from the memory map
+        similarities = self.embeddings[rows].astype(np.float32) @ query
+        labels = self.labels[rows]
+
+        results: Dict[str, List[Dict]] = {}
+        for name in self.label_names:
+            mask = np.flatnonzero(labels == name)
+            scores = similarities[mask]
+            best = np.argpartition(-scores, k)[:k] if len(mask) > k else np.arange(len(mask))
+            top = mask[best[np.argsort(-scores[best])]]
+            results[name] = [
+                {
+                    "case_id": int(rows[i]),
+                    "path": self.paths[rows[i]],
+                    "label": name,
+                    "similarity": round(float(similarities[i]), 4),
+                }
+                for i in top
+            ]
+        return results
+
+
+class RecentEmbeddings:
+    """Bounded LRU of query embeddings captured during detection, keyed by scan ID"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, scan_id: str, embedding: np.ndarray):
+        with self._lock:
+            self._entries[scan_id] = np.asarray(embedding, dtype=np.float32)
+            self._entries.move_to_end(scan_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, scan_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            return self._entries.get(scan_id)
@@ -0,0 +1,273 @@
+"""
+BrainHealth AI - Chat Generation Worker
+Runs HuggingFace chatbot generation off the event loop and micro-batches
+concurrent chat requests into a single padded generate() call
+
+The request path only enqueues the prompt and awaits a future. One worker
+thread takes the first waiting prompt, collects more for up to `max_wait`
+seconds (or until `max_batch`), generates replies for the whole batch at once
+and resolves every future on its event loop. Each reply reports how long it
+waited in the queue and how long its batch took to generate.
+
+Streaming requests get an event queue instead of a future: a batch streamer
+decodes every row incrementally and pushes new text as the model produces it.
+Streaming needs greedy decoding (no beam search), so streaming and plain
+requests are batched separately.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from metrics import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class GenerationQueueFull(Exception):
+    """Raised when the generation queue cannot accept more prompts"""
+
+
+class BatchTextStreamer:
+    """transformers streamer for a whole batch: decodes each row incrementally and
+    passes newly completed words to on_text(row, text)"""
+
+    def __init__(self, tokenizer, batch_size: int, on_text: Callable[[int, str], None]):
+        self.tokenizer = tokenizer
+        self.on_text = on_text
+        self.tokens: List[List[int]] = [[] for _ in range(batch_size)]
+        self.sent = [0] * batch_size
+        # generate() first puts the prompt (decoder-only) or the decoder start tokens (seq2seq)
+        self._skip_first = True
+
+    def put(self, value):
+        if self._skip_first:
+            self._skip_first = False
+            return
+        rows = value.tolist()
+        for row, new_tokens in enumerate(rows):
+            self.tokens[row].extend(new_tokens if isinstance(new_tokens, list) else [new_tokens])
+            text = self.tokenizer.decode(self.tokens[row], skip_special_tokens=True)
+            # Hold back a trailing partial word until it is complete
+            self._emit(row, text[:text.rfind(' ') + 1])
+
+    def end(self):
+        for row, tokens in enumerate(self.tokens):
+            self._emit(row, self.tokenizer.decode(tokens, skip_special_tokens=True))
+
+    def _emit(self, row: int, text: str):
+        if len(text) > self.sent[row]:
+            self.on_text(row, text[self.sent[row]:])
+            self.sent[row] = len(text)
+
+
+def generate_replies(tokenizer, model, prompts: List[str], max_new_tokens: int,
+                     max_input_tokens: int = 128,
+                     on_text: Optional[Callable[[int, str], None]] = None) -> List[str]:
+    """One padded, truncated generate() call for a batch of prompts (seq2seq models such as BlenderBot);
+    with on_text, new text of each row is streamed while generating (greedy decoding)"""
+    import torch
+
+    inputs = tokenizer(prompts, return_tensors='pt', padding=True, truncation=True,
+                       max_length=max_input_tokens)
+    options = {"max_new_tokens": max_new_tokens}
+    if on_text is not None:
+        options.update(num_beams=1, streamer=BatchTextStreamer(tokenizer, len(prompts), on_text))
+    with torch.inference_mode():
+        outputs = model.generate(**inputs, **options)
+    return [reply.strip() for reply in tokenizer.batch_decode(outputs, skip_special_tokens=True)]
+
+
+class GenerationRequest:
+    """One queued prompt; resolved through a future, or an event queue when streaming"""
+
+    __slots__ = ('prompt', 'loop', 'future', 'events', 'enqueued', 'abandoned')
+
+    def __init__(self, prompt: str, loop: asyncio.AbstractEventLoop, stream: bool):
+        self.prompt = prompt
+        self.loop = loop
+        self.future: Optional[asyncio.Future] = None if stream else loop.create_future()
+        self.events: Optional[asyncio.Queue] = asyncio.Queue() if stream else None
+        self.enqueued = time.perf_counter()
+        self.abandoned = False
+
+    @property
+    def stream(self) -> bool:
+        return self.events is not None
+
+    def token(self, text: str):
+        self.loop.call_soon_threadsafe(self.events.put_nowait, ("token", text))
+
+    def finish(self, result: Optional[Dict], error: Optional[Exception]):
+        if self.events is not None:
+            event = ("error", error) if error is not None else ("done", result)
+            self.loop.call_soon_threadsafe(self.events.put_nowait, event)
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future, result, error)
+
+
+class GenerationWorker:
+    """Single background thread serving batched generation requests"""
+
+    def __init__(
+        self,
+        generate_batch: Callable[..., List[str]],
+        max_batch: int = 8,
+        max_wait: float = 0.02,
+        max_new_tokens: int = 60,
+        max_queue: int = 64,
+    ):
+        self.generate_batch = generate_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_new_tokens = max_new_tokens
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        # Taken requests that did not fit the current batch's kind (streaming or not)
+        self._carry: deque = deque()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.queue_ms = Histogram()
+        self.generation_ms = Histogram()
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.rejected = 0
+        self.failed = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="chat-generation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _submit(self, prompt: str, stream: bool) -> GenerationRequest:
+        request = GenerationRequest(prompt, asyncio.get_running_loop(), stream)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            self.rejected += 1
+            raise GenerationQueueFull("Chat generation queue is full")
+        return request
+
+    async def generate(self, prompt: str) -> Dict:
+        """Request path: enqueue without blocking and wait for the batch holding this prompt"""
+        request = self._submit(prompt, stream=False)
+        try:
+            return await request.future
+        finally:
+            request.abandoned = not request.future.done()
+
+    async def stream(self, prompt: str) -> AsyncIterator[Tuple[str, object]]:
+        """Yields ("token", text) events as the reply is generated, then ("done", result)"""
+        request = self._submit(prompt, stream=True)
+        try:
+            while True:
+                kind, value = await request.events.get()
+                if kind == "error":
+                    raise value
+                yield kind, value
+                if kind == "done":
+                    return
+        finally:
+            request.abandoned = True
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._carry:
+                first = self._carry.popleft()
+            else:
+                try:
+                    first = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+            batch = [first]
+            for request in list(self._carry):
+                if len(batch) < self.max_batch and request.stream == first.stream:
+                    self._carry.remove(request)
+                    batch.append(request)
+
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request.stream == first.stream:
+                    batch.append(request)
+                else:
+                    self._carry.append(request)
+            self._process(batch)
+
+    def _process(self, batch: List[GenerationRequest]):
+        # Callers that gave up (client disconnected) are not worth generating for
+        batch = [request for request in batch if not request.abandoned]
+        if not batch:
+            return
+
+        start = time.perf_counter()
+        replies, error = None, None
+        try:
+            if batch[0].stream:
+                on_text = lambda row, text: batch[row].token(text)
+                replies = self.generate_batch([r.prompt for r in batch], self.max_new_tokens, on_text=on_text)
+            else:
+                replies = self.generate_batch([r.prompt for r in batch], self.max_new_tokens)
+        except Exception as e:
+            error = e
+            self.failed += len(batch)
+            print(f"❌ Chat generation failed: {e}")
+        generation_ms = (time.perf_counter() - start) * 1000
+
+        self.batch_size.observe(len(batch))
+        self.generation_ms.observe(generation_ms)
+        for index, request in enumerate(batch):
+            queue_ms = (start - request.enqueued) * 1000
+            self.queue_ms.observe(queue_ms)
+            if error is not None:
+                request.finish(None, error)
+                continue
+            request.finish({
+                "text": replies[index],
+                "queue_ms": round(queue_ms, 2),
+                "generation_ms": round(generation_ms, 2),
+                "batch_size": len(batch),
+            }, None)
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_new_tokens": self.max_new_tokens,
+            "queued": self._queue.qsize() + len(self._carry),
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "queue_ms": self.queue_ms.snapshot(),
+            "generation_ms": self.generation_ms.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
+
+
+def _resolve(future: asyncio.Future, result: Optional[Dict], error: Optional[Exception]):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
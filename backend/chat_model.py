@@ -0,0 +1,200 @@
+"""
+BrainHealth AI - Chatbot Model Lifecycle
+Loads the HuggingFace chatbot on demand, optionally int8-quantized, and
+unloads it again after a period without chat traffic
+
+- lazy (default): nothing is loaded at startup; the first chat request that
+  needs the model starts a background load and is answered from the knowledge
+  base / rules meanwhile, so detection-only nodes never pay for the model
+- quantize: torch dynamic quantization of all nn.Linear layers to int8
+  (weights stored as int8, activations quantized on the fly), typically ~2-3x
+  less memory for the linear weights and faster CPU matmuls
+- idle unload: a reaper thread drops the model after `idle_unload` seconds
+  without use, runs the GC and hands freed heap pages back to the OS
+"""
+
+import ctypes
+import gc
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+DEFAULT_CHATBOT_MODEL = 'facebook/blenderbot-400M-distill'
+
+STATE_UNLOADED = 'unloaded'
+STATE_LOADING = 'loading'
+STATE_LOADED = 'loaded'
+STATE_FAILED = 'failed'
+
+# A failed load is retried on demand at most this often
+RETRY_AFTER_SECONDS = 300
+
+
+class ChatModel:
+    """Tokenizer and seq2seq model of the chatbot"""
+
+    def __init__(self, name: str, tokenizer, model, quantized: bool):
+        self.name = name
+        self.tokenizer = tokenizer
+        self.model = model
+        self.quantized = quantized
+
+
+def load_chat_model(name: str = DEFAULT_CHATBOT_MODEL, quantize: bool = False) -> ChatModel:
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    # Over-long prompts lose their oldest turns, not the latest message
+    tokenizer.truncation_side = 'left'
+    model = AutoModelForSeq2SeqLM.from_pretrained(name)
+    model.eval()
+    if quantize:
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        # The fp32 weights are garbage now; give their pages back
+        release_memory()
+    return ChatModel(name, tokenizer, model, quantize)
+
+
+def release_memory():
+    """Collect garbage and return free heap pages to the OS (glibc only)"""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class ChatModelManager:
+    """Owns the chatbot model: background loading on first use, unloading when idle"""
+
+    def __init__(self, loader: Callable[[], ChatModel], idle_unload: float = 900,
+                 enabled: bool = True):
+        self.loader = loader
+        self.idle_unload = idle_unload
+        self.enabled = enabled
+        self.model: Optional[ChatModel] = None
+        self.state = STATE_UNLOADED
+        self.error: Optional[str] = None
+        self.last_used = time.monotonic()
+        self.load_seconds: Optional[float] = None
+        self._failed_at = 0.0
+        self.loads = 0
+        self.unloads = 0
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> Optional[ChatModel]:
+        return self.model
+
+    def start(self):
+        """Start the idle reaper (no-op when idle unloading is disabled)"""
+        if self.idle_unload <= 0 or self._reaper is not None:
+            return
+        self._stop.clear()
+        self._reaper = threading.Thread(target=self._reap, name="chat-model-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._reaper is not None:
+            self._reaper.join(timeout=5)
+            self._reaper = None
+
+    def load(self):
+        """Load synchronously (startup / pre-fork preload)"""
+        with self._lock:
+            if not self.enabled or self.state in (STATE_LOADED, STATE_LOADING):
+                return
+            self.state = STATE_LOADING
+        self._load()
+
+    def wake(self) -> bool:
+        """Request path: mark the model used and start a background load if it is not
+        resident. True when the model can serve this request right away."""
+        if not self.enabled:
+            return False
+        self.last_used = time.monotonic()
+        with self._lock:
+            if self.state == STATE_LOADED:
+                return True
+            if self.state == STATE_LOADING:
+                return False
+            if self.state == STATE_FAILED and time.monotonic() - self._failed_at < RETRY_AFTER_SECONDS:
+                return False
+            self.state = STATE_LOADING
+        threading.Thread(target=self._load, name="chat-model-loader", daemon=True).start()
+        return False
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            model = self.loader()
+        except Exception as e:
+            with self._lock:
+                self.state = STATE_FAILED
+                self.error = str(e)
+                self._failed_at = time.monotonic()
+            print(f"❌ Error loading chatbot: {e}")
+            return
+        with self._lock:
+            self.model = model
+            self.state = STATE_LOADED
+            self.error = None
+            self.load_seconds = round(time.perf_counter() - start, 2)
+            self.loads += 1
+            self.last_used = time.monotonic()
+        variant = "int8" if model.quantized else "fp32"
+        print(f"✅ HuggingFace chatbot loaded ({model.name}, {variant}, {self.load_seconds}s)")
+
+    @contextmanager
+    def use(self) -> Iterator[ChatModel]:
+        """Hold the model for one generation; it cannot be unloaded meanwhile"""
+        with self._lock:
+            if self.model is None:
+                raise RuntimeError("Chatbot model is not loaded")
+            self._in_use += 1
+            model = self.model
+        try:
+            yield model
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self.last_used = time.monotonic()
+
+    def unload(self) -> bool:
+        """Drop the model if it is still idle; the idle time is re-checked under the lock,
+        since a generation may have run between the reaper's check and this call"""
+        with self._lock:
+            if self.state != STATE_LOADED or self._in_use:
+                return False
+            if time.monotonic() - self.last_used <= self.idle_unload:
+                return False
+            self.model = None
+            self.state = STATE_UNLOADED
+            self.unloads += 1
+        release_memory()
+        print("💤 Chatbot unloaded after idle period")
+        return True
+
+    def _reap(self):
+        while not self._stop.wait(min(self.idle_unload / 4, 30)):
+            if self.state == STATE_LOADED and time.monotonic() - self.last_used > self.idle_unload:
+                self.unload()
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state if self.enabled else "disabled",
+            "model": self.model.name if self.model else None,
+            "quantized": self.model.quantized if self.model else None,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "idle_unload_seconds": self.idle_unload,
+            "load_seconds": self.load_seconds,
+            "loads": self.loads,
+            "unloads": self.unloads,
+            "error": self.error,
+        }
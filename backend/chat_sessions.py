@@ -0,0 +1,157 @@
+"""
+BrainHealth AI - Chat Session Memory
+Bounded per-session conversation history for the chatbot
+
+Each session keeps a rolling list of (user, bot) turns with their token counts:
+- per session, turns beyond `session_tokens` are trimmed oldest-first
+- across sessions, an LRU list bounds the number of sessions and the total
+  stored tokens; least recently used sessions are evicted first
+- sessions idle for longer than `ttl` seconds expire (the LRU order is also
+  the idle order, so expiry only looks at the oldest sessions)
+
+Prompts are built from the newest turns that fit a token budget, so the
+model's input length (and with it generation cost) stays bounded however long
+a conversation runs.
+"""
+
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional
+
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough subword count (~4 characters per token) when no tokenizer is loaded"""
+    return max(1, (len(text) + 3) // 4)
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def is_session_id(value: str) -> bool:
+    return bool(SESSION_ID_PATTERN.match(value))
+
+
+class ChatSession:
+    __slots__ = ('turns', 'tokens', 'last_used')
+
+    def __init__(self):
+        self.turns: deque = deque()
+        self.tokens = 0
+        self.last_used = time.time()
+
+
+class SessionStore:
+    """LRU store of token-budgeted conversation histories"""
+
+    def __init__(self, max_sessions: int = 1000, max_total_tokens: int = 500000,
+                 session_tokens: int = 512, ttl: float = 1800,
+                 count_tokens: Callable[[str], int] = estimate_tokens):
+        self.max_sessions = max_sessions
+        self.max_total_tokens = max_total_tokens
+        self.session_tokens = session_tokens
+        self.ttl = ttl
+        self.count_tokens = count_tokens
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_tokens = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def prompt(self, session_id: str, message: str, budget: int) -> str:
+        """The message preceded by as many recent turns as fit in `budget` tokens
+        (BlenderBot format: turns joined by two spaces, user turns prefixed by one)"""
+        parts = [" " + message]
+        used = self.count_tokens(message)
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            turns = list(session.turns) if session is not None else []
+        for user_text, bot_text, tokens in reversed(turns):
+            if used + tokens > budget:
+                break
+            parts[:0] = [" " + user_text, bot_text]
+            used += tokens
+        return "  ".join(parts)
+
+    def append(self, session_id: str, user_text: str, bot_text: str):
+        tokens = self.count_tokens(user_text) + self.count_tokens(bot_text)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = ChatSession()
+            else:
+                self._sessions.move_to_end(session_id)
+            session.turns.append((user_text, bot_text, tokens))
+            session.tokens += tokens
+            session.last_used = time.time()
+            self.total_tokens += tokens
+
+            while session.tokens > self.session_tokens and len(session.turns) > 1:
+                dropped = session.turns.popleft()[2]
+                session.tokens -= dropped
+                self.total_tokens -= dropped
+            self._expire()
+            while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions
+                                               or self.total_tokens > self.max_total_tokens):
+                self._drop_oldest()
+                self.evicted += 1
+
+    def clear(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self.total_tokens -= session.tokens
+            return True
+
+    def has_history(self, session_id: str) -> bool:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            return session is not None and bool(session.turns)
+
+    def history(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            return {
+                "session_id": session_id,
+                "turns": [{"user": user, "bot": bot, "tokens": tokens} for user, bot, tokens in session.turns],
+                "tokens": session.tokens,
+                "last_used": session.last_used,
+            }
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._drop_oldest()
+            self.expired += 1
+
+    def _drop_oldest(self):
+        _, session = self._sessions.popitem(last=False)
+        self.total_tokens -= session.tokens
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._expire()
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "stored_tokens": self.total_tokens,
+                "max_total_tokens": self.max_total_tokens,
+                "session_tokens": self.session_tokens,
+                "ttl_seconds": self.ttl,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
@@ -0,0 +1,182 @@
+"""
+BrainHealth AI - Input Drift Monitor
+Fixed-memory streaming sketches of incoming scans, compared against a reference
+profile built once from backend/training_data (see build_drift_reference.py)
+
+Each detection adds one summary (pixel intensity histogram, mean intensity,
+image size, color mode, model confidence); client-preprocessed tensors have no
+decoded image, so they only add the intensity and confidence features. Every sketch is a fixed array of
+exponentially decayed bin counts, so an update is O(1)-O(bins) and memory
+never grows. Drift scores (PSI) are computed on demand from the sketches.
+
+The color mode is reported for information only: the training PNGs are all
+RGBA while uploads are mostly RGB or L, and every mode is converted to the
+same grayscale input, so its PSI says nothing about the model's inputs.
+"""
+
+import json
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+INTENSITY_BINS = 32
+MEAN_INTENSITY_BINS = 20
+CONFIDENCE_BINS = 20
+# log2 of the longest image side: <=64px ... >=8192px
+SIZE_BINS = np.arange(6, 14)
+MODES = ['L', 'RGB', 'RGBA', 'other']
+# Scored and shown per feature, but left out of max_psi and the overall status
+INFORMATIONAL_FEATURES = ('mode',)
+
+# Population Stability Index thresholds commonly used for drift alerts
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Too few observations make PSI meaningless (sparse bins)
+MIN_OBSERVATIONS = 100
+
+
+def scan_summary(image: Optional[Image.Image], processed_image: np.ndarray) -> Dict:
+    """Per-scan features fed to the monitor (and used to build the reference);
+    size and mode only when there is a decoded image"""
+    # Every other row/column is plenty for a 32-bin histogram and halves the cost
+    pixels = np.squeeze(processed_image)[::2, ::2].reshape(-1)
+    intensity = np.bincount(
+        np.minimum((pixels * INTENSITY_BINS).astype(np.int32), INTENSITY_BINS - 1),
+        minlength=INTENSITY_BINS
+    ) / pixels.size
+    summary = {
+        "intensity": intensity,
+        "mean_intensity": float(pixels.mean()),
+    }
+    if image is not None:
+        longest_side = max(image.size)
+        summary["size_bin"] = int(np.clip(np.searchsorted(SIZE_BINS, np.log2(max(longest_side, 1))), 0, len(SIZE_BINS) - 1))
+        summary["mode"] = image.mode if image.mode in MODES else 'other'
+    return summary
+
+
+def bin_index(value: float, bins: int, low: float = 0.0, high: float = 1.0) -> int:
+    return int(min(max((value - low) / (high - low) * bins, 0), bins - 1))
+
+
+def psi(expected: np.ndarray, actual: np.ndarray, eps: float = 1e-4) -> float:
+    """Population Stability Index between two binned distributions"""
+    expected = np.clip(expected / max(expected.sum(), eps), eps, None)
+    actual = np.clip(actual / max(actual.sum(), eps), eps, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class DecayedHistogram:
+    """
+    Exponentially decayed bin counts in O(1) per update
+    Instead of multiplying every bin by the decay on each update, the weight of
+    new observations grows by 1/decay; counts are rescaled before they overflow
+    """
+
+    def __init__(self, bins: int, half_life: float = 1000.0):
+        self.counts = np.zeros(bins, dtype=np.float64)
+        self.growth = 2.0 ** (1.0 / half_life)
+        self.weight = 1.0
+        self.observations = 0
+
+    def add(self, index: int = None, vector: np.ndarray = None):
+        if vector is not None:
+            self.counts += vector * self.weight
+        else:
+            self.counts[index] += self.weight
+        self.observations += 1
+        self.weight *= self.growth
+        if self.weight > 1e12:
+            self.counts /= self.weight
+            self.weight = 1.0
+
+    def distribution(self) -> np.ndarray:
+        total = self.counts.sum()
+        return self.counts / total if total > 0 else self.counts
+
+
+class DriftMonitor:
+    """Streaming drift monitor for detection inputs and outputs"""
+
+    def __init__(self, reference: Optional[Dict] = None, half_life: float = 1000.0):
+        self.reference = reference
+        self._lock = threading.Lock()
+        self.sketches = {
+            "intensity": DecayedHistogram(INTENSITY_BINS, half_life),
+            "mean_intensity": DecayedHistogram(MEAN_INTENSITY_BINS, half_life),
+            "size": DecayedHistogram(len(SIZE_BINS), half_life),
+            "mode": DecayedHistogram(len(MODES), half_life),
+            "confidence": DecayedHistogram(CONFIDENCE_BINS, half_life),
+        }
+
+    @classmethod
+    def from_file(cls, path: str, half_life: float = 1000.0) -> "DriftMonitor":
+        reference = None
+        try:
+            with open(path) as f:
+                reference = json.load(f)
+            print(f"✅ Drift reference profile loaded ({reference.get('samples', 0)} training scans)")
+        except FileNotFoundError:
+            print(f"⚠️ Drift reference not found at {path}; run build_drift_reference.py")
+        except ValueError as e:
+            print(f"❌ Invalid drift reference {path}: {e}")
+        return cls(reference, half_life)
+
+    def observe(self, image: Optional[Image.Image], processed_image: np.ndarray, confidence: float):
+        """Hot path: one summary, a handful of O(1)/O(bins) sketch updates
+        (image is None for tensor inputs, which skip the size and mode features)"""
+        summary = scan_summary(image, processed_image)
+        with self._lock:
+            self.sketches["intensity"].add(vector=summary["intensity"])
+            self.sketches["mean_intensity"].add(bin_index(summary["mean_intensity"], MEAN_INTENSITY_BINS))
+            if image is not None:
+                self.sketches["size"].add(summary["size_bin"])
+                self.sketches["mode"].add(MODES.index(summary["mode"]))
+            self.sketches["confidence"].add(bin_index(confidence, CONFIDENCE_BINS, 0.0, 100.0))
+
+    def report(self) -> Dict:
+        with self._lock:
+            current = {name: sketch.distribution().copy() for name, sketch in self.sketches.items()}
+            counts = {name: sketch.observations for name, sketch in self.sketches.items()}
+            observations = counts["intensity"]
+
+        features: Dict[str, Dict] = {}
+        for name, distribution in current.items():
+            entry = {"current": np.round(distribution, 4).tolist()}
+            reference = (self.reference or {}).get(name)
+            # Only tensor inputs so far: no size/mode observations to compare
+            if reference is not None and counts[name] > 0:
+                score = psi(np.asarray(reference, dtype=np.float64), distribution)
+                entry["psi"] = round(score, 4)
+                entry["status"] = drift_status(score)
+            if name in INFORMATIONAL_FEATURES:
+                entry["informational"] = True
+            features[name] = entry
+
+        scores: List[float] = [
+            f["psi"] for name, f in features.items() if "psi" in f and name not in INFORMATIONAL_FEATURES
+        ]
+        if not scores:
+            status = "unknown"
+        elif observations < MIN_OBSERVATIONS:
+            status = "warming_up"
+        else:
+            status = drift_status(max(scores))
+        return {
+            "reference_loaded": self.reference is not None,
+            "reference_samples": (self.reference or {}).get("samples", 0),
+            "observations": observations,
+            "max_psi": round(max(scores), 4) if scores else None,
+            "status": status,
+            "features": features,
+        }
+
+
+def drift_status(score: float) -> str:
+    if score >= PSI_SIGNIFICANT:
+        return "significant_drift"
+    if score >= PSI_MODERATE:
+        return "moderate_drift"
+    return "stable"
@@ -0,0 +1,151 @@
+"""
+BrainHealth AI - Load-Adaptive Explainability
+Grad-CAM roughly doubles the cost of a detection, so under load the overlay is
+degraded step by step instead of slowing every prediction down:
+
+full -> low_res -> heatmap -> deferred -> off
+
+low_res and heatmap replace the Grad-CAM gradient pass with a forward-only
+activation map of the last conv layer.
+
+Load is measured as a pressure score from the detections in flight (plus the
+background job queue) and an EWMA of the model latency, scoring plus the
+explanation actually served, so stepping down visibly lowers it. The controller steps
+down as soon as pressure crosses a threshold and only steps back up one level
+at a time after pressure stayed well below it for a while (hysteresis), so the
+level does not flap at the boundary.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+LEVELS = ("full", "low_res", "heatmap", "deferred", "off")
+# Pressure above which each level is abandoned for the next one
+DEGRADE_AT = (1.0, 1.5, 2.0, 3.0)
+# Recover only once pressure drops this far below the threshold
+RECOVER_RATIO = 0.7
+
+
+class ExplainabilityController:
+    """Chooses the Grad-CAM quality level for each detection from the current load"""
+
+    def __init__(
+        self,
+        target_latency_ms: float = 1000.0,
+        max_in_flight: int = 4,
+        recover_after: float = 10.0,
+        alpha: float = 0.2,
+        queue_depth: Optional[Callable[[], int]] = None,
+        fixed_level: Optional[str] = None,
+    ):
+        if fixed_level is not None and fixed_level not in LEVELS:
+            raise ValueError(f"Unknown explainability level {fixed_level!r}, use one of {', '.join(LEVELS)}")
+        self.target_latency_ms = target_latency_ms
+        self.max_in_flight = max_in_flight
+        self.recover_after = recover_after
+        self.alpha = alpha
+        self.queue_depth = queue_depth or (lambda: 0)
+        self.fixed_level = fixed_level
+        self._lock = threading.Lock()
+        self._level = 0
+        self._calm_since: Optional[float] = None
+        self.in_flight = 0
+        self.latency_ewma_ms: Optional[float] = None
+        self.transitions = 0
+        self.served = {name: 0 for name in LEVELS}
+
+    @contextmanager
+    def track(self):
+        """Count a detection as in flight while its model stages run"""
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def record_latency(self, seconds: float):
+        """Feed the model latency: preprocess through the explanation served (decode and pre-filter excluded)"""
+        latency_ms = seconds * 1000
+        with self._lock:
+            if self.latency_ewma_ms is None:
+                self.latency_ewma_ms = latency_ms
+            else:
+                self.latency_ewma_ms += self.alpha * (latency_ms - self.latency_ewma_ms)
+
+    def pressure(self) -> float:
+        """>1.0 means the server is past its latency target or concurrency budget"""
+        backlog = (self.in_flight + self.queue_depth()) / max(self.max_in_flight, 1)
+        latency = (self.latency_ewma_ms or 0.0) / self.target_latency_ms
+        return max(backlog, latency)
+
+    def choose(self, now: Optional[float] = None) -> str:
+        """Pick the level for one detection and update the hysteresis state"""
+        if self.fixed_level is not None:
+            with self._lock:
+                self.served[self.fixed_level] += 1
+            return self.fixed_level
+
+        now = time.monotonic() if now is None else now
+        pressure = self.pressure()
+        with self._lock:
+            target = sum(pressure > threshold for threshold in DEGRADE_AT)
+            if target > self._level:
+                # Degrade immediately, straight to the level the load calls for
+                self._level = target
+                self._calm_since = None
+                self.transitions += 1
+            elif self._level > 0 and pressure < DEGRADE_AT[self._level - 1] * RECOVER_RATIO:
+                if self._calm_since is None:
+                    self._calm_since = now
+                elif now - self._calm_since >= self.recover_after:
+                    # Recover one level at a time, restarting the calm period
+                    self._level -= 1
+                    self._calm_since = now
+                    self.transitions += 1
+            else:
+                self._calm_since = None
+
+            level = LEVELS[self._level]
+            self.served[level] += 1
+            return level
+
+    def stats(self) -> Dict:
+        pressure = self.pressure()
+        with self._lock:
+            return {
+                "mode": "fixed" if self.fixed_level else "adaptive",
+                "level": self.fixed_level or LEVELS[self._level],
+                "pressure": round(pressure, 3),
+                "in_flight": self.in_flight,
+                "queue_depth": self.queue_depth(),
+                "latency_ewma_ms": round(self.latency_ewma_ms, 2) if self.latency_ewma_ms is not None else None,
+                "target_latency_ms": self.target_latency_ms,
+                "max_in_flight": self.max_in_flight,
+                "transitions": self.transitions,
+                "served": dict(self.served),
+            }
+
+
+class DeferredScans:
+    """Scans waiting for a deferred Grad-CAM job, kept in memory and bounded"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, scan_id: str, image: Any, processed_image: Any):
+        with self._lock:
+            self._entries[scan_id] = (image, processed_image)
+            self._entries.move_to_end(scan_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, scan_id: str) -> Optional[Tuple[Any, Any]]:
+        with self._lock:
+            return self._entries.pop(scan_id, None)
@@ -0,0 +1,171 @@
+"""
+BrainHealth AI - FAQ Retrieval
+BM25 search over the neurology knowledge base (data/faq.jsonl) for the chatbot
+
+Each line of the knowledge base is {"id", "question", "aliases" (optional
+alternative phrasings), "answer"}.
+
+At startup every passage is analysed (lowercase words, stopwords dropped, light
+suffix stemming) into a compact inverted index:
+- vocabulary: term -> row
+- CSR postings: for each term, the passages containing it (int32) and the
+  precomputed BM25 weight of the term in each of them (float32)
+
+A query gathers the postings rows of its terms and sums them per passage with
+np.bincount; top-k is an argpartition of that score vector, so a lookup is a
+handful of numpy calls and stays well under a millisecond.
+
+Confidence is the best score divided by the score the query's terms could reach
+at most (each term's idf * (k1 + 1); terms missing from the index count too).
+That ratio alone is close to 1 for a passage sharing a single term with a short
+query ("stroke" is in almost every passage), so a passage only counts as a
+confident answer when it also matches at least `min_matched_terms` distinct
+query terms, or a single distinctive one (idf of at least `min_single_term_idf`,
+e.g. "aphasia" or "tpa", not "stroke" or "help").
+"""
+
+import json
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be because been before being
+but by can could did do does doing during for from get got had has have having he
+her his how i if in into is it its just know me more most my need no not now of ok on or
+other our out please should so some such tell than thank thanks that the their them then
+there these they this those to too very want was we were what when where which while who
+why will with would you your
+""".split())
+
+
+def stem(word: str) -> str:
+    """Light suffix stripping so that 'strokes'/'stroke' and 'treated'/'treat' share a term"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        word = word[:-3] + 'y'
+    elif word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    if word.endswith('ing') and len(word) > 5:
+        word = word[:-3]
+    elif word.endswith('ed') and len(word) > 4:
+        word = word[:-2]
+    if word.endswith('e') and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def analyze(text: str) -> List[str]:
+    return [stem(word) for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+
+class FaqIndex:
+    """BM25 inverted index over question/answer passages"""
+
+    # Question (and alias) words are counted this many times: a match there is a stronger signal
+    QUESTION_WEIGHT = 3
+
+    def __init__(self, passages: List[Dict], k1: float = 1.5, b: float = 0.75,
+                 min_confidence: float = 0.45, min_matched_terms: int = 2,
+                 min_single_term_idf: float = 2.0):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.min_confidence = min_confidence
+        self.min_matched_terms = min_matched_terms
+        self.min_single_term_idf = min_single_term_idf
+        self.vocabulary: Dict[str, int] = {}
+
+        postings: List[List] = []
+        lengths = []
+        for doc, passage in enumerate(passages):
+            question = " ".join([passage["question"]] + passage.get("aliases", []))
+            terms = analyze(question) * self.QUESTION_WEIGHT + analyze(passage["answer"])
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                row = self.vocabulary.setdefault(term, len(postings))
+                if row == len(postings):
+                    postings.append([])
+                postings[row].append((doc, tf))
+
+        count = len(passages)
+        df = np.array([len(row) for row in postings], dtype=np.int64)
+        self.offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        np.cumsum(df, out=self.offsets[1:])
+        self.doc_ids = np.array([doc for row in postings for doc, _ in row], dtype=np.int32)
+        tf = np.array([tf for row in postings for _, tf in row], dtype=np.float32)
+
+        self.idf = np.log(1 + (count - df + 0.5) / (df + 0.5)).astype(np.float32)
+        # Bound for query terms the index has never seen (df = 0)
+        self.unknown_idf = math.log(1 + (count + 0.5) / 0.5)
+
+        doc_lengths = np.array(lengths, dtype=np.float32)
+        average_length = float(doc_lengths.mean()) if count else 1.0
+        norm = k1 * (1 - b + b * doc_lengths[self.doc_ids] / average_length)
+        term_idf = np.repeat(self.idf, df)
+        self.weights = (term_idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "FaqIndex":
+        with open(path, encoding='utf-8') as f:
+            passages = [json.loads(line) for line in f if line.strip()]
+        return cls(passages, **kwargs)
+
+    @property
+    def count(self) -> int:
+        return len(self.passages)
+
+    def search(self, query: str, k: int = 3) -> List[Dict]:
+        """Top-k passages with their BM25 score and confidence (0..1)"""
+        terms = set(analyze(query))
+        rows = [self.vocabulary[term] for term in terms if term in self.vocabulary]
+        if not rows:
+            return []
+
+        bound = (self.k1 + 1) * (float(self.idf[rows].sum()) + self.unknown_idf * (len(terms) - len(rows)))
+        docs = np.concatenate([self.doc_ids[self.offsets[row]:self.offsets[row + 1]] for row in rows])
+        weights = np.concatenate([self.weights[self.offsets[row]:self.offsets[row + 1]] for row in rows])
+        scores = np.bincount(docs, weights=weights, minlength=self.count)
+        # Each (term, passage) pair has one posting, so this counts distinct matched terms
+        matched = np.bincount(docs, minlength=self.count)
+        term_idf = np.concatenate([np.full(self.offsets[row + 1] - self.offsets[row], self.idf[row]) for row in rows])
+        matched_idf = np.bincount(docs, weights=term_idf, minlength=self.count)
+
+        k = min(k, self.count)
+        top = np.argpartition(-scores, k - 1)[:k] if k < self.count else np.arange(self.count)
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for doc in top:
+            score = float(scores[doc])
+            if score <= 0:
+                break
+            passage = self.passages[doc]
+            results.append({
+                "id": passage["id"],
+                "question": passage["question"],
+                "answer": passage["answer"],
+                "score": round(score, 3),
+                "confidence": round(score / bound, 3),
+                "matched_terms": int(matched[doc]),
+                "matched_idf": round(float(matched_idf[doc]), 3),
+            })
+        return results
+
+    def best(self, query: str) -> Optional[Dict]:
+        """Best passage if retrieval is confident enough to answer with it, else None"""
+        results = self.search(query, k=1)
+        if not results or results[0]["confidence"] < self.min_confidence:
+            return None
+        top = results[0]
+        if top["matched_terms"] >= self.min_matched_terms or top["matched_idf"] >= self.min_single_term_idf:
+            return top
+        return None
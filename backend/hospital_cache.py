@@ -0,0 +1,206 @@
+"""
+BrainHealth AI - Nearby Hospital Tile Cache
+Candidate facilities cached per location tile, so users in the same area share
+one index query
+
+A request maps to a tile (the geohash prefix of its point, `precision`
+characters; ~4.9 x 4.9 km at 5), a radius bucket (the radius rounded up to
+RADIUS_BUCKETS_KM) and the neurology filter. The first request for a tile
+queries the index once around the tile centre, out to the bucket radius plus
+the tile's half-diagonal, so the search circle of any point in the tile is
+covered. At most `max_candidates` of the nearest facilities are kept. Every
+request then refines from its exact point: exact distances to those candidates,
+filtered to its own radius, nearest k first.
+
+Truncation to `max_candidates` can leave a point's answer uncertain, when fewer
+than k candidates are inside the distance the tile is known to cover from that
+point. Such requests go straight to the index.
+"""
+
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from hospital_index import HospitalIndex, haversine_km
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+RADIUS_BUCKETS_KM = (5, 10, 25, 50, 100)
+
+
+def geohash(lat: float, lon: float, precision: int) -> Tuple[str, Tuple[float, float, float, float]]:
+    """Geohash of a point and the bounds of its tile (lat_min, lat_max, lon_min, lon_max)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    value = bits = 0
+    even = True
+    while len(chars) < precision:
+        # Bits alternate longitude, latitude, each halving its range
+        bounds, x = (lon_range, lon) if even else (lat_range, lat)
+        middle = (bounds[0] + bounds[1]) / 2
+        if x >= middle:
+            value = value * 2 + 1
+            bounds[0] = middle
+        else:
+            value *= 2
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_BASE32[value])
+            value = bits = 0
+    return ''.join(chars), (lat_range[0], lat_range[1], lon_range[0], lon_range[1])
+
+
+def radius_bucket(radius_km: Optional[float]):
+    """Smallest bucket holding the radius; None for k-nearest queries, False when too large to cache"""
+    if radius_km is None:
+        return None
+    for bucket in RADIUS_BUCKETS_KM:
+        if radius_km <= bucket:
+            return bucket
+    return False
+
+
+def response_etag(payload) -> str:
+    """Weak ETag of the meaningful part of a response: the body also carries timings
+    and cache flags, which differ between semantically equal responses"""
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return 'W/"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in if_none_match.split(','))
+
+
+class TileEntry:
+    __slots__ = ('rows', 'covered_km', 'half_diagonal_km')
+
+    def __init__(self, rows: np.ndarray, covered_km: float, half_diagonal_km: float):
+        self.rows = rows
+        self.covered_km = covered_km
+        self.half_diagonal_km = half_diagonal_km
+
+
+class HospitalTileCache:
+    """LRU of per-tile candidate sets in front of a HospitalIndex, with hit-rate counters"""
+
+    def __init__(self, index: HospitalIndex, precision: int = 5, max_tiles: int = 4096,
+                 max_candidates: int = 500):
+        self.index = index
+        self.precision = precision
+        self.max_tiles = max_tiles
+        self.max_candidates = max_candidates
+        self._tiles: "OrderedDict[tuple, TileEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Tile cached, but its candidates could not settle the answer for this point
+        self.uncovered = 0
+        # Radius beyond the largest bucket: always a direct index query
+        self.bypassed = 0
+        # Conditional requests answered 304 Not Modified
+        self.not_modified = 0
+
+    def search(self, lat: float, lon: float, radius_km: Optional[float], k: int,
+               require_flags: int = 0) -> Tuple[List[Dict], bool]:
+        """Facilities for the exact point (as HospitalIndex.search), and whether the tile cache answered"""
+        bucket = radius_bucket(radius_km)
+        if bucket is False:
+            with self._lock:
+                self.bypassed += 1
+            return self.index.search(lat, lon, radius_km, k, require_flags), False
+
+        tile, bounds = geohash(lat, lon, self.precision)
+        key = (tile, bucket, require_flags)
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            entry = self._build(bounds, bucket, require_flags)
+            with self._lock:
+                self._tiles[key] = entry
+                while len(self._tiles) > self.max_tiles:
+                    self._tiles.popitem(last=False)
+
+        distances = self.index.distances(lat, lon, entry.rows)
+        # Every facility within `reach` of this point is among the candidates
+        reach = entry.covered_km - entry.half_diagonal_km
+        limit = reach if radius_km is None else min(radius_km, reach)
+        inside = distances <= limit
+        if (radius_km is None or reach < radius_km) and np.count_nonzero(inside) < k:
+            with self._lock:
+                self.uncovered += 1
+            return self.index.search(lat, lon, radius_km, k, require_flags), False
+
+        rows, distances = entry.rows[inside], distances[inside]
+        nearest = np.argsort(distances, kind='stable')[:k]
+        return [self.index.facility(int(rows[i]), float(distances[i])) for i in nearest], True
+
+    def _build(self, bounds: Tuple[float, float, float, float], bucket: Optional[float],
+               require_flags: int) -> TileEntry:
+        lat_min, lat_max, lon_min, lon_max = bounds
+        center_lat, center_lon = (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+        half_diagonal = float(haversine_km(
+            center_lat, center_lon, [lat_min, lat_min, lat_max, lat_max], [lon_min, lon_max, lon_min, lon_max]
+        ).max())
+        if bucket is None:
+            rows, distances = self.index.nearest(center_lat, center_lon, self.max_candidates, require_flags)
+            covered = math.inf
+        else:
+            covered = bucket + half_diagonal
+            rows, distances = self.index.within(center_lat, center_lon, covered, self.max_candidates, require_flags)
+        if len(rows) == self.max_candidates:
+            # Truncated: only complete up to the farthest candidate kept
+            covered = float(distances[-1])
+        return TileEntry(rows.astype(np.int32), covered, half_diagonal)
+
+    def record_not_modified(self):
+        """Count a conditional request answered 304 Not Modified"""
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "tiles": len(self._tiles),
+                "max_tiles": self.max_tiles,
+                "geohash_precision": self.precision,
+                "radius_buckets_km": list(RADIUS_BUCKETS_KM),
+                "max_candidates": self.max_candidates,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "uncovered": self.uncovered,
+                "bypassed": self.bypassed,
+                "not_modified": self.not_modified,
+            }
+
+    def prometheus(self, name: str) -> str:
+        """Text exposition lines: tile hit/miss counters, 304 responses and cached tiles"""
+        return (
+            f"# TYPE {name}_hits_total counter\n{name}_hits_total {self.hits}\n"
+            f"# TYPE {name}_misses_total counter\n{name}_misses_total {self.misses}\n"
+            f"# TYPE {name}_not_modified_total counter\n{name}_not_modified_total {self.not_modified}\n"
+            f"# TYPE {name}_tiles gauge\n{name}_tiles {len(self._tiles)}\n"
+        )
@@ -0,0 +1,236 @@
+"""
+BrainHealth AI - Hospital Index
+Nearby search over hospitals and neurology facilities extracted from OpenStreetMap
+
+build_hospital_index.py writes the facilities as one columnar .npz file:
+- lat, lon      float32 coordinates, rows sorted by grid cell
+- cells         int64 grid cell of every row (row-major cells of `cell_degrees`
+                latitude x longitude), so each cell is a contiguous slice
+- flags         uint8 bit set: hospital, neurology, emergency
+- name, address, phone, url
+                UTF-8 text of all rows packed into one byte array per column,
+                with int64 offsets (row i is blob[offsets[i]:offsets[i + 1]])
+
+A radius query visits the grid rows its bounding box overlaps. Within a row the
+overlapping cells are consecutive keys, so every row costs two binary searches
+and one slice; haversine distances are then computed for all candidates in one
+vectorized pass. k-nearest queries without a radius widen the search radius
+until k facilities lie inside it.
+"""
+
+import math
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Half the Earth's circumference: no two points are farther apart
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+DEFAULT_CELL_DEGREES = 0.1
+
+FLAG_HOSPITAL = 1
+FLAG_NEUROLOGY = 2
+FLAG_EMERGENCY = 4
+
+TEXT_COLUMNS = ('name', 'address', 'phone', 'url')
+
+# First radius tried by k-nearest queries; multiplied by 4 until k facilities are found
+KNN_START_RADIUS_KM = 10
+
+
+def haversine_km(lat: float, lon: float, lats, lons) -> np.ndarray:
+    """Great-circle distances from one point to arrays of points"""
+    lat1 = math.radians(lat)
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    a = (np.sin((lats - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lats) * np.sin((lons - math.radians(lon)) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def format_distance(km: float) -> str:
+    return f"{km:.1f} km"
+
+
+def grid_cells(lats, lons, cell_degrees: float) -> np.ndarray:
+    columns = int(math.ceil(360 / cell_degrees))
+    rows = np.floor((np.asarray(lats, dtype=np.float64) + 90) / cell_degrees).astype(np.int64)
+    cols = np.floor((np.asarray(lons, dtype=np.float64) + 180) / cell_degrees).astype(np.int64)
+    return rows * columns + np.clip(cols, 0, columns - 1)
+
+
+def pack_text(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def save_facilities(path: str, facilities: List[Dict], cell_degrees: float = DEFAULT_CELL_DEGREES):
+    """Write facilities ({lat, lon, flags, name, address, phone, url}) as a grid-sorted columnar store"""
+    lats = np.array([f['lat'] for f in facilities], dtype=np.float32)
+    lons = np.array([f['lon'] for f in facilities], dtype=np.float32)
+    flags = np.array([f.get('flags', FLAG_HOSPITAL) for f in facilities], dtype=np.uint8)
+    # Cells from the stored float32 coordinates, so queries see exactly the same grid
+    cells = grid_cells(lats, lons, cell_degrees)
+    order = np.argsort(cells, kind='stable')
+
+    columns = {
+        "lat": lats[order],
+        "lon": lons[order],
+        "cells": cells[order],
+        "flags": flags[order],
+        "cell_degrees": np.float64(cell_degrees),
+    }
+    for column in TEXT_COLUMNS:
+        blob, offsets = pack_text([facilities[i].get(column) or '' for i in order])
+        columns[column] = blob
+        columns[f"{column}_offsets"] = offsets
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.savez_compressed(path, **columns)
+
+
+class HospitalIndex:
+    """Read-only grid index over the columnar facility store"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with np.load(path) as data:
+            self.lat = data['lat']
+            self.lon = data['lon']
+            self.cells = data['cells']
+            self.flags = data['flags']
+            self.cell_degrees = float(data['cell_degrees'])
+            self._text = {
+                column: (data[column].tobytes(), data[f"{column}_offsets"])
+                for column in TEXT_COLUMNS
+            }
+        self.count = len(self.lat)
+        self.columns = int(math.ceil(360 / self.cell_degrees))
+        # Per-row trigonometry done once, not per query
+        self._lat_rad = np.radians(self.lat.astype(np.float64))
+        self._lon_rad = np.radians(self.lon.astype(np.float64))
+        self._cos_lat = np.cos(self._lat_rad)
+
+    def text(self, column: str, row: int) -> str:
+        blob, offsets = self._text[column]
+        return blob[offsets[row]:offsets[row + 1]].decode('utf-8')
+
+    def _lon_ranges(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, float]]:
+        dlat = radius_km / KM_PER_DEGREE
+        widest = max(abs(lat - dlat), abs(lat + dlat))
+        if widest >= 90:
+            return [(-180.0, 180.0)]
+        dlon = dlat / math.cos(math.radians(widest))
+        if dlon >= 180:
+            return [(-180.0, 180.0)]
+        low, high = lon - dlon, lon + dlon
+        # Boxes crossing the antimeridian are split in two
+        if low < -180:
+            return [(low + 360, 180.0), (-180.0, high)]
+        if high > 180:
+            return [(low, 180.0), (-180.0, high - 360)]
+        return [(low, high)]
+
+    def candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Rows in the grid cells overlapping the bounding box of the search circle"""
+        dlat = radius_km / KM_PER_DEGREE
+        first_row = int((max(lat - dlat, -90.0) + 90) // self.cell_degrees)
+        last_row = int((min(lat + dlat, 90.0) + 90) // self.cell_degrees)
+        grid_rows = np.arange(first_row, last_row + 1, dtype=np.int64) * self.columns
+
+        low_keys, high_keys = [], []
+        for low, high in self._lon_ranges(lat, lon, radius_km):
+            first_col = min(int((low + 180) // self.cell_degrees), self.columns - 1)
+            last_col = min(int((high + 180) // self.cell_degrees), self.columns - 1)
+            low_keys.append(grid_rows + first_col)
+            high_keys.append(grid_rows + last_col)
+        starts = np.searchsorted(self.cells, np.concatenate(low_keys), side='left')
+        ends = np.searchsorted(self.cells, np.concatenate(high_keys), side='right')
+
+        # Concatenate the slices starts[i]:ends[i] without a Python loop
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return np.arange(total, dtype=np.int64) + shifts
+
+    def distances(self, lat: float, lon: float, rows: np.ndarray) -> np.ndarray:
+        lat1 = math.radians(lat)
+        a = (np.sin((self._lat_rad[rows] - lat1) / 2) ** 2
+             + math.cos(lat1) * self._cos_lat[rows] * np.sin((self._lon_rad[rows] - math.radians(lon)) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def within(self, lat: float, lon: float, radius_km: float, k: int,
+               require_flags: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and distances (km) of the k nearest facilities within radius_km, nearest first"""
+        rows = self.candidates(lat, lon, radius_km)
+        if require_flags:
+            rows = rows[(self.flags[rows] & require_flags) == require_flags]
+        distances = self.distances(lat, lon, rows)
+        inside = distances <= radius_km
+        rows, distances = rows[inside], distances[inside]
+        if len(rows) > k:
+            nearest = np.argpartition(distances, k - 1)[:k]
+            rows, distances = rows[nearest], distances[nearest]
+        order = np.argsort(distances, kind='stable')
+        return rows[order], distances[order]
+
+    def nearest(self, lat: float, lon: float, k: int,
+                require_flags: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """k nearest facilities at any distance (the search radius grows until k are inside)"""
+        radius = KNN_START_RADIUS_KM
+        while True:
+            rows, distances = self.within(lat, lon, radius, k, require_flags)
+            if len(rows) >= k or radius >= MAX_DISTANCE_KM:
+                return rows, distances
+            radius = min(radius * 4, MAX_DISTANCE_KM)
+
+    def search(self, lat: float, lon: float, radius_km: Optional[float] = None, k: int = 20,
+               require_flags: int = 0) -> List[Dict]:
+        """Up to k facilities nearest to (lat, lon), within radius_km when given"""
+        if radius_km is None:
+            rows, distances = self.nearest(lat, lon, k, require_flags)
+        else:
+            rows, distances = self.within(lat, lon, radius_km, k, require_flags)
+        return [self.facility(int(row), float(distance)) for row, distance in zip(rows, distances)]
+
+    def facility(self, row: int, distance_km: float) -> Dict:
+        flags = int(self.flags[row])
+        return {
+            **{column: self.text(column, row) for column in TEXT_COLUMNS},
+            "lat": round(float(self.lat[row]), 6),
+            "lon": round(float(self.lon[row]), 6),
+            "distance_km": round(distance_km, 2),
+            "neurology": bool(flags & FLAG_NEUROLOGY),
+            "emergency": bool(flags & FLAG_EMERGENCY),
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "facilities": self.count,
+            "neurology": int(np.count_nonzero(self.flags & FLAG_NEUROLOGY)),
+            "emergency": int(np.count_nonzero(self.flags & FLAG_EMERGENCY)),
+            "cell_degrees": self.cell_degrees,
+            "occupied_cells": int(np.count_nonzero(np.diff(self.cells))) + 1 if self.count else 0,
+        }
+
+
+def load_hospital_index(path: str) -> Optional[HospitalIndex]:
+    if not os.path.exists(path):
+        print(f"⚠️ Hospital index not found at {path}; run build_hospital_index.py (using built-in list)")
+        return None
+    try:
+        index = HospitalIndex(path)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"❌ Invalid hospital index {path}: {e}")
+        return None
+    print(f"✅ Hospital index loaded ({index.count} facilities)")
+    return index
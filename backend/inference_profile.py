@@ -0,0 +1,75 @@
+"""
+BrainHealth AI - CPU Inference Profile
+Thread counts, XLA and batch size for the stroke model, tuned per machine by
+autotune_inference.py and applied by the backend when the model is loaded
+
+The profile is a small JSON file (models/inference_profile.json by default):
+{"intra_op_threads": 4, "inter_op_threads": 1, "jit_compile": false, "batch_size": 8, ...}
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+PROFILE_KEYS = ("intra_op_threads", "inter_op_threads", "jit_compile", "batch_size")
+
+
+def cpu_limit() -> int:
+    """CPUs this process may actually use: affinity mask capped by the cgroup CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # cgroup v2 ("max 100000" when unlimited) then cgroup v1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            if quota > 0:
+                cpus = min(cpus, max(1, quota // period))
+        except (OSError, ValueError):
+            pass
+    return cpus
+
+
+def load_profile(path: str) -> Optional[Dict[str, Any]]:
+    """Read a profile written by autotune_inference.py (None when missing or invalid)"""
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"❌ Invalid inference profile {path}: {e}")
+        return None
+
+    missing = [key for key in PROFILE_KEYS if key not in profile]
+    if missing:
+        print(f"❌ Inference profile {path} is missing {', '.join(missing)}")
+        return None
+    if profile.get("cpu_limit") not in (None, cpu_limit()):
+        print(f"⚠️ Inference profile was tuned for {profile['cpu_limit']} CPUs, "
+              f"this machine has {cpu_limit()}; re-run autotune_inference.py")
+    return profile
+
+
+def apply_threading(tf, profile: Dict[str, Any]) -> bool:
+    """
+    Set TensorFlow's thread pools; only possible before the runtime executes
+    its first op, so call this before loading the model
+    """
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(int(profile["intra_op_threads"]))
+        tf.config.threading.set_inter_op_parallelism_threads(int(profile["inter_op_threads"]))
+        return True
+    except RuntimeError as e:
+        print(f"⚠️ Could not apply inference thread settings (TensorFlow already initialized): {e}")
+        return False
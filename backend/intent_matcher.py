@@ -0,0 +1,152 @@
+"""
+BrainHealth AI - Compiled Intent Matcher
+Word-boundary-correct keyword matching for the rule-based chatbot
+
+The intent table (data/intents.json) is compiled once into:
+- a hash map word -> best intent for exact keywords, probed with one set
+  intersection against the message's words
+- one regex alternation for 'word*' prefix keywords, anchored at word starts
+- an Aho-Corasick automaton over words for multi-word phrases, only run when
+  the message contains the first word of some phrase
+
+The message is tokenized once; the intent listed first in the table wins, as
+in the original if/elif chain (matches() returns every intent that matched). Unlike substring checks, "hi" no longer matches
+"this" or "which". Cost grows with the message length, not with the number of
+keywords (see benchmark_intents.py).
+"""
+
+import json
+import re
+from collections import deque
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton whose alphabet is words, reporting the intents of every match"""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Intent indices of the phrases ending in each state (empty: no match)
+        self.output: List[FrozenSet[int]] = [frozenset()]
+
+    def add(self, words: List[str], intent: int):
+        state = 0
+        for word in words:
+            if word not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(frozenset())
+                self.goto[state][word] = len(self.goto) - 1
+            state = self.goto[state][word]
+        self.output[state] = self.output[state] | {intent}
+
+    def build(self):
+        """Breadth-first failure links; outputs are merged along them"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self.goto[state].items():
+                queue.append(child)
+                if state == 0:
+                    self.fail[child] = 0
+                else:
+                    fallback = self.fail[state]
+                    while fallback and word not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[child] = self.goto[fallback].get(word, 0)
+                self.output[child] = self.output[child] | self.output[self.fail[child]]
+
+    def step(self, state: int, word: str) -> int:
+        while state and word not in self.goto[state]:
+            state = self.fail[state]
+        return self.goto[state].get(word, 0)
+
+
+class IntentMatcher:
+    """Matches a message to the highest-priority intent of the compiled table"""
+
+    def __init__(self, intents: List[Dict], fallback: str):
+        self.names = [intent["name"] for intent in intents]
+        self.responses = [intent["response"] for intent in intents]
+        self.fallback = fallback
+        # Keyword -> indices of the intents listing it
+        self.words: Dict[str, List[int]] = {}
+        self.prefixes: Dict[str, List[int]] = {}
+        self.phrases = PhraseAutomaton()
+        self.phrase_starts = set()
+
+        for index, intent in enumerate(intents):
+            for keyword in intent.get("keywords", []):
+                keyword = keyword.lower()
+                if keyword.endswith('*'):
+                    self.prefixes.setdefault(keyword[:-1], []).append(index)
+                else:
+                    self.words.setdefault(keyword, []).append(index)
+            for phrase in intent.get("phrases", []):
+                words = tokenize(phrase)
+                self.phrases.add(words, index)
+                self.phrase_starts.add(words[0])
+        self.phrases.build()
+        self.word_keys = frozenset(self.words)
+        self.prefix_pattern = None
+        if self.prefixes:
+            alternation = "|".join(re.escape(p) for p in sorted(self.prefixes, key=len, reverse=True))
+            self.prefix_pattern = re.compile(rf"(?<![a-z0-9])({alternation})")
+
+    @classmethod
+    def from_file(cls, path: str) -> "IntentMatcher":
+        with open(path, encoding='utf-8') as f:
+            table = json.load(f)
+        return cls(table["intents"], table["fallback"])
+
+    def match(self, message: str) -> Optional[str]:
+        """Name of the matched intent, or None"""
+        index = self._match_index(message)
+        return self.names[index] if index is not None else None
+
+    def respond(self, message: str) -> str:
+        index = self._match_index(message)
+        return self.responses[index] if index is not None else self.fallback
+
+    def matches(self, message: str) -> List[str]:
+        """Names of every intent the message matches, highest priority first
+        (e.g. a greeting that also asks for emergency help matches both)"""
+        return [self.names[index] for index in sorted(self._candidates(message))]
+
+    def match_with_response(self, message: str) -> Tuple[Optional[str], str]:
+        index = self._match_index(message)
+        if index is None:
+            return None, self.fallback
+        return self.names[index], self.responses[index]
+
+    def _match_index(self, message: str) -> Optional[int]:
+        candidates = self._candidates(message)
+        return min(candidates) if candidates else None
+
+    def _candidates(self, message: str) -> Set[int]:
+        """Indices of all intents with a keyword or phrase in the message"""
+        text = message.lower()
+        tokens = TOKEN_PATTERN.findall(text)
+        token_set = set(tokens)
+        candidates: Set[int] = set()
+        for word in token_set & self.word_keys:
+            candidates.update(self.words[word])
+
+        if self.prefix_pattern is not None:
+            for prefix in self.prefix_pattern.findall(text):
+                candidates.update(self.prefixes[prefix])
+
+        if token_set & self.phrase_starts:
+            state = 0
+            for token in tokens:
+                state = self.phrases.step(state, token)
+                candidates |= self.phrases.output[state]
+
+        return candidates
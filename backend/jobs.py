@@ -0,0 +1,384 @@
+"""
+BrainHealth AI - Background Jobs
+Asynchronous job queue for slow detection and PDF report work
+
+Jobs are accepted immediately, processed by a bounded pool of workers and
+polled (or streamed) by the client. Job state lives in memory and can
+optionally be persisted to SQLite so queued and finished jobs survive restarts.
+
+Several worker processes (serve.py) may share one SQLite store: a job is
+claimed with a conditional UPDATE, so exactly one process runs it, and jobs
+that are unfinished in memory are re-read from the database, so any process
+reports the current status.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+TERMINAL_STATES = (JOB_COMPLETED, JOB_FAILED)
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+
+class JobStore:
+    """In-memory job store with an optional SQLite persistence backend"""
+
+    def __init__(self, db_path: Optional[str] = None, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT, status TEXT, payload TEXT,"
+                " result TEXT, error TEXT, created_at REAL, updated_at REAL)"
+            )
+            self._db.commit()
+            self._load()
+
+    def _load(self):
+        rows = self._db.execute(
+            "SELECT id, kind, status, payload, result, error, created_at, updated_at"
+            " FROM jobs ORDER BY created_at"
+        ).fetchall()
+        for row in rows:
+            self._jobs[row[0]] = self._row_to_job(row)
+
+    @staticmethod
+    def _row_to_job(row) -> Dict[str, Any]:
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "payload": json.loads(row[3]) if row[3] else None,
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+        }
+
+    def _fetch(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(
+            "SELECT id, kind, status, payload, result, error, created_at, updated_at"
+            " FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def _persist(self, job: Dict[str, Any]):
+        if self._db is None:
+            return
+        # Finished jobs no longer need their (possibly large) input payload
+        payload = None if job["status"] in TERMINAL_STATES else job["payload"]
+        self._db.execute(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                job["id"], job["kind"], job["status"],
+                json.dumps(payload) if payload is not None else None,
+                json.dumps(job["result"]) if job["result"] is not None else None,
+                job["error"], job["created_at"], job["updated_at"],
+            ),
+        )
+        self._db.commit()
+
+    def _evict(self):
+        """Drop the oldest finished jobs once the store is over capacity"""
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id]["status"] in TERMINAL_STATES:
+                del self._jobs[job_id]
+                if self._db is not None:
+                    self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        if self._db is not None:
+            self._db.commit()
+
+    def create(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": JOB_QUEUED,
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._persist(job)
+            self._evict()
+        return job
+
+    @property
+    def shared(self) -> bool:
+        """Backed by SQLite, which other worker processes may update"""
+        return self._db is not None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if self._db is None or (job is not None and job["status"] in TERMINAL_STATES):
+                return job
+            # Submitted to, or being run by, another worker process sharing the database
+            stored = self._fetch(job_id)
+            if stored is None:
+                return job
+            if job is None:
+                return stored
+            job.update(stored)
+            return job
+
+    def transition(self, job_id: str, expected: str, **fields) -> Optional[Dict[str, Any]]:
+        """Update a job only if its status is still `expected` (atomic across processes
+        sharing the database); None when another worker got there first"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != expected:
+                return None
+            now = time.time()
+            if self._db is not None:
+                cursor = self._db.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    (fields.get("status", expected), now, job_id, expected),
+                )
+                if cursor.rowcount != 1:
+                    self._db.commit()
+                    stored = self._fetch(job_id)
+                    if stored is not None:
+                        job.update(stored)
+                    return None
+            job.update(fields)
+            job["updated_at"] = now
+            if job["status"] in TERMINAL_STATES:
+                job["payload"] = None
+            self._persist(job)
+            return job
+
+    def claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Move a queued job to running for this worker; None if it is not (or no longer) queued"""
+        return self.transition(job_id, JOB_QUEUED, status=JOB_RUNNING)
+
+    def update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields)
+            job["updated_at"] = time.time()
+            if job["status"] in TERMINAL_STATES:
+                job["payload"] = None
+            self._persist(job)
+            return job
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs that were queued or running, e.g. when the server last stopped"""
+        with self._lock:
+            return [job for job in self._jobs.values() if job["status"] not in TERMINAL_STATES]
+
+    def requeue_interrupted(self) -> int:
+        """Queue jobs left running by the last shutdown again (only while no other
+        process works on the same database, i.e. before workers start)"""
+        requeued = 0
+        with self._lock:
+            for job in self._jobs.values():
+                if job["status"] == JOB_RUNNING:
+                    job["status"] = JOB_QUEUED
+                    job["updated_at"] = time.time()
+                    self._persist(job)
+                    requeued += 1
+        return requeued
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public representation of a job (without its input payload)"""
+    return {
+        "job_id": job["id"],
+        "type": job["kind"],
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+class JobManager:
+    """Bounded worker pool that executes queued jobs off the event loop"""
+
+    def __init__(
+        self,
+        store: JobStore,
+        handlers: Dict[str, Callable[[str, Dict[str, Any]], Any]],
+        workers: int = 2,
+        max_queue: int = 100,
+        poll_interval: float = 0.25,
+    ):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.max_queue = max_queue
+        # How often waiters re-read a shared (SQLite) store for jobs run by other processes
+        self.poll_interval = poll_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, recover: bool = True):
+        """Start the workers and resume queued jobs; recover=False when interrupted jobs
+        were already requeued before other processes started sharing the store"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._changed = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+        # Resume work that was interrupted by a restart
+        if recover:
+            self.store.requeue_interrupted()
+        resumed = 0
+        for job in self.store.unfinished():
+            if job["status"] != JOB_QUEUED:
+                continue  # running in another worker process
+            if job["payload"] is None or self._queue.full():
+                self.store.transition(job["id"], JOB_QUEUED, status=JOB_FAILED,
+                                      error="Job interrupted by server restart")
+                continue
+            self._queue.put_nowait(job["id"])
+            resumed += 1
+        if resumed:
+            print(f"🔁 Resumed {resumed} unfinished job(s)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job type: {kind}")
+        if self._queue is None or self._queue.full():
+            raise JobQueueFull("Job queue is full, please retry later")
+        job = self.store.create(kind, payload)
+        self._queue.put_nowait(job["id"])
+        return job
+
+    def submit_threadsafe(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """submit() for callers outside the event loop, e.g. the request threadpool"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job type: {kind}")
+        if self._loop is None or self._queue.full():
+            raise JobQueueFull("Job queue is full, please retry later")
+        job = self.store.create(kind, payload)
+
+        def enqueue():
+            try:
+                self._queue.put_nowait(job["id"])
+            except asyncio.QueueFull:
+                self.store.update(job["id"], status=JOB_FAILED, error="Job queue is full")
+
+        self._loop.call_soon_threadsafe(enqueue)
+        return job
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id = await self._queue.get()
+            try:
+                # Several workers (and worker processes) may hold the same job ID
+                job = self.store.claim(job_id)
+                if job is None:
+                    continue
+                payload = job["payload"]
+                await self._notify()
+                try:
+                    handler = self.handlers[job["kind"]]
+                    result = await loop.run_in_executor(None, handler, job_id, payload)
+                    self.store.update(job_id, status=JOB_COMPLETED, result=result)
+                except Exception as e:
+                    print(f"❌ Job {job_id} failed: {e}")
+                    self.store.update(job_id, status=JOB_FAILED, error=str(e))
+                await self._notify()
+            finally:
+                self._queue.task_done()
+
+    def _is_finished(self, job_id: str) -> bool:
+        job = self.store.get(job_id)
+        return job is None or job["status"] in TERMINAL_STATES
+
+    def _changed_since(self, job_id: str, updated_at: Optional[float]) -> bool:
+        job = self.store.get(job_id)
+        return job is None or job["updated_at"] != updated_at
+
+    async def _wait_for(self, predicate: Callable[[], bool], timeout: float) -> bool:
+        """Wait until predicate() holds (False on timeout). Only this process notifies
+        the condition, so with a shared database the store is also re-read every
+        poll_interval for jobs run by other worker processes."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not predicate():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            step = min(remaining, self.poll_interval) if self.store.shared else remaining
+            try:
+                async with self._changed:
+                    await asyncio.wait_for(self._changed.wait_for(predicate), timeout=step)
+                return True
+            except asyncio.TimeoutError:
+                continue
+        return True
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Long-poll: return once the job finishes or the timeout expires"""
+        job = self.store.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATES or timeout <= 0:
+            return job
+        await self._wait_for(lambda: self._is_finished(job_id), timeout)
+        return self.store.get(job_id)
+
+    async def watch(self, job_id: str, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield the job every time it changes (None as a keep-alive) until it finishes"""
+        job = self.store.get(job_id)
+        last_seen = None
+        while job is not None:
+            if job["updated_at"] != last_seen:
+                last_seen = job["updated_at"]
+                yield job
+                if job["status"] in TERMINAL_STATES:
+                    return
+            if not await self._wait_for(lambda: self._changed_since(job_id, last_seen), heartbeat):
+                yield None
+            job = self.store.get(job_id)
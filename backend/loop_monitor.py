@@ -0,0 +1,112 @@
+"""
+BrainHealth AI - Event Loop Lag Monitor
+Measures how late the asyncio event loop runs scheduled callbacks, and
+optionally captures the stack of whatever is blocking it
+
+A background task sleeps for a fixed interval and records how much later than
+requested it woke up; on an idle loop that lag is ~0, while blocking code in an
+`async def` handler delays every other request by the same amount.
+
+Stall capture (debug mode): a watchdog thread checks the loop's heartbeat and,
+when it has not advanced for longer than the threshold, snapshots the loop
+thread's stack with sys._current_frames(), i.e. the code that is blocking.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+
+from metrics import Histogram
+
+
+class LoopLagMonitor:
+    """Continuous event-loop lag histogram plus an optional blocking-call detector"""
+
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.2,
+                 capture_stalls: bool = False, max_stalls: int = 50):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.capture_stalls = capture_stalls
+        self.lag_ms = Histogram()
+        self.stalls: deque = deque(maxlen=max_stalls)
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._lock = threading.Lock()
+
+    async def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._measure())
+        if self.capture_stalls:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            self._heartbeat = time.monotonic()
+            self.lag_ms.observe(max(now - start - self.interval, 0.0) * 1000)
+
+    def _watch(self):
+        """Watchdog thread: snapshot the loop thread's stack once per stall"""
+        check_every = min(self.stall_threshold / 2, 0.05)
+        stall: Optional[Dict] = None
+        while not self._stop.wait(check_every):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.stall_threshold:
+                stall = None
+                continue
+            if stall is not None and stall["heartbeat"] == heartbeat:
+                # Same stall still going: keep its duration up to date
+                stall["blocked_ms"] = round(blocked_for * 1000, 1)
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stall = {
+                "heartbeat": heartbeat,
+                "detected_at": time.time(),
+                "blocked_ms": round(blocked_for * 1000, 1),
+                "stack": traceback.format_stack(frame) if frame is not None else [],
+            }
+            with self._lock:
+                self.stalls.append(stall)
+
+    def recent_stalls(self, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            stalls = list(self.stalls)[-limit:] if limit > 0 else []
+        return [
+            {
+                "detected_at": s["detected_at"],
+                "blocked_ms": s["blocked_ms"],
+                "stack": [line.rstrip() for line in s["stack"]],
+            }
+            for s in reversed(stalls)
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "interval_ms": self.interval * 1000,
+            "lag_ms": self.lag_ms.snapshot(),
+            "stall_capture": self.capture_stalls,
+            "stall_threshold_ms": self.stall_threshold * 1000,
+            "stalls_captured": len(self.stalls),
+        }
@@ -9,18 +9,25 @@ Features:
 - Free to deploy on Render or HuggingFace Spaces
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, WebSocket, WebSocketDisconnect, Request, Header, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Union
 import numpy as np
 from PIL import Image
 import io
 import os
+import json
 from datetime import datetime
 import random
 import base64
+import time
+import functools
+import hmac
+import hashlib
+import secrets
 
 # ML/AI imports
 SKIP_TF = os.getenv('SKIP_TENSORFLOW', '1') == '1'  # Default to SKIP for Render free tier
@@ -49,12 +56,35 @@ else:
         PDF_AVAILABLE = False
 
 try:
-    from transformers import pipeline
+    import transformers  # the chatbot model itself is loaded lazily (chat_model.py)
     TRANSFORMERS_AVAILABLE = True
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
     print("⚠️ Transformers not available. Using rule-based chatbot.")
 
+from jobs import JobManager, JobStore, JobQueueFull, job_view
+from scan_filter import ScanPrefilter
+from result_store import ScanResultStore, scan_hash, is_scan_hash, model_fingerprint
+from uploads import ResumableUploads, UploadError
+from shadow import ShadowEvaluator
+from drift import DriftMonitor
+from case_index import CaseIndex, RecentEmbeddings
+from explainability import ExplainabilityController, DeferredScans
+from inference_profile import load_profile, apply_threading
+from procmem import memory_summary
+from loop_monitor import LoopLagMonitor
+from profiling import RequestProfiler, ProfilingMiddleware, PROFILE_MODES, profile_view
+from tracing import Tracer, JsonlSpanExporter, TracingMiddleware, current_span
+from intent_matcher import IntentMatcher
+from faq_retrieval import FaqIndex
+from chat_generation import GenerationWorker, GenerationQueueFull, generate_replies
+from metrics import Histogram
+from chat_sessions import SessionStore, estimate_tokens, new_session_id, is_session_id
+from chat_model import ChatModelManager, load_chat_model, DEFAULT_CHATBOT_MODEL
+from answer_cache import AnswerCache
+from hospital_index import load_hospital_index, haversine_km, format_distance, FLAG_NEUROLOGY
+from hospital_cache import HospitalTileCache, response_etag, etag_matches
+
 # ==================== FastAPI App ====================
 
 app = FastAPI(
@@ -81,16 +111,197 @@ app.add_middleware(
 # ==================== Global Variables ====================
 
 stroke_model = None
-chatbot = None
+mc_dropout_model = None
+chat_worker = None
+job_manager = None
+shadow_evaluator = None
+case_index = None
+embedding_model = None
+# Identity of the loaded stroke model (file hash, or "dummy"), part of every stored result's key
+stroke_model_id = "dummy"
+# Set by serve.py when the master process already loaded the models before forking
+models_preloaded = False
+# False when serve.py preloaded the models without the chatbot (--no-chatbot): workers load it
+chatbot_preloaded = True
+# Set by serve.py when the master requeued interrupted jobs before the workers share JOB_STORE_PATH
+jobs_recovered = False
+
+# Thread pools / XLA / batch size tuned for this machine by autotune_inference.py
+INFERENCE_PROFILE_PATH = os.getenv('INFERENCE_PROFILE_PATH', 'models/inference_profile.json')
+inference_profile = None
+
+# Similar-case retrieval index built by build_case_index.py
+CASE_INDEX_DIR = os.getenv('CASE_INDEX_DIR', 'models/case_index')
+
+# Admin endpoints require this token in the X-Admin-Token header (disabled when unset)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+# Key for the per-result tokens that gate stored results behind more than the scan hash
+# (random per start when unset: tokens then stop working after a restart)
+RESULT_TOKEN_KEY = (os.getenv('RESULT_TOKEN_KEY') or secrets.token_hex(32)).encode('utf-8')
+
+# Shadow evaluation of a candidate model on a fraction of live detection traffic
+SHADOW_MODEL_PATH = os.getenv('SHADOW_MODEL_PATH')
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', '0.1'))
+
+# Robust scoring: pixel offset of the shifted TTA variants and MC-dropout sample cap
+TTA_SHIFT_PIXELS = int(os.getenv('TTA_SHIFT_PIXELS', '4'))
+MAX_MC_SAMPLES = int(os.getenv('MAX_MC_SAMPLES', '16'))
+
+# Model input signature (grayscale) and tensor dtypes accepted from clients
+MODEL_INPUT_SIZE = (128, 128)
+TENSOR_DTYPES = (np.dtype(np.uint8), np.dtype(np.float16), np.dtype(np.float32))
+
+# Out-of-distribution pre-filter that rejects non-brain-scan uploads before the CNN runs
+scan_prefilter = ScanPrefilter(enabled=os.getenv('SCAN_PREFILTER', '1') == '1')
+
+# Results of previous scans keyed by content hash (RESULT_STORE_DIR adds a disk tier)
+scan_results = ScanResultStore(
+    max_entries=int(os.getenv('RESULT_CACHE_SIZE', '256')),
+    directory=os.getenv('RESULT_STORE_DIR') or None,
+    max_files=int(os.getenv('RESULT_STORE_MAX_FILES', '10000'))
+)
+
+# Streaming input-drift monitor compared against a profile of the training data
+drift_monitor = DriftMonitor.from_file(
+    os.getenv('DRIFT_REFERENCE_PATH', 'models/drift_reference.json'),
+    half_life=float(os.getenv('DRIFT_HALF_LIFE', '1000'))
+)
+
+# Load-adaptive Grad-CAM quality: full -> low_res -> heatmap -> deferred -> off
+# EXPLAIN_LEVEL pins a single level instead of adapting to load
+explainability = ExplainabilityController(
+    target_latency_ms=float(os.getenv('EXPLAIN_TARGET_LATENCY_MS', '1000')),
+    max_in_flight=int(os.getenv('EXPLAIN_MAX_IN_FLIGHT', '4')),
+    recover_after=float(os.getenv('EXPLAIN_RECOVER_SECONDS', '10')),
+    queue_depth=lambda: job_manager.queue_depth() if job_manager else 0,
+    fixed_level=os.getenv('EXPLAIN_LEVEL') or None
+)
+deferred_scans = DeferredScans(max_entries=int(os.getenv('DEFERRED_GRADCAM_SCANS', '64')))
+LOW_RES_OVERLAY_SIZE = int(os.getenv('LOW_RES_OVERLAY_SIZE', '256'))
+
+# Event-loop lag histogram; LOOP_STALL_CAPTURE=1 also records the stack of callbacks
+# that block the loop for longer than LOOP_STALL_THRESHOLD_MS
+loop_monitor = LoopLagMonitor(
+    interval=float(os.getenv('LOOP_LAG_INTERVAL_MS', '100')) / 1000,
+    stall_threshold=float(os.getenv('LOOP_STALL_THRESHOLD_MS', '200')) / 1000,
+    capture_stalls=os.getenv('LOOP_STALL_CAPTURE', '0') == '1'
+)
+
+# On-demand profiling of single requests (X-Profile: <PROFILE_TOKEN> or admin toggle)
+request_profiler = RequestProfiler(
+    token=os.getenv('PROFILE_TOKEN') or None,
+    max_profiles=int(os.getenv('PROFILE_RING_SIZE', '20')),
+    sample_interval=float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5')) / 1000
+)
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+# Request tracing (W3C traceparent), spans exported to a rotating JSONL file
+tracer = Tracer(
+    JsonlSpanExporter(
+        os.getenv('TRACE_EXPORT_PATH', 'traces/spans.jsonl'),
+        max_bytes=int(os.getenv('TRACE_MAX_MB', '10')) * 1024 ** 2,
+        backups=int(os.getenv('TRACE_BACKUPS', '3'))
+    ),
+    sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', '0.1')),
+    enabled=os.getenv('TRACING', '1') == '1'
+)
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+# Rule-based chatbot intents, compiled once into a word/phrase index
+intent_matcher = IntentMatcher.from_file(os.getenv('INTENTS_PATH', 'data/intents.json'))
+
+# Neurology knowledge base, BM25-indexed at startup; answers chat questions it is confident about
+faq_index = FaqIndex.from_file(
+    os.getenv('FAQ_PATH', 'data/faq.jsonl'),
+    min_confidence=float(os.getenv('FAQ_MIN_CONFIDENCE', '0.45'))
+)
+
+# Hospitals and neurology facilities from an OSM extract (build_hospital_index.py),
+# grid-indexed for radius / k-nearest queries; the built-in list is used without it
+hospital_index = load_hospital_index(os.getenv('HOSPITAL_INDEX_PATH', 'models/hospitals.npz'))
+
+# Candidate facilities cached per geohash tile + radius bucket, refined per exact point
+hospital_tiles = HospitalTileCache(
+    hospital_index,
+    precision=int(os.getenv('HOSPITAL_TILE_PRECISION', '5')),
+    max_tiles=int(os.getenv('HOSPITAL_TILE_CACHE_SIZE', '4096'))
+) if hospital_index is not None else None
+# Browsers and CDNs may reuse /api/hospitals responses for this long (then revalidate by ETag)
+HOSPITAL_CACHE_MAX_AGE = int(os.getenv('HOSPITAL_CACHE_MAX_AGE', '300'))
+
+# Penultimate-layer embeddings of recent detections, used as similar-case queries
+recent_embeddings = RecentEmbeddings(max_entries=int(os.getenv('EMBEDDING_CACHE_SIZE', '1024')))
+
+# Resumable (tus-style) chunked uploads, written straight to disk
+resumable_uploads = ResumableUploads(
+    directory=os.getenv('UPLOAD_DIR', 'uploads'),
+    max_bytes=int(os.getenv('UPLOAD_MAX_BYTES', str(1024 ** 3))),
+    ttl_seconds=int(os.getenv('UPLOAD_TTL_HOURS', '24')) * 3600
+)
+
+# Chatbot generation: concurrent requests are micro-batched into one generate() call
+CHAT_MAX_BATCH = int(os.getenv('CHAT_MAX_BATCH', '8'))
+CHAT_MAX_WAIT_MS = float(os.getenv('CHAT_MAX_WAIT_MS', '20'))
+CHAT_MAX_NEW_TOKENS = int(os.getenv('CHAT_MAX_NEW_TOKENS', '60'))
+CHAT_MAX_INPUT_TOKENS = int(os.getenv('CHAT_MAX_INPUT_TOKENS', '128'))
+CHAT_QUEUE_SIZE = int(os.getenv('CHAT_QUEUE_SIZE', '64'))
+
+# HuggingFace chatbot: loaded on first chat use (or at startup), optionally int8, unloaded when idle
+CHATBOT_MODEL = os.getenv('CHATBOT_MODEL', DEFAULT_CHATBOT_MODEL)
+CHATBOT_LOAD = os.getenv('CHATBOT_LOAD', 'lazy')  # lazy | startup
+CHATBOT_QUANTIZE = os.getenv('CHATBOT_QUANTIZE', '0') == '1'
+chat_model = ChatModelManager(
+    loader=lambda: load_chat_model(CHATBOT_MODEL, quantize=CHATBOT_QUANTIZE),
+    idle_unload=float(os.getenv('CHATBOT_IDLE_UNLOAD_MINUTES', '15')) * 60,
+    enabled=TRANSFORMERS_AVAILABLE
+)
+
+# Time from receiving a streamed chat request to sending its first token (perceived latency)
+chat_ttft_ms = Histogram()
+
+def count_chat_tokens(text: str) -> int:
+    """Chatbot tokenizer length of a text (estimated when no model is loaded)"""
+    model = chat_model.current
+    if model is not None:
+        return len(model.tokenizer.tokenize(text))
+    return estimate_tokens(text)
+
+# Per-session chat history: LRU across sessions with a global token cap and idle expiry
+chat_sessions = SessionStore(
+    max_sessions=int(os.getenv('CHAT_MAX_SESSIONS', '1000')),
+    max_total_tokens=int(os.getenv('CHAT_MEMORY_MAX_TOKENS', '500000')),
+    session_tokens=int(os.getenv('CHAT_SESSION_TOKENS', '512')),
+    ttl=float(os.getenv('CHAT_SESSION_TTL_MINUTES', '30')) * 60,
+    count_tokens=count_chat_tokens
+)
+
+# Answers to repeated questions (normalized: case, punctuation, stopwords, word endings)
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv('ANSWER_CACHE_SIZE', '2048')),
+    max_bytes=int(os.getenv('ANSWER_CACHE_MAX_MB', '8')) * 1024 ** 2,
+    ttl=float(os.getenv('ANSWER_CACHE_TTL_MINUTES', '60')) * 60
+)
+
+# Background job settings (JOB_STORE_PATH enables SQLite persistence)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '100'))
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH') or None
 
 # ==================== Models ====================
 
 class ChatMessage(BaseModel):
     message: str
+    session_id: Optional[str] = None  # Omit to start a new conversation
 
 class ChatResponse(BaseModel):
     response: str
     timestamp: str
+    source: Optional[str] = None  # faq | model | rules
+    queue_ms: Optional[float] = None  # Model replies: time waiting for a generation batch
+    generation_ms: Optional[float] = None  # Model replies: generate() time of that batch
+    session_id: Optional[str] = None
+    cached: bool = False  # Served from the answer cache
 
 class StrokeResult(BaseModel):
     prediction: str
@@ -101,6 +312,13 @@ class StrokeResult(BaseModel):
     recommendations: List[str]
     stroke_type: Optional[str] = None
     gradcam_image: Optional[str] = None
+    uncertainty: Optional[float] = None
+    robust_samples: Optional[int] = None
+    scan_id: Optional[str] = None
+    result_token: Optional[str] = None  # Proves the scan was uploaded: required by /api/scans/check and /api/similar-cases
+    cached: bool = False
+    explainability: Optional[str] = None  # Grad-CAM level served under the current load
+    gradcam_job_id: Optional[str] = None  # Set when the overlay was deferred to a background job
 
 class PDFRequest(BaseModel):
     patient_name: str
@@ -114,6 +332,24 @@ class PDFRequest(BaseModel):
     chatbot_advice: Optional[str] = None
     gradcam_base64: Optional[str] = None
 
+class JobRequest(BaseModel):
+    type: str  # "detection" or "report"
+    image_base64: Optional[str] = None
+    robust: bool = False
+    mc_samples: int = 0
+    report: Optional[PDFRequest] = None
+
+class ProfilingToggle(BaseModel):
+    count: int = 1  # Number of upcoming matching requests to profile (0 disarms)
+    path_prefix: str = "/"
+    mode: str = "sample"  # "sample" or "cprofile"
+
+class ScanCheckRequest(BaseModel):
+    sha256: str
+    result_token: Optional[str] = None  # From the earlier detection of the same scan
+    robust: bool = False
+    mc_samples: int = 0
+
 class Hospital(BaseModel):
     name: str
     address: str
@@ -122,19 +358,35 @@ class Hospital(BaseModel):
     url: str
     lat: float
     lon: float
+    distance_km: Optional[float] = None
+    neurology: bool = False
+    emergency: bool = False
 
 # ==================== Model Loading ====================
 
 def load_stroke_detection_model():
     """Load pre-trained CNN model for stroke detection"""
-    global stroke_model
+    global stroke_model, mc_dropout_model, inference_profile, stroke_model_id
+    
+    mc_dropout_model = None
+    stroke_model_id = "dummy"
     
     model_path = 'models/stroke_cnn_model.h5'
     
     if TENSORFLOW_AVAILABLE and os.path.exists(model_path):
+        # Thread pools must be sized before TensorFlow runs its first op
+        inference_profile = load_profile(INFERENCE_PROFILE_PATH)
+        if inference_profile is not None and apply_threading(tf, inference_profile):
+            print(f"⚙️ Inference profile: {inference_profile['intra_op_threads']} intra-op / "
+                  f"{inference_profile['inter_op_threads']} inter-op threads, "
+                  f"XLA {'on' if inference_profile['jit_compile'] else 'off'}, "
+                  f"batch size {inference_profile['batch_size']}")
         try:
-            stroke_model = keras.models.load_model(model_path)
-            print("✅ Stroke detection model loaded successfully!")
+            stroke_model = tune_model(keras.models.load_model(model_path))
+            # Warm up once so the predict function is built before threadpool stages call it
+            stroke_model.predict(np.zeros((1, 128, 128, 1), dtype=np.float32), verbose=0)
+            stroke_model_id = model_fingerprint(model_path)
+            print(f"✅ Stroke detection model loaded successfully! ({stroke_model_id})")
         except Exception as e:
             print(f"❌ Error loading model: {e}")
             stroke_model = None
@@ -142,35 +394,142 @@ def load_stroke_detection_model():
         print("⚠️ Using dummy stroke detection (model not found)")
         stroke_model = None
 
+def tune_model(model):
+    """Apply the autotuned XLA setting to a model used for inference"""
+    if inference_profile is not None and inference_profile.get('jit_compile'):
+        model.jit_compile = True
+    return model
+
+def predict_batch_size(rows: int) -> int:
+    """Rows per forward pass: the autotuned batch size, or the whole batch without a profile"""
+    if inference_profile is None:
+        return rows
+    return max(1, min(rows, int(inference_profile['batch_size'])))
+
 def load_chatbot():
-    """Load HuggingFace chatbot model"""
-    global chatbot
-    
-    if TRANSFORMERS_AVAILABLE:
-        try:
-            # Using a lightweight conversational model from HuggingFace
-            # Options: facebook/blenderbot-400M-distill, microsoft/DialoGPT-medium
-            chatbot = pipeline(
-                "conversational",
-                model="facebook/blenderbot-400M-distill",
-                device=-1  # CPU only for free deployment
-            )
-            print("✅ HuggingFace chatbot loaded successfully!")
-        except Exception as e:
-            print(f"❌ Error loading chatbot: {e}")
-            chatbot = None
-    else:
+    """Load HuggingFace chatbot model (CHATBOT_LOAD=startup); lazy mode loads it on first chat use"""
+    if not TRANSFORMERS_AVAILABLE:
         print("⚠️ Using rule-based chatbot")
-        chatbot = None
+        return
+    if CHATBOT_LOAD == 'startup':
+        chat_model.load()
+    else:
+        print("💤 HuggingFace chatbot will be loaded on first chat use")
+
+def generate_chat_replies(prompts: List[str], max_new_tokens: int, on_text=None) -> List[str]:
+    """Batched generation with the loaded chatbot (runs on the chat worker thread)"""
+    with chat_model.use() as model:
+        return generate_replies(model.tokenizer, model.model, prompts, max_new_tokens,
+                                CHAT_MAX_INPUT_TOKENS, on_text=on_text)
+
+def start_chat_worker():
+    """Start the generation worker and idle unloading when HuggingFace chat is available"""
+    global chat_worker
+    
+    if not TRANSFORMERS_AVAILABLE:
+        return
+    chat_model.start()
+    chat_worker = GenerationWorker(
+        generate_chat_replies,
+        max_batch=CHAT_MAX_BATCH,
+        max_wait=CHAT_MAX_WAIT_MS / 1000,
+        max_new_tokens=CHAT_MAX_NEW_TOKENS,
+        max_queue=CHAT_QUEUE_SIZE
+    )
+    chat_worker.start()
+    print(f"✅ Chat generation worker started (batch ≤ {CHAT_MAX_BATCH}, wait ≤ {CHAT_MAX_WAIT_MS:g} ms)")
+
+def load_case_index():
+    """Load the similar-case index and a model that returns embeddings alongside predictions"""
+    global case_index, embedding_model
+    
+    if not os.path.exists(os.path.join(CASE_INDEX_DIR, 'cases.json')):
+        print("⚠️ Similar-case index not found (run build_case_index.py)")
+        return
+    if not (TENSORFLOW_AVAILABLE and stroke_model):
+        print("⚠️ Similar-case search needs TensorFlow and the stroke model, skipping")
+        return
+    
+    try:
+        index = CaseIndex(CASE_INDEX_DIR)
+        if index.model_id != stroke_model_id:
+            print(f"⚠️ Similar-case index was built with model {index.model_id or 'unknown'}, "
+                  f"loaded model is {stroke_model_id}; rebuild it with build_case_index.py")
+            return
+        case_index = index
+        # Same forward pass, two outputs: penultimate-layer embedding and prediction
+        embedding_model = tune_model(keras.Model(
+            inputs=stroke_model.input,
+            outputs=[stroke_model.layers[-1].input, stroke_model.output]
+        ))
+        embedding_model.predict(np.zeros((1, 128, 128, 1), dtype=np.float32), verbose=0)
+        print(f"✅ Similar-case index loaded ({case_index.count} cases)")
+    except Exception as e:
+        print(f"❌ Error loading similar-case index: {e}")
+        case_index = None
+        embedding_model = None
+
+def start_shadow_evaluation():
+    """Start the background shadow worker when a candidate model is configured"""
+    global shadow_evaluator
+    
+    if not SHADOW_MODEL_PATH:
+        return
+    if not (TENSORFLOW_AVAILABLE and stroke_model):
+        print("⚠️ Shadow evaluation needs TensorFlow and a production model, skipping")
+        return
+    if not os.path.exists(SHADOW_MODEL_PATH):
+        print(f"⚠️ Shadow model not found: {SHADOW_MODEL_PATH}")
+        return
+    
+    shadow_evaluator = ShadowEvaluator(
+        SHADOW_MODEL_PATH,
+        loader=keras.models.load_model,
+        sample_rate=SHADOW_SAMPLE_RATE
+    )
+    shadow_evaluator.start()
 
 # Load models on startup
 @app.on_event("startup")
 async def startup_event():
-    load_stroke_detection_model()
-    load_chatbot()
+    global job_manager
+    await loop_monitor.start()
+    if tracer.enabled:
+        tracer.exporter.start()
+    if not models_preloaded:
+        load_stroke_detection_model()
+        load_chatbot()
+        load_case_index()
+    elif not chatbot_preloaded:
+        load_chatbot()
+    start_shadow_evaluation()
+    start_chat_worker()
+    
+    job_manager = JobManager(
+        JobStore(db_path=JOB_STORE_PATH),
+        handlers={
+            "detection": traced_job(run_detection_job),
+            "report": traced_job(run_report_job),
+            "gradcam": traced_job(run_gradcam_job)
+        },
+        workers=JOB_WORKERS,
+        max_queue=JOB_QUEUE_SIZE
+    )
+    await job_manager.start(recover=not jobs_recovered)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await loop_monitor.stop()
+    tracer.exporter.stop()
+    if chat_worker:
+        chat_worker.stop()
+    chat_model.stop()
+    if job_manager:
+        await job_manager.stop()
 
 # ==================== Helper Functions ====================
 
+@tracer.traced("preprocess")
 def preprocess_image(image: Image.Image, target_size=(128, 128)):
     """Preprocess image for CNN model"""
     # Convert to grayscale for stroke detection (model trained on grayscale)
@@ -245,6 +604,30 @@ def generate_gradcam_heatmap(img_array, model, last_conv_layer_name='conv2d_3'):
         print(f"Grad-CAM error: {e}")
         return None
 
+def generate_activation_heatmap(img_array, model, last_conv_layer_name='conv2d_3'):
+    """
+    Gradient-free class activation map for the degraded explainability levels:
+    channel mean of the last conv layer's activations, from a forward pass that
+    stops at that layer (no gradient tape, no classifier head)
+    """
+    try:
+        if not TENSORFLOW_AVAILABLE or model is None:
+            return None
+        
+        feature_model = keras.Model(
+            inputs=[model.input],
+            outputs=[model.get_layer(last_conv_layer_name).output]
+        )
+        conv_outputs = feature_model(img_array, training=False)[0]
+        heatmap = tf.reduce_mean(conv_outputs, axis=-1)
+        heatmap = tf.maximum(heatmap, 0) / tf.maximum(tf.math.reduce_max(heatmap), 1e-8)
+        return heatmap.numpy()
+        
+    except Exception as e:
+        print(f"Activation map error: {e}")
+        return None
+
+@tracer.traced("gradcam.encode")
 def create_gradcam_overlay(original_image, heatmap):
     """
     Create visual overlay of Grad-CAM heatmap on original image
@@ -274,6 +657,25 @@ def create_gradcam_overlay(original_image, heatmap):
         print(f"Overlay error: {e}")
         return None
 
+@tracer.traced("gradcam.encode")
+def create_heatmap_image(heatmap, size=MODEL_INPUT_SIZE):
+    """
+    Colored Grad-CAM heatmap on its own, at model resolution
+    Cheaper than an overlay: no full-resolution resize or blend, small PNG
+    """
+    try:
+        heatmap_resized = cv2.resize(heatmap, size)
+        heatmap_colored = cv2.applyColorMap(np.uint8(255 * heatmap_resized), cv2.COLORMAP_JET)
+        heatmap_colored = cv2.cvtColor(heatmap_colored, cv2.COLOR_BGR2RGB)
+        
+        buffer = io.BytesIO()
+        Image.fromarray(heatmap_colored).save(buffer, format='PNG')
+        return base64.b64encode(buffer.getvalue()).decode()
+        
+    except Exception as e:
+        print(f"Heatmap error: {e}")
+        return None
+
 def classify_stroke_type(confidence: float, image_features: dict) -> str:
     """
     Classify type of stroke based on confidence and image analysis
@@ -287,6 +689,438 @@ def classify_stroke_type(confidence: float, image_features: dict) -> str:
     else:
         return "Likely Hemorrhagic Stroke"
 
+@tracer.traced("decode")
+def decode_scan(source: Union[bytes, str]) -> Image.Image:
+    """Decode uploaded scan bytes (or a scan file on disk) into a PIL image"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    image = Image.open(source)
+    image.load()
+    return image
+
+@tracer.traced("prefilter")
+def prefilter_scan(image: Image.Image):
+    """Reject obvious non-brain-scan images (HTTP 422) before the expensive model stages"""
+    reason = scan_prefilter.check(image)
+    if reason is not None:
+        raise HTTPException(
+            status_code=422,
+            detail=f"This does not look like a brain CT/MRI scan: {reason}. Please upload a brain scan image."
+        )
+
+def run_stroke_model(batch, scan_id: Optional[str] = None) -> np.ndarray:
+    """
+    Forward pass of the production model, returns the stroke probability per row
+    With the similar-case index loaded, the same pass also captures the
+    penultimate-layer embedding of the first row for /api/similar-cases
+    """
+    if embedding_model is not None and scan_id is not None:
+        embeddings, predictions = embedding_model.predict(batch, batch_size=predict_batch_size(len(batch)), verbose=0)
+        recent_embeddings.put(scan_id, embeddings[0])
+    else:
+        predictions = stroke_model.predict(batch, batch_size=predict_batch_size(len(batch)), verbose=0)
+    return predictions[:, 0]
+
+def predict_stroke(image: Image.Image, processed_image, scan_id: Optional[str] = None):
+    """
+    Run the CNN on a preprocessed scan (or the dummy analysis in lite mode)
+    Returns: (confidence percentage, stroke_detected)
+    """
+    if stroke_model and TENSORFLOW_AVAILABLE:
+        # Use actual CNN model
+        prediction = run_stroke_model(processed_image, scan_id)
+        confidence = float(prediction[0]) * 100
+        stroke_detected = confidence > 50
+    else:
+        # Use dummy analysis based on image features
+        risk_score = analyze_image_features(image)
+        confidence = risk_score * 100
+        stroke_detected = risk_score > 0.5
+    
+    return confidence, stroke_detected
+
+def shift_image(img: np.ndarray, dy: int, dx: int) -> np.ndarray:
+    """Shift an (H, W, C) image by (dy, dx) pixels, filling the exposed border with black"""
+    shifted = np.zeros_like(img)
+    h, w = img.shape[:2]
+    shifted[max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)] = \
+        img[max(-dy, 0):h + min(-dy, 0), max(-dx, 0):w + min(-dx, 0)]
+    return shifted
+
+@tracer.traced("tta.batch")
+def build_tta_batch(processed_image: np.ndarray) -> np.ndarray:
+    """
+    Stack test-time augmentation variants of a (1, H, W, C) scan into one batch:
+    original, horizontal flip and small shifts in each direction
+    """
+    base = processed_image[0]
+    s = TTA_SHIFT_PIXELS
+    variants = [base, base[:, ::-1]]
+    for dy, dx in ((s, 0), (-s, 0), (0, s), (0, -s)):
+        variants.append(shift_image(base, dy, dx))
+    return np.stack(variants)
+
+def get_mc_dropout_model():
+    """
+    Copy of the stroke model with Dropout kept active at inference time
+    The layers (and weights) are shared with stroke_model; BatchNorm stays in
+    inference mode, unlike calling the whole model with training=True
+    Only Sequential models can be rebuilt this way; returns None otherwise
+    """
+    global mc_dropout_model
+    
+    if mc_dropout_model is not None or stroke_model is None:
+        return mc_dropout_model
+    if not isinstance(stroke_model, keras.Sequential):
+        return None
+    
+    class MCDropout(keras.layers.Dropout):
+        def call(self, inputs, training=None):
+            return super().call(inputs, training=True)
+    
+    layers = [
+        MCDropout(layer.rate) if isinstance(layer, keras.layers.Dropout) else layer
+        for layer in stroke_model.layers
+    ]
+    mc_dropout_model = tune_model(keras.Sequential([keras.Input(shape=stroke_model.input_shape[1:])] + layers))
+    return mc_dropout_model
+
+def predict_stroke_robust(image: Image.Image, processed_image, mc_samples: int = 0,
+                          scan_id: Optional[str] = None):
+    """
+    Robust scoring: all TTA variants (and optional MC-dropout samples of each)
+    are scored in a single batched forward pass
+    Returns: (mean confidence, stroke_detected, uncertainty, number of samples)
+    uncertainty is the standard deviation of the sample confidences in percentage points
+    """
+    if not (stroke_model and TENSORFLOW_AVAILABLE):
+        confidence, stroke_detected = predict_stroke(image, processed_image)
+        return confidence, stroke_detected, None, 1
+    
+    batch = build_tta_batch(processed_image)
+    model = stroke_model
+    
+    mc_samples = min(max(mc_samples, 0), MAX_MC_SAMPLES)
+    if mc_samples > 0:
+        mc_model = get_mc_dropout_model()
+        if mc_model is not None:
+            batch = np.repeat(batch, mc_samples, axis=0)
+            model = mc_model
+    
+    if model is stroke_model:
+        # Row 0 is the untouched scan, so its embedding is captured in the same pass
+        probabilities = run_stroke_model(batch, scan_id) * 100
+    else:
+        probabilities = model.predict(batch, batch_size=predict_batch_size(len(batch)), verbose=0)[:, 0] * 100
+    confidence = float(np.mean(probabilities))
+    uncertainty = float(np.std(probabilities))
+    
+    return confidence, confidence > 50, uncertainty, len(batch)
+
+def offer_shadow_sample(processed_image, confidence: float, predict_start: float,
+                        scan_id: Optional[str], robust: bool = False):
+    """Queue a single-pass prediction for shadow comparison (never blocks)"""
+    if shadow_evaluator is None or robust:
+        return
+    predict_ms = (time.perf_counter() - predict_start) * 1000
+    shadow_evaluator.offer(processed_image, confidence, predict_ms, scan_id)
+
+@tracer.traced("gradcam")
+def build_gradcam_overlay(image: Image.Image, processed_image, level: str = "full") -> Optional[str]:
+    """
+    Generate the base64 Grad-CAM image for a scan (None when unavailable)
+    level: "full" overlay at scan resolution, "low_res" overlay on a thumbnail,
+    "heatmap" the colored heatmap alone at model resolution; the degraded levels
+    use the gradient-free activation map instead of the Grad-CAM gradient pass
+    """
+    if not (stroke_model and TENSORFLOW_AVAILABLE):
+        return None
+    
+    try:
+        if level == "full":
+            heatmap = generate_gradcam_heatmap(processed_image, stroke_model)
+        else:
+            heatmap = generate_activation_heatmap(processed_image, stroke_model)
+        if heatmap is None:
+            return None
+        if level == "heatmap":
+            return create_heatmap_image(heatmap)
+        if level == "low_res" and max(image.size) > LOW_RES_OVERLAY_SIZE:
+            image = image.copy()
+            image.thumbnail((LOW_RES_OVERLAY_SIZE, LOW_RES_OVERLAY_SIZE))
+        return create_gradcam_overlay(image, heatmap)
+    except Exception as e:
+        print(f"Grad-CAM generation failed: {e}")
+    return None
+
+def explain_scan(image: Image.Image, processed_image, scan_id: str, cache_key: str, level: str):
+    """
+    Produce the Grad-CAM output for the chosen explainability level
+    Returns: (gradcam base64 or None, deferred job ID or None, level actually served)
+    """
+    if level == "off":
+        return None, None, level
+    if level == "deferred":
+        if job_manager is None:
+            return None, None, "off"
+        deferred_scans.put(scan_id, image, processed_image)
+        try:
+            job = job_manager.submit_threadsafe(
+                "gradcam", trace_payload({"scan_id": scan_id, "cache_key": cache_key})
+            )
+        except JobQueueFull:
+            deferred_scans.pop(scan_id)
+            return None, None, "off"
+        return None, job["id"], level
+    return build_gradcam_overlay(image, processed_image, level), None, level
+
+def store_result(cache_key: str, result: StrokeResult):
+    """Store a finished result; heatmap-only or missing overlays are not kept, so a repeat
+    upload once load subsides gets the full explanation"""
+    if result.explainability in ("full", "low_res", "deferred"):
+        stored = result.model_dump(exclude={"result_token"})
+        # Repeat uploads served from the store skip the forward pass that captures the
+        # embedding, so it is kept with the result for /api/similar-cases
+        embedding = recent_embeddings.get(result.scan_id) if result.scan_id else None
+        if embedding is not None:
+            stored["embedding"] = embedding.tolist()
+        scan_results.put(cache_key, stored)
+
+def build_stroke_result(confidence: float, stroke_detected: bool,
+                        gradcam_overlay_base64: Optional[str] = None,
+                        uncertainty: Optional[float] = None,
+                        robust_samples: Optional[int] = None) -> StrokeResult:
+    """Turn a model confidence into the full detection response"""
+    # Classify stroke type
+    stroke_type = classify_stroke_type(confidence, {})
+    
+    # Determine risk level
+    if confidence > 80:
+        risk_level = "High"
+    elif confidence > 60:
+        risk_level = "Moderate"
+    else:
+        risk_level = "Low"
+    
+    # Generate recommendations
+    recommendations = []
+    if stroke_detected:
+        recommendations = [
+            "⚠️ Potential stroke indicators detected",
+            "🏥 Consult a neurologist immediately",
+            "📞 Call emergency services if experiencing symptoms",
+            "🗺️ Check nearby hospitals for immediate care",
+            "📋 Download the medical report and bring to your doctor"
+        ]
+    else:
+        recommendations = [
+            "✅ No immediate stroke indicators detected",
+            "🏥 Regular checkups are still recommended",
+            "💪 Maintain healthy lifestyle habits",
+            "📊 Monitor your blood pressure regularly",
+            "🥗 Follow a brain-healthy diet"
+        ]
+    
+    return StrokeResult(
+        prediction="Stroke Risk Detected" if stroke_detected else "No Stroke Detected",
+        confidence=round(confidence, 2),
+        stroke_detected=stroke_detected,
+        risk_level=risk_level,
+        timestamp=datetime.now().isoformat(),
+        recommendations=recommendations,
+        stroke_type=stroke_type,
+        gradcam_image=gradcam_overlay_base64,
+        uncertainty=round(uncertainty, 2) if uncertainty is not None else None,
+        robust_samples=robust_samples
+    )
+
+@tracer.traced("predict")
+def score_scan(image: Image.Image, processed_image, robust: bool = False, mc_samples: int = 0,
+               scan_id: Optional[str] = None):
+    """
+    Score a scan with either a single forward pass or robust (TTA / MC-dropout) scoring
+    Returns: (confidence, stroke_detected, uncertainty, robust_samples)
+    """
+    if robust:
+        return predict_stroke_robust(image, processed_image, mc_samples, scan_id)
+    confidence, stroke_detected = predict_stroke(image, processed_image, scan_id)
+    return confidence, stroke_detected, None, None
+
+def result_token(scan_id: str) -> str:
+    """Secret returned only to whoever uploaded the scan: the scan hash alone is no credential"""
+    return hmac.new(RESULT_TOKEN_KEY, scan_id.encode('ascii'), hashlib.sha256).hexdigest()[:32]
+
+def valid_result_token(scan_id: str, token: Optional[str]) -> bool:
+    return bool(token) and hmac.compare_digest(token.encode('latin-1'), result_token(scan_id).encode('ascii'))
+
+def result_cache_key(scan_id: str, robust: bool = False, mc_samples: int = 0) -> str:
+    """Store key for a scan under the loaded model and a given scoring mode"""
+    if not robust:
+        return ScanResultStore.key(scan_id, model=stroke_model_id)
+    mc_samples = min(max(mc_samples, 0), MAX_MC_SAMPLES)
+    return ScanResultStore.key(scan_id, f"robust-mc{mc_samples}", model=stroke_model_id)
+
+@tracer.traced("result_store.lookup")
+def cached_stroke_result(cache_key: str) -> Optional[StrokeResult]:
+    cached = scan_results.get(cache_key)
+    if cached is None:
+        return None
+    if cached.get("embedding") is not None and cached.get("scan_id"):
+        recent_embeddings.put(cached["scan_id"], np.asarray(cached["embedding"], dtype=np.float32))
+    result = {key: value for key, value in cached.items() if key != "embedding"}
+    if result.get("scan_id"):
+        result["result_token"] = result_token(result["scan_id"])
+    return StrokeResult(**{**result, "cached": True})
+
+def stored_embedding(scan_id: str) -> Optional[np.ndarray]:
+    """Embedding kept with a stored result of the scan (after a restart or an LRU eviction)"""
+    for cache_key in (result_cache_key(scan_id), result_cache_key(scan_id, robust=True)):
+        stored = scan_results.get(cache_key)
+        if stored is not None and stored.get("embedding") is not None:
+            embedding = np.asarray(stored["embedding"], dtype=np.float32)
+            recent_embeddings.put(scan_id, embedding)
+            return embedding
+    return None
+
+def annotate_span(scan_id: Optional[str] = None, robust: Optional[bool] = None, **attributes):
+    """Tag the current trace span with the scan being processed"""
+    span = current_span()
+    if span is None or not span.sampled:
+        return
+    if scan_id is not None:
+        span.set_attribute("scan.id", scan_id)
+    if robust is not None:
+        span.set_attribute("scan.robust", robust)
+    for key, value in attributes.items():
+        span.set_attribute(f"scan.{key}", value)
+
+def trace_payload(payload: Dict) -> Dict:
+    """Attach the current traceparent so a background job continues the request's trace"""
+    span = current_span()
+    if span is not None:
+        payload["traceparent"] = span.traceparent
+    return payload
+
+def run_stroke_detection(contents: bytes, robust: bool = False, mc_samples: int = 0) -> StrokeResult:
+    """Run the detection pipeline on uploaded scan bytes"""
+    return analyze_scan(contents, scan_hash(contents), robust, mc_samples)
+
+def analyze_scan(source: Union[bytes, str], scan_id: str,
+                 robust: bool = False, mc_samples: int = 0) -> StrokeResult:
+    """
+    Full detection pipeline: decode -> pre-filter -> preprocess -> predict -> Grad-CAM -> result
+    source is the scan bytes or a path to the scan on disk
+    Scans that were analysed before are answered from the hash-indexed result store
+    """
+    annotate_span(scan_id, robust)
+    cache_key = result_cache_key(scan_id, robust, mc_samples)
+    cached = cached_stroke_result(cache_key)
+    if cached is not None:
+        annotate_span(cached=True)
+        return cached
+    
+    image = decode_scan(source)
+    prefilter_scan(image)
+    pipeline_start = time.perf_counter()
+    
+    # Preprocess for model
+    processed_image = preprocess_image(image)
+    
+    return finish_analysis(image, processed_image, scan_id, cache_key,
+                           robust, mc_samples, pipeline_start)
+
+def finish_analysis(image: Image.Image, processed_image, scan_id: str, cache_key: str,
+                    robust: bool, mc_samples: int, pipeline_start: float,
+                    decoded: bool = True) -> StrokeResult:
+    """Model stages shared by every input path: predict -> Grad-CAM -> result -> store
+    (decoded=False: image is only a view of a client tensor, kept out of the drift size/mode features)"""
+    with explainability.track():
+        # Make prediction
+        predict_start = time.perf_counter()
+        confidence, stroke_detected, uncertainty, robust_samples = score_scan(
+            image, processed_image, robust, mc_samples, scan_id
+        )
+        offer_shadow_sample(processed_image, confidence, predict_start, scan_id, robust)
+        drift_monitor.observe(image if decoded else None, processed_image, confidence)
+        
+        # Generate Grad-CAM visualization at the quality the current load allows
+        gradcam_overlay_base64, gradcam_job_id, level = explain_scan(
+            image, processed_image, scan_id, cache_key, explainability.choose()
+        )
+        # Includes the explanation, so degrading it lowers the latency the controller sees
+        explainability.record_latency(time.perf_counter() - pipeline_start)
+    scan_prefilter.record_pipeline_time(time.perf_counter() - pipeline_start)
+    
+    result = build_stroke_result(confidence, stroke_detected, gradcam_overlay_base64,
+                                 uncertainty, robust_samples)
+    result.scan_id = scan_id
+    result.result_token = result_token(scan_id)
+    result.explainability = level
+    result.gradcam_job_id = gradcam_job_id
+    store_result(cache_key, result)
+    return result
+
+@tracer.traced("tensor.parse")
+def parse_tensor_payload(body: bytes, shape_header: Optional[str] = None,
+                         dtype_header: Optional[str] = None) -> np.ndarray:
+    """
+    Wrap a client-preprocessed tensor without decoding or copying it
+    Accepts a .npy file (format 1.0 or 2.0), or a raw uint8/float16/float32 buffer
+    described by X-Tensor-Shape / X-Tensor-Dtype headers; returns a (1, 128, 128, 1)
+    array. Float tensors must already be scaled to [0, 1]
+    """
+    if body[:6] == b'\x93NUMPY':
+        header = io.BytesIO(body)
+        version = np.lib.format.read_magic(header)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+        else:
+            raise ValueError(f".npy format {version[0]}.{version[1]} is not supported, save with format 1.0 or 2.0")
+        if fortran_order:
+            raise ValueError("Fortran-ordered .npy arrays are not supported")
+        offset = header.tell()
+    else:
+        if not shape_header or not dtype_header:
+            raise ValueError("Raw tensors need X-Tensor-Shape and X-Tensor-Dtype headers")
+        shape = tuple(int(dim) for dim in shape_header.split(','))
+        dtype = np.dtype(dtype_header.strip())
+        offset = 0
+    
+    dtype = np.dtype(dtype)
+    if dtype not in TENSOR_DTYPES:
+        raise ValueError(f"Unsupported tensor dtype {dtype}, use uint8, float16 or float32")
+    if int(np.prod(shape)) != MODEL_INPUT_SIZE[0] * MODEL_INPUT_SIZE[1]:
+        raise ValueError(f"Tensor shape {shape} does not match the model input "
+                         f"{MODEL_INPUT_SIZE[0]}x{MODEL_INPUT_SIZE[1]}x1")
+    
+    tensor = np.frombuffer(body, dtype=dtype, count=int(np.prod(shape)), offset=offset)
+    tensor = tensor.reshape((1, MODEL_INPUT_SIZE[0], MODEL_INPUT_SIZE[1], 1))
+    if dtype == np.uint8:
+        # Same scaling as preprocess_image
+        tensor = tensor / np.float32(255.0)
+    elif not np.isfinite(tensor).all() or tensor.min() < 0 or tensor.max() > 1:
+        raise ValueError("Float tensors must be finite and scaled to [0, 1]")
+    return tensor
+
+def analyze_tensor(tensor: np.ndarray, scan_id: str,
+                   robust: bool = False, mc_samples: int = 0) -> StrokeResult:
+    """Detection pipeline for client-preprocessed tensors: skips decode and resize"""
+    cache_key = result_cache_key(scan_id, robust, mc_samples)
+    cached = cached_stroke_result(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Small grayscale view of the tensor for the pre-filter, lite-mode analysis and overlay
+    pixels = np.clip(tensor[0, :, :, 0].astype(np.float32) * 255.0, 0, 255).astype(np.uint8)
+    image = Image.fromarray(pixels).convert('RGB')
+    prefilter_scan(image)
+    
+    return finish_analysis(image, tensor, scan_id, cache_key,
+                           robust, mc_samples, time.perf_counter(), decoded=False)
+
+@tracer.traced("report.pdf")
 def generate_medical_pdf(report_data: PDFRequest) -> str:
     """
     Generate comprehensive medical PDF report
@@ -491,234 +1325,16 @@ def generate_medical_pdf(report_data: PDFRequest) -> str:
         raise HTTPException(status_code=500, detail=f"Failed to generate PDF: {str(e)}")
 
 def get_rule_based_response(message: str) -> str:
-    """Rule-based chatbot responses for neurology Q&A"""
-    message_lower = message.lower()
-    
-    # Greetings
-    if any(word in message_lower for word in ['hello', 'hi', 'hey', 'greetings']):
-        return "Hello! I'm BrainCare AI Bot, your neurology health assistant. I can help you understand stroke symptoms, prevention, and brain health. What would you like to know?"
-    
-    # Stroke symptoms
-    elif any(word in message_lower for word in ['symptom', 'symptoms', 'signs', 'warning']):
-        return """🚨 **Common Stroke Symptoms (Remember F.A.S.T.):**
-
-• **F**ace drooping - One side of the face feels numb or droops
-• **A**rm weakness - One arm feels weak or numb
-• **S**peech difficulty - Speech is slurred or hard to understand
-• **T**ime to call emergency - Call 108/112 immediately!
-
-**Other Warning Signs:**
-- Sudden confusion or trouble understanding
-- Sudden trouble seeing in one or both eyes
-- Sudden severe headache with no known cause
-- Sudden dizziness, loss of balance, or coordination
-
-⏰ Time is brain! Every minute counts in stroke treatment."""
-    
-    # Prevention
-    elif any(word in message_lower for word in ['prevent', 'prevention', 'avoid', 'reduce risk']):
-        return """💪 **Stroke Prevention Strategies:**
-
-✓ **Control Blood Pressure:** Keep it under 120/80 mmHg
-✓ **Exercise Regularly:** 30 minutes daily, 5 days a week
-✓ **Healthy Diet:** Mediterranean diet with fruits, vegetables, whole grains
-✓ **Quit Smoking:** Doubles stroke risk when smoking
-✓ **Limit Alcohol:** No more than 1-2 drinks per day
-✓ **Manage Diabetes:** Keep blood sugar in healthy range
-✓ **Maintain Healthy Weight:** BMI between 18.5-24.9
-✓ **Reduce Stress:** Practice meditation, yoga, or mindfulness
-✓ **Regular Checkups:** Monitor cholesterol and heart health
-
-📊 These changes can reduce stroke risk by up to 80%!"""
-    
-    # Types of stroke
-    elif any(word in message_lower for word in ['type', 'types', 'kind', 'ischemic', 'hemorrhagic']):
-        return """🧠 **Types of Strokes:**
-
-1. **Ischemic Stroke (87% of cases)**
-   - Caused by blocked blood vessel in brain
-   - Due to blood clots or plaque buildup
-   - Treatment: Clot-busting drugs, thrombectomy
-
-2. **Hemorrhagic Stroke (13% of cases)**
-   - Caused by burst blood vessel in brain
-   - Due to high blood pressure, aneurysm, trauma
-   - Treatment: Surgery to stop bleeding, reduce pressure
-
-3. **TIA - Transient Ischemic Attack (Mini-Stroke)**
-   - Temporary blockage, symptoms last < 24 hours
-   - Warning sign of future stroke
-   - Requires immediate medical attention
-
-Each type requires different treatment - early diagnosis is crucial!"""
-    
-    # Risk factors
-    elif any(word in message_lower for word in ['risk', 'factor', 'causes', 'who']):
-        return """⚠️ **Stroke Risk Factors:**
-
-**Controllable Risk Factors:**
-- High blood pressure (most important!)
-- Smoking & tobacco use
-- Diabetes
-- High cholesterol
-- Obesity & physical inactivity
-- Poor diet
-- Excessive alcohol consumption
-- Drug use
-- Sleep apnea
-
-**Non-Controllable Risk Factors:**
-- Age (55+ years higher risk)
-- Family history & genetics
-- Gender (slightly higher in men)
-- Previous stroke or TIA
-- Race (higher in African Americans)
-
-Focus on what you CAN control to reduce your risk!"""
-    
-    # Treatment
-    elif any(word in message_lower for word in ['treatment', 'treat', 'cure', 'therapy', 'recover']):
-        return """⚕️ **Stroke Treatment:**
-
-**Emergency Treatment (First 3-4.5 hours):**
-- Ischemic: tPA (clot-busting drug)
-- Mechanical thrombectomy to remove clot
-- Hemorrhagic: Surgery to stop bleeding
-
-**Rehabilitation:**
-- Physical therapy - restore movement
-- Speech therapy - improve communication
-- Occupational therapy - relearn daily tasks
-- Cognitive therapy - improve memory & thinking
-- Emotional support - manage depression & anxiety
-
-⏰ **"Time is Brain"** - Get treatment within 3-4.5 hours for best outcomes!
-
-Many stroke survivors regain independence with proper treatment and rehabilitation."""
-    
-    # Diet
-    elif any(word in message_lower for word in ['diet', 'food', 'eat', 'nutrition']):
-        return """🥗 **Brain-Healthy Diet for Stroke Prevention:**
-
-**Foods to EAT:**
-- Leafy greens (spinach, kale)
-- Fatty fish (salmon, sardines, mackerel)
-- Berries (blueberries, strawberries)
-- Nuts & seeds (walnuts, almonds)
-- Whole grains (oats, brown rice)
-- Olive oil & avocados
-- Legumes (beans, lentils)
-- Dark chocolate (70%+ cacao)
-
-**Foods to LIMIT:**
-- Salt/sodium
-- Saturated fats
-- Trans fats
-- Processed foods
-- Sugary drinks
-- Red meat
-
-🫒 **Mediterranean Diet** is excellent for brain health and stroke prevention!"""
-    
-    # Recovery
-    elif any(word in message_lower for word in ['recovery', 'recover', 'rehabilitation', 'after stroke']):
-        return """🌟 **Stroke Recovery & Rehabilitation:**
-
-**Recovery Timeline:**
-- Most recovery happens in first 3-6 months
-- Improvement can continue for years
-- Every person's journey is unique
-
-**Rehabilitation Types:**
-- Physical therapy (movement, balance, coordination)
-- Speech-language therapy (speaking, swallowing)
-- Occupational therapy (daily activities)
-- Cognitive therapy (memory, attention, problem-solving)
-
-**Keys to Successful Recovery:**
-✓ Start rehabilitation early
-✓ Be consistent with therapy
-✓ Stay motivated & positive
-✓ Get family support
-✓ Prevent second stroke
-✓ Manage emotions
-✓ Set realistic goals
-
-💪 With dedication, many survivors regain independence and return to meaningful activities!"""
-    
-    # Emergency
-    elif any(word in message_lower for word in ['emergency', '108', '112', 'urgent', 'help']):
-        return """🚨 **EMERGENCY STROKE CARE:**
-
-**If you suspect a stroke, ACT IMMEDIATELY:**
-
-1. **Call Emergency Services:**
-   - India: 108 (Ambulance) or 112 (Emergency)
-   - US: 911
-   - UK: 999
-
-2. **Note the Time:** When symptoms started (critical for treatment)
-
-3. **Do NOT:**
-   - Drive yourself to hospital
-   - Eat or drink anything
-   - Take any medication without medical advice
-
-4. **While Waiting:**
-   - Keep person calm and comfortable
-   - Loosen tight clothing
-   - Monitor breathing
-   - Don't leave them alone
-
-⏰ **Every second counts!** Treatment within 3-4.5 hours can prevent permanent brain damage.
-
-Use our Stroke Detection tool if you have brain scan images."""
-    
-    # Brain health
-    elif any(word in message_lower for word in ['brain', 'memory', 'cognition', 'mental']):
-        return """🧠 **Brain Health & Wellness:**
-
-**Keep Your Brain Sharp:**
-- Learn new skills & languages
-- Read books & solve puzzles
-- Stay socially active
-- Get 7-9 hours quality sleep
-- Manage stress effectively
-- Exercise regularly (boosts brain blood flow)
-- Meditate or practice mindfulness
-
-**Brain-Boosting Activities:**
-- Music (playing or listening)
-- Dancing
-- Art & creativity
-- Games (chess, sudoku)
-- Learning an instrument
-- Teaching others
-
-**Neuroprotective Habits:**
-✓ Stay hydrated
-✓ Limit screen time
-✓ Spend time in nature
-✓ Practice gratitude
-✓ Maintain purpose & meaning
-
-Your brain is like a muscle - use it or lose it!"""
-    
-    # Default response
-    else:
-        return """I can help you with information about:
-
-🔹 **Stroke Symptoms** - Warning signs & F.A.S.T. method
-🔹 **Prevention** - How to reduce stroke risk
-🔹 **Types of Strokes** - Ischemic, Hemorrhagic, TIA
-🔹 **Risk Factors** - What increases stroke risk
-🔹 **Treatment** - Emergency care & rehabilitation
-🔹 **Diet & Nutrition** - Brain-healthy foods
-🔹 **Recovery** - Rehabilitation & healing
-🔹 **Emergency Care** - What to do in a stroke
-🔹 **Brain Health** - Tips for cognitive wellness
-
-What would you like to know about? 😊"""
+    """Rule-based chatbot responses for neurology Q&A (compiled intent table in data/intents.json)"""
+    return intent_matcher.respond(message)
+
+def emergency_response(message: str) -> Optional[str]:
+    """The emergency answer whenever the message matches the emergency intent, even alongside
+    a greeting or a question; checked before the answer cache and the knowledge base, so an
+    emergency never gets a general passage"""
+    if "emergency" not in intent_matcher.matches(message):
+        return None
+    return intent_matcher.responses[intent_matcher.names.index("emergency")]
 
 # ==================== API Endpoints ====================
 
@@ -731,9 +1347,12 @@ async def root():
         "status": "running",
         "endpoints": {
             "stroke_detection": "/api/detect-stroke",
+            "stroke_detection_stream": "/ws/detect-stroke",
             "chatbot": "/api/chat",
             "hospitals": "/api/hospitals",
             "wellness_tip": "/api/wellness-tip",
+            "jobs": "/api/jobs",
+            "resumable_uploads": "/api/uploads",
             "health": "/api/health"
         }
     }
@@ -746,16 +1365,21 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "services": {
             "stroke_model": "loaded" if stroke_model else "dummy",
-            "chatbot": "loaded" if chatbot else "rule-based"
+            "chatbot": chat_model.stats()["state"] if TRANSFORMERS_AVAILABLE else "rule-based",
+            "faq_passages": faq_index.count,
+            "hospital_facilities": hospital_index.count if hospital_index else 0,
+            "jobs_queued": job_manager.queue_depth() if job_manager else 0
         }
     }
 
 @app.post("/api/detect-stroke", response_model=StrokeResult)
-async def detect_stroke(file: UploadFile = File(...)):
+async def detect_stroke(file: UploadFile = File(...), robust: bool = False, mc_samples: int = 0):
     """
     Detect stroke from uploaded brain scan image (MRI/CT)
     Accepts: JPG, PNG, DICOM formats
     Returns: Stroke prediction with confidence score + Grad-CAM visualization
+    robust=true scores flip/shift TTA variants (plus mc_samples MC-dropout samples each)
+    in one batched pass and adds an uncertainty estimate
     """
     try:
         # Validate file type
@@ -765,87 +1389,372 @@ async def detect_stroke(file: UploadFile = File(...)):
                 detail="Invalid file type. Please upload an image file (JPG, PNG)."
             )
         
-        # Read and process image
+        # Read and process image (model stages run in the threadpool, off the event loop)
         contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        
-        # Preprocess for model
-        processed_image = preprocess_image(image)
-        
-        # Initialize variables
-        gradcam_overlay_base64 = None
-        stroke_type = None
-        
-        # Make prediction
-        if stroke_model and TENSORFLOW_AVAILABLE:
-            # Use actual CNN model
-            prediction = stroke_model.predict(processed_image, verbose=0)
-            confidence = float(prediction[0][0]) * 100
-            stroke_detected = confidence > 50
-            
-            # Generate Grad-CAM visualization
-            try:
-                heatmap = generate_gradcam_heatmap(processed_image, stroke_model)
-                if heatmap is not None:
-                    gradcam_overlay_base64 = create_gradcam_overlay(image, heatmap)
-            except Exception as e:
-                print(f"Grad-CAM generation failed: {e}")
-        else:
-            # Use dummy analysis based on image features
-            risk_score = analyze_image_features(image)
-            confidence = risk_score * 100
-            stroke_detected = risk_score > 0.5
-        
-        # Classify stroke type
-        stroke_type = classify_stroke_type(confidence, {})
-        
-        # Determine risk level
-        if confidence > 80:
-            risk_level = "High"
-        elif confidence > 60:
-            risk_level = "Moderate"
-        else:
-            risk_level = "Low"
-        
-        # Generate recommendations
-        recommendations = []
-        if stroke_detected:
-            recommendations = [
-                "⚠️ Potential stroke indicators detected",
-                "🏥 Consult a neurologist immediately",
-                "📞 Call emergency services if experiencing symptoms",
-                "🗺️ Check nearby hospitals for immediate care",
-                "📋 Download the medical report and bring to your doctor"
-            ]
-        else:
-            recommendations = [
-                "✅ No immediate stroke indicators detected",
-                "🏥 Regular checkups are still recommended",
-                "💪 Maintain healthy lifestyle habits",
-                "📊 Monitor your blood pressure regularly",
-                "🥗 Follow a brain-healthy diet"
-            ]
-        
-        return StrokeResult(
-            prediction="Stroke Risk Detected" if stroke_detected else "No Stroke Detected",
-            confidence=round(confidence, 2),
-            stroke_detected=stroke_detected,
-            risk_level=risk_level,
-            timestamp=datetime.now().isoformat(),
-            recommendations=recommendations,
-            stroke_type=stroke_type,
-            gradcam_image=gradcam_overlay_base64
+        return await run_in_threadpool(run_stroke_detection, contents, robust, mc_samples)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+@app.post("/api/detect-stroke/tensor", response_model=StrokeResult)
+async def detect_stroke_tensor(
+    request: Request,
+    robust: bool = False,
+    mc_samples: int = 0,
+    x_tensor_shape: Optional[str] = Header(None),
+    x_tensor_dtype: Optional[str] = Header(None)
+):
+    """
+    Detect stroke from a client-preprocessed tensor (128x128 grayscale)
+    Body: a .npy file, or a raw buffer with X-Tensor-Shape (e.g. "128,128,1")
+    and X-Tensor-Dtype (uint8, float16 or float32; floats scaled to [0, 1])
+    Skips image decoding and resizing, and is ~16 KB per scan as uint8
+    """
+    body = await request.body()
+    try:
+        tensor = parse_tensor_payload(body, x_tensor_shape, x_tensor_dtype)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tensor: {str(e)}")
+    
+    try:
+        return await run_in_threadpool(analyze_tensor, tensor, scan_hash(body), robust, mc_samples)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing tensor: {str(e)}")
+
+@app.websocket("/ws/detect-stroke")
+async def detect_stroke_stream(websocket: WebSocket):
+    """
+    Progressive stroke detection over WebSocket
+    Send a scan as a binary message; the server pushes one JSON message per stage
+    as soon as it is ready: accepted -> decoded -> prediction -> overlay -> complete
+    The connection stays open, so several scans can be sent one after another
+    Query parameters robust / mc_samples work as on /api/detect-stroke
+    """
+    robust = websocket.query_params.get('robust', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        mc_samples = int(websocket.query_params.get('mc_samples', '0'))
+    except ValueError:
+        await websocket.close(code=1008, reason="mc_samples must be an integer")
+        return
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            contents = message.get("bytes")
+            if contents is None:
+                await websocket.send_json({"stage": "error", "detail": "Send the scan as a binary message"})
+                continue
+            # Each scan sent over the socket is traced like an HTTP request
+            with tracer.start_trace("WS /ws/detect-stroke"):
+                scan_id = await run_in_threadpool(scan_hash, contents)
+                annotate_span(scan_id, robust)
+                await websocket.send_json({"stage": "accepted", "bytes": len(contents), "scan_id": scan_id})
+                
+                try:
+                    # Repeat scans are answered straight from the result store
+                    cache_key = result_cache_key(scan_id, robust, mc_samples)
+                    cached = await run_in_threadpool(cached_stroke_result, cache_key)
+                    if cached is not None:
+                        await websocket.send_json({
+                            "stage": "prediction",
+                            "result": cached.model_dump(exclude={"gradcam_image"})
+                        })
+                        await websocket.send_json({"stage": "overlay", "gradcam_image": cached.gradcam_image})
+                        await websocket.send_json({"stage": "complete"})
+                        continue
+                    
+                    # Blocking stages run in the threadpool so each message is flushed immediately
+                    image = await run_in_threadpool(decode_scan, contents)
+                    await websocket.send_json({
+                        "stage": "decoded",
+                        "width": image.width,
+                        "height": image.height,
+                        "mode": image.mode
+                    })
+                    
+                    await run_in_threadpool(prefilter_scan, image)
+                    with explainability.track():
+                        pipeline_start = time.perf_counter()
+                        processed_image = await run_in_threadpool(preprocess_image, image)
+                        predict_start = time.perf_counter()
+                        confidence, stroke_detected, uncertainty, robust_samples = await run_in_threadpool(
+                            score_scan, image, processed_image, robust, mc_samples, scan_id
+                        )
+                        offer_shadow_sample(processed_image, confidence, predict_start, scan_id, robust)
+                        drift_monitor.observe(image, processed_image, confidence)
+                        result = build_stroke_result(confidence, stroke_detected, None, uncertainty, robust_samples)
+                        result.scan_id = scan_id
+                        result.result_token = result_token(scan_id)
+                        result.explainability = explainability.choose()
+                        await websocket.send_json({
+                            "stage": "prediction",
+                            "result": result.model_dump(exclude={"gradcam_image"})
+                        })
+                        
+                        gradcam_overlay_base64, result.gradcam_job_id, result.explainability = await run_in_threadpool(
+                            explain_scan, image, processed_image, scan_id, cache_key, result.explainability
+                        )
+                        explainability.record_latency(time.perf_counter() - pipeline_start)
+                    scan_prefilter.record_pipeline_time(time.perf_counter() - pipeline_start)
+                    await websocket.send_json({
+                        "stage": "overlay",
+                        "gradcam_image": gradcam_overlay_base64,
+                        "explainability": result.explainability,
+                        "gradcam_job_id": result.gradcam_job_id
+                    })
+                    
+                    result.gradcam_image = gradcam_overlay_base64
+                    store_result(cache_key, result)
+                    
+                    await websocket.send_json({"stage": "complete"})
+                except HTTPException as e:
+                    await websocket.send_json({"stage": "error", "detail": e.detail})
+                except Exception as e:
+                    await websocket.send_json({"stage": "error", "detail": f"Error processing image: {str(e)}"})
+    
+    except WebSocketDisconnect:
+        pass
+
+# ==================== Resumable Uploads API ====================
+
+def upload_headers(upload: Dict) -> Dict[str, str]:
+    return {
+        "Upload-Offset": str(upload["offset"]),
+        "Upload-Length": str(upload["length"]),
+        "Cache-Control": "no-store"
+    }
+
+def get_upload_or_error(upload_id: str) -> Dict:
+    try:
+        return resumable_uploads.get(upload_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.post("/api/uploads", status_code=201)
+async def create_upload(
+    upload_length: int = Header(...),
+    upload_filename: str = Header(''),
+    upload_content_type: str = Header('')
+):
+    """
+    Start a resumable upload (tus-style)
+    Headers: Upload-Length (total bytes), optional Upload-Filename / Upload-Content-Type
+    Then PATCH chunks to the returned Location and POST .../finalize when complete
+    """
+    try:
+        upload = resumable_uploads.create(upload_length, upload_filename, upload_content_type)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    location = f"/api/uploads/{upload['id']}"
+    return JSONResponse(
+        status_code=201,
+        content={"upload_id": upload["id"], "location": location, "offset": 0, "length": upload["length"]},
+        headers={**upload_headers(upload), "Location": location}
+    )
+
+@app.head("/api/uploads/{upload_id}")
+async def get_upload_offset(upload_id: str):
+    """Current offset of an upload, used by clients to resume after a failure"""
+    upload = get_upload_or_error(upload_id)
+    return Response(status_code=200, headers=upload_headers(upload))
+
+@app.patch("/api/uploads/{upload_id}")
+async def append_upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    upload_checksum: Optional[str] = Header(None)
+):
+    """
+    Append a chunk at Upload-Offset; the body is streamed straight to disk
+    Optional Upload-Checksum: '<sha256|sha1|md5> <base64 digest>' of this chunk
+    """
+    try:
+        offset = await resumable_uploads.append(upload_id, upload_offset, request.stream(), upload_checksum)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    return Response(status_code=204, headers={"Upload-Offset": str(offset), "Cache-Control": "no-store"})
+
+@app.post("/api/uploads/{upload_id}/finalize", response_model=StrokeResult)
+async def finalize_upload(upload_id: str, robust: bool = False, mc_samples: int = 0):
+    """Hand the fully assembled file to the detection pipeline"""
+    upload = get_upload_or_error(upload_id)
+    if not resumable_uploads.is_complete(upload):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {upload['offset']} of {upload['length']} bytes received"
         )
     
+    path = resumable_uploads.data_path(upload_id)
+    try:
+        scan_id = await run_in_threadpool(resumable_uploads.file_hash, upload_id)
+        result = await run_in_threadpool(analyze_scan, path, scan_id, robust, mc_samples)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+    
+    # The result is kept in the scan result store, so the raw upload can go
+    resumable_uploads.delete(upload_id)
+    return result
+
+@app.delete("/api/uploads/{upload_id}", status_code=204)
+async def delete_upload(upload_id: str):
+    """Abort an upload and discard the received bytes"""
+    get_upload_or_error(upload_id)
+    resumable_uploads.delete(upload_id)
+    return Response(status_code=204)
+
+@app.post("/api/scans/check")
+async def check_scan(check_request: ScanCheckRequest):
+    """
+    Check-by-hash before upload: send the SHA-256 of the scan bytes first
+    If the scan was analysed before, its result (with Grad-CAM overlay) is returned
+    and no upload is needed; otherwise upload it to /api/detect-stroke
+    The hash is no credential (it is echoed as scan_id): without the result_token of
+    the earlier detection the answer is always "not found", so the bytes must be sent
+    """
+    sha256 = check_request.sha256.lower()
+    if not is_scan_hash(sha256):
+        raise HTTPException(status_code=400, detail="sha256 must be a 64-character hex digest")
+    if not valid_result_token(sha256, check_request.result_token):
+        return {"found": False, "scan_id": sha256, "upload_url": "/api/detect-stroke"}
+    
+    cache_key = result_cache_key(sha256, check_request.robust, check_request.mc_samples)
+    result = await run_in_threadpool(cached_stroke_result, cache_key)
+    if result is None:
+        return {"found": False, "scan_id": sha256, "upload_url": "/api/detect-stroke"}
+    return {"found": True, "scan_id": sha256, "result": result}
+
+@app.get("/api/scans/stats")
+async def get_scan_store_stats():
+    """Result store size and hit rate"""
+    return scan_results.stats()
+
+@app.get("/api/similar-cases")
+async def get_similar_cases(scan_id: str, result_token: str = "", k: int = 5, nprobe: int = 8):
+    """
+    Most similar known stroke and normal training cases for a detected scan
+    scan_id, result_token: as returned by /api/detect-stroke (embedding captured during detection)
+    """
+    if not (is_scan_hash(scan_id) and valid_result_token(scan_id, result_token)):
+        raise HTTPException(status_code=403, detail="A valid result_token for this scan_id is required")
+    if case_index is None:
+        raise HTTPException(status_code=503, detail="Similar-case index is not loaded")
+    
+    embedding = recent_embeddings.get(scan_id)
+    if embedding is None:
+        embedding = await run_in_threadpool(stored_embedding, scan_id)
+    if embedding is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No embedding for this scan_id; run /api/detect-stroke first (without mc_samples)"
+        )
+    
+    start = time.perf_counter()
+    cases = case_index.search(embedding, k=min(max(k, 1), 50), nprobe=max(nprobe, 1))
+    return {
+        "scan_id": scan_id,
+        "cases": cases,
+        "search_ms": round((time.perf_counter() - start) * 1000, 3)
+    }
+
+@app.get("/api/similar-cases/{case_id}/image")
+async def get_similar_case_image(case_id: int):
+    """Image of a case returned by /api/similar-cases"""
+    if case_index is None:
+        raise HTTPException(status_code=503, detail="Similar-case index is not loaded")
+    if not 0 <= case_id < case_index.count:
+        raise HTTPException(status_code=404, detail="Case not found")
+    
+    path = case_index.paths[case_id]
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Case image is not available on this server")
+    return FileResponse(path)
+
+@app.get("/api/drift")
+async def get_input_drift():
+    """
+    Drift of incoming scans vs the training data profile
+    PSI per feature: < 0.1 stable, 0.1-0.25 moderate, >= 0.25 significant
+    """
+    return drift_monitor.report()
+
+@app.get("/api/prefilter/stats")
+async def get_prefilter_stats():
+    """Scan pre-filter rejection rate, reasons and estimated compute saved"""
+    return scan_prefilter.stats()
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Prometheus text exposition of the server's histograms"""
+    body = loop_monitor.lag_ms.prometheus(
+        "brainhealth_event_loop_lag_ms", "Delay of scheduled event-loop callbacks in milliseconds"
+    )
+    body += chat_ttft_ms.prometheus(
+        "brainhealth_chat_ttft_ms", "Time to first token of streamed chat replies in milliseconds"
+    )
+    body += answer_cache.prometheus("brainhealth_chat_answer_cache")
+    if hospital_tiles is not None:
+        body += hospital_tiles.prometheus("brainhealth_hospital_tile_cache")
+    if chat_worker is not None:
+        body += chat_worker.queue_ms.prometheus(
+            "brainhealth_chat_queue_ms", "Time chat prompts waited for a generation batch in milliseconds"
+        )
+        body += chat_worker.generation_ms.prometheus(
+            "brainhealth_chat_generation_ms", "Duration of batched chatbot generate() calls in milliseconds"
+        )
+        body += chat_worker.batch_size.prometheus(
+            "brainhealth_chat_batch_size", "Prompts per chatbot generate() call"
+        )
+    return Response(content=body, media_type="text/plain; version=0.0.4")
+
+@app.get("/api/explainability")
+async def get_explainability_stats():
+    """Current Grad-CAM quality level, load pressure and how often each level was served"""
+    return explainability.stats()
+
+def chat_session_id(message: ChatMessage) -> str:
+    """Session of a chat message: the client's, or a new one"""
+    if message.session_id is None:
+        return new_session_id()
+    if not is_session_id(message.session_id):
+        raise HTTPException(status_code=400, detail="Invalid session_id")
+    return message.session_id
+
+def cached_chat_answer(user_message: str, session_id: str) -> Optional[tuple]:
+    """(answer, source) of an equivalent earlier question; model replies only for a
+    conversation's first turn, since later ones depend on the history"""
+    if chat_sessions.has_history(session_id):
+        return answer_cache.get(user_message, sources=("faq", "rules"))
+    return answer_cache.get(user_message)
+
+def cache_chat_answer(user_message: str, session_id: str, response_text: str, source: str):
+    """Remember an answer unless it depends on the conversation (model reply to a later
+    turn) or stood in for a model that was loading or busy (rules while a model is configured)"""
+    if source == "model" and chat_sessions.has_history(session_id):
+        return
+    if source == "rules" and chat_worker is not None:
+        return
+    answer_cache.put(user_message, response_text, source)
 
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(message: ChatMessage):
     """
     AI Chatbot endpoint for neurology Q&A
-    Uses HuggingFace model or rule-based responses
+    Emergencies get the emergency answer first. Repeated questions are answered
+    from the answer cache; otherwise from the FAQ knowledge base when retrieval
+    is confident, else the HuggingFace model or rule-based responses
     """
+    session_id = chat_session_id(message)
     try:
         user_message = message.message.strip()
         
@@ -853,80 +1762,271 @@ async def chat(message: ChatMessage):
             raise HTTPException(status_code=400, detail="Message cannot be empty")
         
         # Generate response
-        if chatbot and TRANSFORMERS_AVAILABLE:
-            # Use HuggingFace chatbot
-            from transformers import Conversation
-            conversation = Conversation(user_message)
-            result = chatbot(conversation)
-            response_text = result.generated_responses[-1]
+        reply = None
+        emergency = emergency_response(user_message)
+        cached = cached_chat_answer(user_message, session_id) if emergency is None else None
+        passage = faq_index.best(user_message) if emergency is None and cached is None else None
+        if emergency is not None:
+            response_text, source = emergency, "rules"
+        elif cached is not None:
+            response_text, source = cached
+        elif passage is not None:
+            response_text, source = passage["answer"], "faq"
+        elif chat_worker is not None and chat_model.wake():
+            # HuggingFace chatbot, batched with concurrent requests off the event loop
+            try:
+                prompt = chat_sessions.prompt(session_id, user_message, CHAT_MAX_INPUT_TOKENS)
+                reply = await chat_worker.generate(prompt)
+                response_text, source = reply["text"], "model"
+            except GenerationQueueFull:
+                response_text, source = get_rule_based_response(user_message), "rules"
         else:
             # Use rule-based responses
-            response_text = get_rule_based_response(user_message)
+            response_text, source = get_rule_based_response(user_message), "rules"
+        if emergency is None and cached is None:
+            cache_chat_answer(user_message, session_id, response_text, source)
+        chat_sessions.append(session_id, user_message, response_text)
         
         return ChatResponse(
             response=response_text,
-            timestamp=datetime.now().strftime('%H:%M:%S')
+            timestamp=datetime.now().strftime('%H:%M:%S'),
+            source=source,
+            queue_ms=reply["queue_ms"] if reply else None,
+            generation_ms=reply["generation_ms"] if reply else None,
+            session_id=session_id,
+            cached=cached is not None
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
 
+@app.post("/api/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """
+    Streaming variant of /api/chat (Server-Sent Events)
+    `token` events carry model text as it is generated; cached, knowledge-base
+    and rule-based answers are sent at once as a single token. A final `done`
+    event holds the full reply, its source and the timings.
+    """
+    user_message = message.message.strip()
+    if not user_message:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    session_id = chat_session_id(message)
+    received = time.perf_counter()
+    
+    async def event_stream():
+        ttft_ms = None
+        
+        def token_event(text: str) -> str:
+            nonlocal ttft_ms
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - received) * 1000
+                chat_ttft_ms.observe(ttft_ms)
+            return f"event: token\ndata: {json.dumps({'text': text})}\n\n"
+        
+        reply = None
+        emergency = emergency_response(user_message)
+        cached = cached_chat_answer(user_message, session_id) if emergency is None else None
+        passage = faq_index.best(user_message) if emergency is None and cached is None else None
+        if emergency is not None:
+            response_text, source = emergency, "rules"
+        elif cached is not None:
+            response_text, source = cached
+        elif passage is not None:
+            response_text, source = passage["answer"], "faq"
+        elif chat_worker is not None and chat_model.wake():
+            try:
+                prompt = chat_sessions.prompt(session_id, user_message, CHAT_MAX_INPUT_TOKENS)
+                async for kind, value in chat_worker.stream(prompt):
+                    if kind == "token":
+                        yield token_event(value)
+                    else:
+                        reply = value
+                response_text, source = reply["text"], "model"
+            except GenerationQueueFull:
+                response_text, source = get_rule_based_response(user_message), "rules"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'detail': f'Error generating response: {e}'})}\n\n"
+                return
+        else:
+            response_text, source = get_rule_based_response(user_message), "rules"
+        
+        if source != "model" or cached is not None:
+            yield token_event(response_text)
+        if emergency is None and cached is None:
+            cache_chat_answer(user_message, session_id, response_text, source)
+        chat_sessions.append(session_id, user_message, response_text)
+        done = {
+            "response": response_text,
+            "timestamp": datetime.now().strftime('%H:%M:%S'),
+            "source": source,
+            "session_id": session_id,
+            "cached": cached is not None,
+            "ttft_ms": round(ttft_ms, 2) if ttft_ms is not None else None,
+            "queue_ms": reply["queue_ms"] if reply else None,
+            "generation_ms": reply["generation_ms"] if reply else None
+        }
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/chat/stats")
+async def get_chat_stats():
+    """Chat generation worker: batch sizes, queue and generation time; streamed time to first token;
+    answer cache hit rate"""
+    if chat_worker is None:
+        return {"running": False, "backend": "faq + rule-based", "ttft_ms": chat_ttft_ms.snapshot(),
+                "sessions": chat_sessions.stats(), "answer_cache": answer_cache.stats()}
+    return {**chat_worker.stats(), "ttft_ms": chat_ttft_ms.snapshot(), "sessions": chat_sessions.stats(),
+            "model": chat_model.stats(), "answer_cache": answer_cache.stats()}
+
+@app.get("/api/chat/sessions/{session_id}")
+async def get_chat_session(session_id: str):
+    """Stored history of a chat session"""
+    history = chat_sessions.history(session_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return history
+
+@app.delete("/api/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """Forget a chat session's history"""
+    if not chat_sessions.clear(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"session_id": session_id, "deleted": True}
+
+@app.get("/api/faq/search")
+async def search_faq(q: str, k: int = 5):
+    """BM25 search of the chatbot knowledge base (top-k passages with confidence)"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    start = time.perf_counter()
+    results = faq_index.search(q, k=max(1, min(k, 20)))
+    return {
+        "query": q,
+        "results": results,
+        "min_confidence": faq_index.min_confidence,
+        "took_ms": round((time.perf_counter() - start) * 1000, 3)
+    }
+
+# Built-in hospitals, served (nearest first, regardless of radius) when no OSM index is built
+FALLBACK_HOSPITALS = [
+    Hospital(
+        name="Andhra Pradesh Government Hospital",
+        address="Vijayawada, Andhra Pradesh",
+        distance="",
+        phone="+91-866-2474142",
+        url="https://www.apgovthospitals.in",
+        lat=16.5062,
+        lon=80.6480
+    ),
+    Hospital(
+        name="Apollo Hospitals",
+        address="Sarita Vihar, New Delhi, 110076",
+        distance="",
+        phone="+91-11-26825000",
+        url="https://www.apollohospitals.com",
+        lat=28.5355,
+        lon=77.2893
+    ),
+    Hospital(
+        name="Fortis Hospital",
+        address="Okhla Road, New Delhi, 110025",
+        distance="",
+        phone="+91-11-47135000",
+        url="https://www.fortishealthcare.com",
+        lat=28.5494,
+        lon=77.2751
+    ),
+    Hospital(
+        name="Max Super Specialty Hospital",
+        address="Saket, New Delhi, 110017",
+        distance="",
+        phone="+91-11-26515050",
+        url="https://www.maxhealthcare.in",
+        lat=28.5244,
+        lon=77.2066
+    ),
+    Hospital(
+        name="Indraprastha Apollo Hospital",
+        address="Sarita Vihar, New Delhi, 110076",
+        distance="",
+        phone="+91-11-26825000",
+        url="https://www.apollohospitals.com/locations/delhi-indraprastha-apollo-hospital/",
+        lat=28.5355,
+        lon=77.2893
+    )
+]
+
 @app.get("/api/hospitals")
-async def get_nearby_hospitals(lat: float = 28.6139, lon: float = 77.2090, radius: int = 10):
+async def get_nearby_hospitals(lat: float = 28.6139, lon: float = 77.2090, radius: float = 10,
+                               k: int = 20, neurology: bool = False,
+                               if_none_match: Optional[str] = Header(None)):
     """
     Get nearby neurology hospitals using OpenStreetMap
     Default location: New Delhi, India
+    Up to k facilities within `radius` km, nearest first; radius=0 returns the
+    k nearest at any distance. neurology=true keeps neurology facilities only.
+    Responses carry an ETag and are cacheable; If-None-Match gets 304 when unchanged.
     """
-    # Mock hospital data (in production, use Overpass API for OpenStreetMap)
-    hospitals = [
-        Hospital(
-            name="Andhra Pradesh Government Hospital",
-            address="Vijayawada, Andhra Pradesh",
-            distance="",
-            phone="+91-866-2474142",
-            url="https://www.apgovthospitals.in",
-            lat=16.5062,
-            lon=80.6480
-        ),
-        Hospital(
-            name="Apollo Hospitals",
-            address="Sarita Vihar, New Delhi, 110076",
-            distance="5.8 km",
-            phone="+91-11-26825000",
-            url="https://www.apollohospitals.com",
-            lat=28.5355,
-            lon=77.2893
-        ),
-        Hospital(
-            name="Fortis Hospital",
-            address="Okhla Road, New Delhi, 110025",
-            distance="4.2 km",
-            phone="+91-11-47135000",
-            url="https://www.fortishealthcare.com",
-            lat=28.5494,
-            lon=77.2751
-        ),
-        Hospital(
-            name="Max Super Specialty Hospital",
-            address="Saket, New Delhi, 110017",
-            distance="6.1 km",
-            phone="+91-11-26515050",
-            url="https://www.maxhealthcare.in",
-            lat=28.5244,
-            lon=77.2066
-        ),
-        Hospital(
-            name="Indraprastha Apollo Hospital",
-            address="Sarita Vihar, New Delhi, 110076",
-            distance="5.5 km",
-            phone="+91-11-26825000",
-            url="https://www.apollohospitals.com/locations/delhi-indraprastha-apollo-hospital/",
-            lat=28.5355,
-            lon=77.2893
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(status_code=400, detail="lat must be in [-90, 90] and lon in [-180, 180]")
+    k = max(1, min(k, 100))
+    start = time.perf_counter()
+    
+    cached = False
+    if hospital_tiles is not None:
+        facilities, cached = hospital_tiles.search(
+            lat, lon,
+            radius_km=radius if radius > 0 else None,
+            k=k,
+            require_flags=FLAG_NEUROLOGY if neurology else 0
         )
-    ]
+        hospitals = [Hospital(**f, distance=format_distance(f["distance_km"])) for f in facilities]
+        source = "osm"
+    else:
+        distances = haversine_km(lat, lon, [h.lat for h in FALLBACK_HOSPITALS], [h.lon for h in FALLBACK_HOSPITALS])
+        hospitals = [
+            FALLBACK_HOSPITALS[i].model_copy(update={
+                "distance": format_distance(distances[i]),
+                "distance_km": round(float(distances[i]), 2)
+            })
+            for i in distances.argsort(kind='stable')[:k]
+        ]
+        source = "builtin"
     
-    return {"hospitals": hospitals, "count": len(hospitals)}
+    results = [h.model_dump() for h in hospitals]
+    # Weak ETag over the results only: took_ms and cached vary between equal responses
+    etag = response_etag({"source": source, "hospitals": results})
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={HOSPITAL_CACHE_MAX_AGE}"}
+    if etag_matches(if_none_match, etag):
+        if hospital_tiles is not None:
+            hospital_tiles.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    
+    return JSONResponse(
+        content={
+            "hospitals": results,
+            "count": len(results),
+            "source": source,
+            "cached": cached,
+            "took_ms": round((time.perf_counter() - start) * 1000, 3)
+        },
+        headers=headers
+    )
+
+@app.get("/api/hospitals/stats")
+async def get_hospital_stats():
+    """Facility index size and tile cache hit rate"""
+    return {
+        "source": "osm" if hospital_index is not None else "builtin",
+        "index": hospital_index.stats() if hospital_index is not None else None,
+        "tile_cache": hospital_tiles.stats() if hospital_tiles is not None else None
+    }
 
 @app.get("/api/wellness-tip")
 async def get_wellness_tip():
@@ -1056,6 +2156,226 @@ async def send_email_invites(email_request: EmailShareRequest):
     }
 
 
+# ==================== Background Jobs API ====================
+
+def traced_job(handler):
+    """Run a job handler as a trace continuing the submitting request, with its queue wait as a span"""
+    @functools.wraps(handler)
+    def wrapper(job_id: str, payload: Dict):
+        job = job_manager.store.get(job_id) if job_manager else None
+        with tracer.start_trace(f"job {job['kind'] if job else handler.__name__}",
+                                payload.get('traceparent'), kind='consumer') as span:
+            span.set_attribute("job.id", job_id)
+            if job is not None and span.sampled:
+                queued = tracer.span("job.queue_wait")
+                queued.start_ns = int(job["created_at"] * 1e9)
+                queued.end()
+            return handler(job_id, payload)
+    return wrapper
+
+def run_detection_job(job_id: str, payload: Dict) -> Dict:
+    """Job handler: run the detection pipeline on a base64-encoded scan"""
+    contents = base64.b64decode(payload['image_base64'])
+    return run_stroke_detection(
+        contents, payload.get('robust', False), payload.get('mc_samples', 0)
+    ).model_dump()
+
+def run_report_job(job_id: str, payload: Dict) -> Dict:
+    """Job handler: build the PDF report and expose it for download"""
+    filename = generate_medical_pdf(PDFRequest(**payload['report']))
+    return {
+        "report_file": os.path.basename(filename),
+        "download_url": f"/api/jobs/{job_id}/report"
+    }
+
+def run_gradcam_job(job_id: str, payload: Dict) -> Dict:
+    """Job handler: full Grad-CAM overlay for a detection whose explanation was deferred under load"""
+    pending = deferred_scans.pop(payload['scan_id'])
+    if pending is None:
+        raise RuntimeError("Scan is no longer available for a deferred Grad-CAM")
+    
+    image, processed_image = pending
+    gradcam_overlay_base64 = build_gradcam_overlay(image, processed_image)
+    
+    # Complete the stored result so repeat uploads get the overlay directly
+    stored = scan_results.get(payload['cache_key'])
+    if stored is not None and gradcam_overlay_base64 is not None:
+        scan_results.put(payload['cache_key'], {
+            **stored,
+            "gradcam_image": gradcam_overlay_base64,
+            "explainability": "full",
+            "gradcam_job_id": None
+        })
+    return {"scan_id": payload['scan_id'], "gradcam_image": gradcam_overlay_base64}
+
+def get_job_or_404(job_id: str) -> Dict:
+    job = job_manager.store.get(job_id) if job_manager else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(job_request: JobRequest):
+    """
+    Queue a detection or report job and return its ID immediately
+    Poll /api/jobs/{job_id} (optionally with ?wait=N) or stream /api/jobs/{job_id}/events
+    """
+    if job_request.type == "detection":
+        if not job_request.image_base64:
+            raise HTTPException(status_code=400, detail="image_base64 is required for detection jobs")
+        try:
+            base64.b64decode(job_request.image_base64, validate=True)
+        except Exception:
+            raise HTTPException(status_code=400, detail="image_base64 is not valid base64")
+        payload = {
+            "image_base64": job_request.image_base64,
+            "robust": job_request.robust,
+            "mc_samples": job_request.mc_samples
+        }
+    elif job_request.type == "report":
+        if job_request.report is None:
+            raise HTTPException(status_code=400, detail="report is required for report jobs")
+        payload = {"report": job_request.report.model_dump()}
+    else:
+        raise HTTPException(status_code=400, detail="Job type must be 'detection' or 'report'")
+    
+    if job_manager is None:
+        raise HTTPException(status_code=503, detail="Job service is not running")
+    try:
+        job = job_manager.submit(job_request.type, trace_payload(payload))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {
+        **job_view(job),
+        "status_url": f"/api/jobs/{job['id']}",
+        "events_url": f"/api/jobs/{job['id']}/events"
+    }
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Get job status and result
+    wait: long-poll up to this many seconds (max 60) for the job to finish
+    """
+    get_job_or_404(job_id)
+    job = await job_manager.wait(job_id, timeout=min(max(wait, 0), 60))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-Sent Events stream of job status changes until the job finishes"""
+    get_job_or_404(job_id)
+    
+    async def event_stream():
+        async for job in job_manager.watch(job_id):
+            if job is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {job['status']}\ndata: {json.dumps(job_view(job))}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.get("/api/jobs/{job_id}/report")
+async def download_job_report(job_id: str):
+    """Download the PDF produced by a finished report job"""
+    job = get_job_or_404(job_id)
+    if job["kind"] != "report" or job["status"] != "completed":
+        raise HTTPException(status_code=409, detail="Report is not ready")
+    
+    path = os.path.join('reports', job["result"]["report_file"])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Report file is no longer available")
+    
+    return FileResponse(path=path, filename=job["result"]["report_file"], media_type='application/pdf')
+
+
+# ==================== Admin API ====================
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency guarding admin endpoints with the ADMIN_TOKEN shared secret
+    (fails closed: without a configured token no request is admitted)"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled (set ADMIN_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode('latin-1'), ADMIN_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/api/admin/shadow", dependencies=[Depends(require_admin)])
+async def get_shadow_evaluation(recent: int = 20):
+    """Agreement rate, confidence deltas and latency of the shadow candidate model"""
+    if shadow_evaluator is None:
+        return {"status": "disabled", "detail": "Set SHADOW_MODEL_PATH to evaluate a candidate model"}
+    return shadow_evaluator.stats(recent=min(max(recent, 0), 200))
+
+@app.get("/api/admin/loop-lag", dependencies=[Depends(require_admin)])
+async def get_loop_lag(stalls: int = 20):
+    """Event-loop lag histogram and the stacks of recent loop stalls (LOOP_STALL_CAPTURE=1)"""
+    return {
+        **loop_monitor.stats(),
+        "stalls": loop_monitor.recent_stalls(limit=min(max(stalls, 0), 50))
+    }
+
+PROFILE_FORMATS = {
+    "pstats": ("application/octet-stream", "pstats"),
+    "collapsed": ("text/plain", "collapsed.txt"),
+    "speedscope": ("application/json", "speedscope.json"),
+}
+
+@app.post("/api/admin/profiling", dependencies=[Depends(require_admin)])
+async def arm_profiling(toggle: ProfilingToggle):
+    """Profile the next `count` requests whose path starts with path_prefix"""
+    if toggle.mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(PROFILE_MODES)}")
+    request_profiler.arm(min(toggle.count, 100), toggle.path_prefix, toggle.mode)
+    return {"armed": request_profiler.armed, "path_prefix": request_profiler.armed_prefix, "mode": toggle.mode}
+
+@app.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Recent request profiles (newest first)"""
+    return {"armed": request_profiler.armed, "profiles": request_profiler.list()}
+
+def get_profile_or_404(profile_id: str) -> Dict:
+    record = request_profiler.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found (it may have been evicted)")
+    return record
+
+@app.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str):
+    """Profile summary: hottest frames or functions, allocation sites and peak traced memory"""
+    return profile_view(get_profile_or_404(profile_id), include_summary=True)
+
+@app.get("/api/admin/profiles/{profile_id}/download", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str, format: str = "speedscope"):
+    """Download a profile artifact: pstats (cprofile mode), collapsed or speedscope (sample mode)"""
+    record = get_profile_or_404(profile_id)
+    if format not in record["artifacts"]:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Format not available for this profile, use one of {', '.join(sorted(record['artifacts']))}"
+        )
+    media_type, extension = PROFILE_FORMATS[format]
+    return Response(
+        content=record["artifacts"][format],
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.{extension}"'}
+    )
+
+@app.get("/api/admin/memory", dependencies=[Depends(require_admin)])
+async def get_worker_memory():
+    """Unique vs shared memory of the worker serving this request"""
+    summary = memory_summary()
+    if summary is None:
+        raise HTTPException(status_code=501, detail="Memory accounting needs /proc (Linux)")
+    return {"pid": os.getpid(), "preloaded": models_preloaded, **summary}
+
+
 # ==================== Main ====================
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+"""
+BrainHealth AI - Metrics
+Small thread-safe metric types shared by the monitors (no external dependency)
+"""
+
+import bisect
+import threading
+from typing import Dict, Optional, Sequence
+
+# Latency buckets in milliseconds (upper bounds, +inf is implicit)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style) with count, sum and max"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None when empty)"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self.count
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, value_sum, value_max = self.count, self.sum, self.max
+        cumulative = []
+        seen = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], counts):
+            seen += count
+            cumulative.append({"le": bound, "count": seen})
+        return {
+            "count": total,
+            "sum": round(value_sum, 3),
+            "mean": round(value_sum / total, 3) if total else None,
+            "max": round(value_max, 3),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative,
+        }
+
+    def prometheus(self, name: str, help_text: str = '') -> str:
+        """Text exposition format lines for this histogram"""
+        snapshot = self.snapshot()
+        lines = []
+        if help_text:
+            lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for bucket in snapshot["buckets"]:
+            lines.append(f'{name}_bucket{{le="{bucket["le"]}"}} {bucket["count"]}')
+        lines.append(f"{name}_sum {snapshot['sum']}")
+        lines.append(f"{name}_count {snapshot['count']}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,45 @@
+"""
+BrainHealth AI - Process Memory Accounting
+Unique vs shared memory of a process from /proc/<pid>/smaps_rollup (Linux)
+
+- unique (USS): private pages, freed if the process exits
+- shared: pages shared with other processes, e.g. model weights a pre-forked
+  worker inherited copy-on-write from the master
+- pss: shared pages divided among the processes that map them
+"""
+
+from typing import Dict, Optional, Union
+
+
+def read_smaps_rollup(pid: Union[int, str] = 'self') -> Optional[Dict[str, int]]:
+    """Field -> kB from smaps_rollup, summed over smaps on older kernels (None if unavailable)"""
+    fields: Dict[str, int] = {}
+    for name in ('smaps_rollup', 'smaps'):
+        try:
+            with open(f'/proc/{pid}/{name}') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 3 and parts[2] == 'kB':
+                        key = parts[0].rstrip(':')
+                        fields[key] = fields.get(key, 0) + int(parts[1])
+            return fields
+        except (FileNotFoundError, PermissionError, ProcessLookupError):
+            continue
+    return None
+
+
+def memory_summary(pid: Union[int, str] = 'self') -> Optional[Dict[str, float]]:
+    fields = read_smaps_rollup(pid)
+    if fields is None:
+        return None
+
+    def mb(*keys):
+        return round(sum(fields.get(key, 0) for key in keys) / 1024, 1)
+
+    return {
+        "rss_mb": mb('Rss'),
+        "pss_mb": mb('Pss'),
+        "unique_mb": mb('Private_Clean', 'Private_Dirty'),
+        "shared_mb": mb('Shared_Clean', 'Shared_Dirty'),
+        "swap_mb": mb('Swap'),
+    }
@@ -0,0 +1,307 @@
+"""
+BrainHealth AI - On-Demand Request Profiling
+Profiles single production requests when asked to, and keeps the results as
+downloadable artifacts in a small ring buffer
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>` or while an
+admin has armed the profiler for the next N matching requests. Otherwise the
+ASGI middleware only checks one attribute and passes the request through.
+
+Modes:
+- sample   (default) a thread samples every thread's stack every few ms;
+           exported as collapsed stacks (flamegraph.pl / speedscope) and speedscope JSON
+- cprofile deterministic cProfile of the event-loop thread; exported as .pstats
+
+Allocations are always captured with tracemalloc (top allocation sites and peak).
+Only one request is profiled at a time; while the loop thread is profiled,
+callbacks of other concurrent requests show up in the profile too.
+"""
+
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+PROFILE_MODES = ('sample', 'cprofile')
+# Leaf frames in these files are threads waiting for work, not doing it
+IDLE_FILES = ('threading.py', 'queue.py', 'selectors.py', 'thread.py')
+
+
+class StackSampler:
+    """Samples the stacks of all threads at a fixed interval into collapsed-stack counts"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                if frame.f_code.co_filename.endswith(IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.samples[";".join(reversed(stack))] += 1
+
+
+def collapsed_stacks(samples: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+def speedscope_profile(samples: Counter, name: str, interval_ms: float) -> Dict:
+    """Sampled profile in the speedscope file format"""
+    frames: List[Dict] = []
+    frame_index: Dict[str, int] = {}
+    stacks, weights = [], []
+    for stack, count in samples.most_common():
+        indices = []
+        for frame in stack.split(";"):
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                frames.append({"name": frame})
+            indices.append(frame_index[frame])
+        stacks.append(indices)
+        weights.append(count * interval_ms)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": stacks,
+            "weights": weights,
+        }],
+        "name": name,
+        "exporter": "brainhealth-ai",
+    }
+
+
+class ProfileSession:
+    """One profiled request"""
+
+    def __init__(self, method: str, path: str, mode: str, sample_interval: float):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.mode = mode
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.take_snapshot()
+
+        self.profiler: Optional[cProfile.Profile] = None
+        self.sampler: Optional[StackSampler] = None
+        if mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self.sampler = StackSampler(sample_interval)
+            self.sampler.start()
+
+    def finish(self, status_code: Optional[int]) -> Dict:
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        artifacts: Dict[str, bytes] = {}
+        summary: Dict = {}
+
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.create_stats()
+            artifacts["pstats"] = marshal.dumps(self.profiler.stats)
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats('cumulative').print_stats(25)
+            summary["top_functions"] = out.getvalue()
+        if self.sampler is not None:
+            self.sampler.stop()
+            samples = self.sampler.samples
+            interval_ms = self.sampler.interval * 1000
+            artifacts["collapsed"] = collapsed_stacks(samples).encode()
+            artifacts["speedscope"] = json.dumps(
+                speedscope_profile(samples, f"{self.method} {self.path}", interval_ms)
+            ).encode()
+            leaf_counts: Counter = Counter()
+            for stack, count in samples.items():
+                leaf_counts[stack.rsplit(";", 1)[-1]] += count
+            summary["samples"] = sum(samples.values())
+            summary["top_frames"] = [
+                {"frame": frame, "samples": count} for frame, count in leaf_counts.most_common(15)
+            ]
+
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        summary["allocations"] = [
+            {
+                "location": str(stat.traceback[0]),
+                "size_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count_diff,
+            }
+            for stat in snapshot.compare_to(self._baseline, 'lineno')[:15]
+        ]
+        summary["peak_traced_mb"] = round(peak / 1024 ** 2, 2)
+
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "mode": self.mode,
+            "status_code": status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(duration_ms, 2),
+            "summary": summary,
+            "artifacts": artifacts,
+        }
+
+
+class RequestProfiler:
+    """Decides which requests to profile and keeps a ring buffer of recent profiles"""
+
+    def __init__(self, token: Optional[str] = None, max_profiles: int = 20,
+                 sample_interval: float = 0.005):
+        self.token = token
+        self.sample_interval = sample_interval
+        self.max_profiles = max_profiles
+        self.profiles: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._busy = False
+        # Admin toggle: profile the next `armed` requests whose path starts with armed_prefix
+        self.armed = 0
+        self.armed_prefix = '/'
+        self.armed_mode = 'sample'
+
+    @property
+    def active(self) -> bool:
+        return self.token is not None or self.armed > 0
+
+    def arm(self, count: int, path_prefix: str = '/', mode: str = 'sample'):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Profile mode must be one of {', '.join(PROFILE_MODES)}")
+        with self._lock:
+            self.armed = max(count, 0)
+            self.armed_prefix = path_prefix or '/'
+            self.armed_mode = mode
+
+    def requested_mode(self, path: str, headers: Dict[bytes, bytes]) -> Optional[str]:
+        """Profile mode for this request, or None to run it unprofiled"""
+        header = headers.get(b'x-profile')
+        if header is not None and self.token is not None:
+            # Bytes on both sides: compare_digest rejects non-ASCII str
+            if secrets.compare_digest(header, self.token.encode('utf-8')):
+                mode = headers.get(b'x-profile-mode', b'sample').decode('latin-1')
+                return mode if mode in PROFILE_MODES else 'sample'
+        if self.armed > 0 and path.startswith(self.armed_prefix):
+            with self._lock:
+                if self.armed > 0:
+                    self.armed -= 1
+                    return self.armed_mode
+        return None
+
+    def begin(self, method: str, path: str, mode: str) -> Optional[ProfileSession]:
+        with self._lock:
+            if self._busy:
+                return None
+            self._busy = True
+        try:
+            return ProfileSession(method, path, mode, self.sample_interval)
+        except Exception:
+            with self._lock:
+                self._busy = False
+            raise
+
+    def finish(self, session: ProfileSession, status_code: Optional[int]):
+        try:
+            record = session.finish(status_code)
+        finally:
+            with self._lock:
+                self._busy = False
+        with self._lock:
+            self.profiles[record["id"]] = record
+            while len(self.profiles) > self.max_profiles:
+                self.profiles.popitem(last=False)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            records = list(self.profiles.values())
+        return [profile_view(record) for record in reversed(records)]
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self.profiles.get(profile_id)
+
+
+def profile_view(record: Dict, include_summary: bool = False) -> Dict:
+    view = {key: value for key, value in record.items() if key not in ("artifacts", "summary")}
+    view["formats"] = sorted(record["artifacts"])
+    if include_summary:
+        view["summary"] = record["summary"]
+    return view
+
+
+class ProfilingMiddleware:
+    """ASGI middleware; a plain pass-through unless profiling is requested"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.active:
+            await self.app(scope, receive, send)
+            return
+
+        mode = self.profiler.requested_mode(scope["path"], dict(scope["headers"]))
+        session = self.profiler.begin(scope["method"], scope["path"], mode) if mode else None
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = None
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"x-profile-id", session.id.encode())]
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self.profiler.finish(session, status_code)
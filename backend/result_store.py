@@ -0,0 +1,172 @@
+"""
+BrainHealth AI - Scan Result Store
+Content-addressed store of previous detection results, keyed by the SHA-256
+of the uploaded scan, so repeat uploads cost neither bandwidth nor compute
+
+Results (including the Grad-CAM overlay artifact) are kept in a bounded LRU
+in memory and optionally written to a directory on disk, itself bounded to
+`max_files` results (least recently used files are deleted first).
+
+Keys include the identity of the model that produced the result, so results of
+the dummy predictor or of a replaced model file are never served by another.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def scan_hash(contents: bytes) -> str:
+    """Content hash used as the scan ID"""
+    return hashlib.sha256(contents).hexdigest()
+
+
+def is_scan_hash(value: str) -> bool:
+    return bool(SHA256_PATTERN.match(value))
+
+
+def model_fingerprint(path: Optional[str]) -> str:
+    """Identity of a loaded model file for result keys: a prefix of its SHA-256, 'dummy' without one"""
+    if not path:
+        return "dummy"
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class ScanResultStore:
+    """Hash-indexed LRU of detection results with an optional on-disk tier"""
+
+    def __init__(self, max_entries: int = 256, directory: Optional[str] = None, max_files: int = 10000):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_files = max_files
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        # Keys of the result files on disk, least recently used first
+        self._files: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.files_evicted = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._scan_directory()
+
+    @staticmethod
+    def key(sha256: str, variant: str = "default", model: str = "dummy") -> str:
+        """Results depend on the model and the scoring mode as well as the scan bytes"""
+        return f"{sha256}.{model}.{variant}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _scan_directory(self):
+        """Index existing result files by modification time (oldest first) and apply the bound"""
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.tmp'):
+                # Left over from an interrupted write
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            elif name.endswith('.json'):
+                try:
+                    files.append((os.path.getmtime(path), name[:-len('.json')]))
+                except OSError:
+                    pass
+        for _, key in sorted(files):
+            self._files[key] = None
+        self._evict_files()
+
+    def _evict_files(self):
+        while len(self._files) > self.max_files:
+            key, _ = self._files.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self.files_evicted += 1
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        if self.directory and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key)) as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                result = None
+            if result is not None:
+                self._remember(key, result)
+                with self._lock:
+                    self.hits += 1
+                    if key in self._files:
+                        self._files.move_to_end(key)
+                try:
+                    # Keep the on-disk LRU order across restarts
+                    os.utime(self._path(key))
+                except OSError:
+                    pass
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key: str, result: Dict):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key: str, result: Dict):
+        self._remember(key, result)
+        if self.directory:
+            # Unique temp file per write: concurrent puts of the same key must not share one
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{key}.", suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(result, f)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            with self._lock:
+                self._files[key] = None
+                self._files.move_to_end(key)
+                self._evict_files()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": bool(self.directory),
+                "files": len(self._files),
+                "max_files": self.max_files,
+                "files_evicted": self.files_evicted,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
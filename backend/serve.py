@@ -0,0 +1,221 @@
+"""
+BrainHealth AI - Pre-fork Server Launcher
+Loads and warms the models once in a master process, then forks uvicorn
+workers that inherit the weights copy-on-write instead of each re-importing
+TensorFlow and reloading the model (as `uvicorn --workers N` does)
+
+Usage: python serve.py [--workers 4] [--port 8000] [--no-chatbot] [--no-preload]
+
+Caveats:
+- TensorFlow is not officially fork-safe: its thread pools are created in the
+  master and do not exist in the children. Each worker therefore runs a
+  warm-up prediction right after the fork; if that does not finish within
+  --fork-check-timeout seconds the worker exits and the launcher stops with a
+  hint to use --no-preload (each worker then loads its own model, like before).
+- Job queues, resumable-upload locks and in-memory caches are per worker.
+  With JOB_STORE_PATH the workers share the job store: each job is claimed by
+  one worker and any worker reports its status. Jobs left running by the last
+  shutdown are requeued once, by the master, before forking.
+- Each worker exports its trace spans to its own file (traces/spans.<pid>.jsonl).
+- Linux only (fork, /proc smaps_rollup for the memory report).
+"""
+
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+from procmem import memory_summary
+
+# Worker exit code meaning "the preloaded model does not work after fork"
+EXIT_FORK_UNSAFE = 3
+
+workers = {}
+shutting_down = False
+
+
+def load_in_master(args):
+    """Import the app and load everything that can be shared copy-on-write"""
+    import main
+
+    if args.preload:
+        main.load_stroke_detection_model()
+        if args.chatbot:
+            main.load_chatbot()
+        main.load_case_index()
+        main.models_preloaded = True
+        main.chatbot_preloaded = args.chatbot
+
+    if main.JOB_STORE_PATH:
+        store = main.JobStore(db_path=main.JOB_STORE_PATH)
+        requeued = store.requeue_interrupted()
+        store.close()
+        main.jobs_recovered = True
+        if requeued:
+            print(f"🔁 Requeued {requeued} interrupted job(s)")
+
+    # Move everything allocated so far out of the GC's reach: collections would
+    # otherwise write to the object headers and un-share those pages in every worker
+    gc.collect()
+    gc.freeze()
+    return main
+
+
+def check_model_after_fork(main, timeout: float):
+    """Run one prediction in the worker; a hang means TensorFlow did not survive the fork"""
+    if main.stroke_model is None:
+        return
+    done = threading.Event()
+
+    def warm_up():
+        main.stroke_model.predict(np.zeros((1,) + main.MODEL_INPUT_SIZE + (1,), dtype=np.float32), verbose=0)
+        done.set()
+
+    threading.Thread(target=warm_up, daemon=True).start()
+    if not done.wait(timeout):
+        print(f"❌ Worker {os.getpid()}: model did not respond after fork; restart with --no-preload")
+        os._exit(EXIT_FORK_UNSAFE)
+
+
+def run_worker(main, sock: socket.socket, args):
+    import uvicorn
+
+    for sig in (signal.SIGCHLD, signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+    # The memory report is the master's job; a group-wide SIGUSR1 must not kill workers
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    # Children inherit the master's random state; reseed so sampling differs per worker
+    random.seed()
+    np.random.seed()
+
+    if args.preload:
+        check_model_after_fork(main, args.fork_check_timeout)
+
+    config = uvicorn.Config(main.app, log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+    os._exit(0)
+
+
+def spawn_worker(main, sock: socket.socket, args):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(main, sock, args)
+        finally:
+            os._exit(1)
+    workers[pid] = time.time()
+    return pid
+
+
+def memory_report():
+    """Per-worker unique vs shared memory; unique is what each extra worker really costs"""
+    master = memory_summary(os.getpid())
+    if master is None:
+        print("⚠️ Memory report needs /proc/<pid>/smaps_rollup (Linux)")
+        return
+    print("\n📊 Memory (MB)        rss      pss   unique   shared")
+    print(f"   master {os.getpid():>7} {master['rss_mb']:8.1f} {master['pss_mb']:8.1f} "
+          f"{master['unique_mb']:8.1f} {master['shared_mb']:8.1f}")
+    unique_total = 0.0
+    for pid in sorted(workers):
+        summary = memory_summary(pid)
+        if summary is None:
+            continue
+        unique_total += summary['unique_mb']
+        print(f"   worker {pid:>7} {summary['rss_mb']:8.1f} {summary['pss_mb']:8.1f} "
+              f"{summary['unique_mb']:8.1f} {summary['shared_mb']:8.1f}")
+    print(f"   total footprint ≈ {master['unique_mb'] + master['shared_mb'] + unique_total:.1f} MB "
+          f"for {len(workers)} worker(s)\n")
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def stop_workers(signum=None, frame=None):
+    global shutting_down
+    shutting_down = True
+    for pid in list(workers):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def main_loop():
+    parser = argparse.ArgumentParser(description="Pre-fork launcher for the BrainHealth AI backend")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '8000')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', '2')))
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='load the models in every worker instead of once in the master')
+    parser.add_argument('--no-chatbot', dest='chatbot', action='store_false',
+                        help='load the HuggingFace chatbot in each worker instead of the master '
+                             '(not shared copy-on-write)')
+    parser.add_argument('--fork-check-timeout', type=float, default=30.0)
+    parser.add_argument('--report-interval', type=float, default=0,
+                        help='print the memory report every N seconds (0: on startup and SIGUSR1 only)')
+    parser.add_argument('--log-level', default='info')
+    parser.add_argument('--keep-alive', type=int, default=5)
+    args = parser.parse_args()
+
+    print("🧠 BrainHealth AI - pre-fork launcher")
+    start = time.perf_counter()
+    main = load_in_master(args)
+    print(f"✅ Master ready in {time.perf_counter() - start:.1f}s, forking {args.workers} worker(s)")
+
+    sock = bind_socket(args.host, args.port)
+    for _ in range(args.workers):
+        spawn_worker(main, sock, args)
+
+    signal.signal(signal.SIGTERM, stop_workers)
+    signal.signal(signal.SIGINT, stop_workers)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: memory_report())
+
+    report_at = time.time() + max(args.fork_check_timeout, 5.0)
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+
+        if pid == 0:
+            now = time.time()
+            if report_at and now >= report_at:
+                memory_report()
+                report_at = now + args.report_interval if args.report_interval > 0 else None
+            time.sleep(0.5)
+            continue
+
+        started = workers.pop(pid, time.time())
+        code = os.waitstatus_to_exitcode(status)
+        if shutting_down:
+            continue
+        if code == EXIT_FORK_UNSAFE:
+            print("❌ TensorFlow is not usable after fork on this platform; re-run with --no-preload")
+            stop_workers()
+            sys.exit(EXIT_FORK_UNSAFE)
+
+        print(f"⚠️ Worker {pid} exited with code {code}, restarting")
+        if time.time() - started < 1.0:
+            time.sleep(1.0)  # do not spin on a worker that dies immediately
+        spawn_worker(main, sock, args)
+
+    print("👋 All workers stopped")
+
+
+if __name__ == '__main__':
+    main_loop()
@@ -0,0 +1,129 @@
+"""
+BrainHealth AI - Shadow Model Evaluation
+Runs a candidate stroke model on a sample of live traffic in the background
+and compares it with the production model, without touching user latency
+
+The request path only does a non-blocking queue put; when the queue is full
+the sample is dropped. All comparisons live in a bounded in-memory window.
+"""
+
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+
+class ShadowEvaluator:
+    """Background worker comparing a candidate model with the production model"""
+
+    def __init__(
+        self,
+        model_path: str,
+        loader: Callable[[str], Any],
+        sample_rate: float = 0.1,
+        max_queue: int = 32,
+        max_records: int = 1000,
+    ):
+        self.model_path = model_path
+        self.loader = loader
+        self.sample_rate = sample_rate
+        self.model = None
+        self.error: Optional[str] = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._records: deque = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.offered = 0
+        self.dropped = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="shadow-eval", daemon=True)
+        self._thread.start()
+
+    def offer(self, tensor: np.ndarray, primary_confidence: float, primary_latency_ms: float,
+              scan_id: Optional[str] = None):
+        """Called from the request path: sample and enqueue without ever waiting"""
+        if self.error is not None or random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((tensor, primary_confidence, primary_latency_ms, scan_id))
+            with self._lock:
+                self.offered += 1
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self):
+        try:
+            self.model = self.loader(self.model_path)
+            print(f"✅ Shadow model loaded: {self.model_path}")
+        except Exception as e:
+            self.error = str(e)
+            print(f"❌ Error loading shadow model: {e}")
+            return
+
+        while True:
+            tensor, primary_confidence, primary_latency_ms, scan_id = self._queue.get()
+            try:
+                start = time.perf_counter()
+                prediction = self.model.predict(tensor, verbose=0)
+                shadow_latency_ms = (time.perf_counter() - start) * 1000
+                shadow_confidence = float(prediction[0][0]) * 100
+            except Exception as e:
+                print(f"Shadow evaluation failed: {e}")
+                continue
+
+            with self._lock:
+                self._records.append({
+                    "scan_id": scan_id,
+                    "timestamp": time.time(),
+                    "primary_confidence": round(float(primary_confidence), 2),
+                    "shadow_confidence": round(shadow_confidence, 2),
+                    "agree": bool((primary_confidence > 50) == (shadow_confidence > 50)),
+                    "primary_latency_ms": round(primary_latency_ms, 2),
+                    "shadow_latency_ms": round(shadow_latency_ms, 2),
+                })
+
+    def stats(self, recent: int = 20) -> Dict:
+        with self._lock:
+            records = list(self._records)
+
+        summary = {
+            "model_path": self.model_path,
+            "status": "error" if self.error else ("running" if self.model is not None else "loading"),
+            "error": self.error,
+            "sample_rate": self.sample_rate,
+            "offered": self.offered,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "evaluated": len(records),
+        }
+        if not records:
+            return summary
+
+        primary = np.array([r["primary_confidence"] for r in records])
+        shadow = np.array([r["shadow_confidence"] for r in records])
+        primary_latency = np.array([r["primary_latency_ms"] for r in records])
+        shadow_latency = np.array([r["shadow_latency_ms"] for r in records])
+        deltas = shadow - primary
+
+        summary.update({
+            "agreement_rate": round(float(np.mean([r["agree"] for r in records])), 4),
+            "confidence_delta": {
+                "mean": round(float(np.mean(deltas)), 2),
+                "mean_abs": round(float(np.mean(np.abs(deltas))), 2),
+                "max_abs": round(float(np.max(np.abs(deltas))), 2),
+            },
+            "latency_ms": {
+                "primary_p50": round(float(np.percentile(primary_latency, 50)), 2),
+                "primary_p95": round(float(np.percentile(primary_latency, 95)), 2),
+                "shadow_p50": round(float(np.percentile(shadow_latency, 50)), 2),
+                "shadow_p95": round(float(np.percentile(shadow_latency, 95)), 2),
+            },
+            "recent": records[-recent:] if recent > 0 else [],
+        })
+        return summary
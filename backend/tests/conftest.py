@@ -0,0 +1,46 @@
+"""
+Backend modules are imported flat (as main.py does), so tests can run from the
+repository root as well as from backend/
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    """TestClient for the app in lite mode, with main imported from backend/
+    (main.py resolves data/ and models/ relative to it)"""
+    from fastapi.testclient import TestClient
+
+    cwd = os.getcwd()
+    os.chdir(BACKEND_DIR)
+    try:
+        import main
+
+        with TestClient(main.app) as client:
+            yield client
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope="session")
+def backend_main(app_client):
+    """The main module, imported (and started) by app_client"""
+    import main
+
+    return main
+
+
+@pytest.fixture(scope="session")
+def scan_bytes():
+    """PNG bytes of one training scan"""
+    folder = os.path.join(BACKEND_DIR, 'training_data', 'stroke')
+    with open(os.path.join(folder, sorted(os.listdir(folder))[0]), 'rb') as f:
+        return f.read()
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from answer_cache import AnswerCache, normalize_question
+
+
+@pytest.mark.parametrize("a, b", [
+    ("What are the symptoms of a stroke?", "stroke symptoms"),
+    ("Symptoms of strokes??", "STROKE SYMPTOMS"),
+    ("I don't have stroke symptoms", "no stroke symptoms"),
+])
+def test_equivalent_questions_share_a_key(a, b):
+    assert normalize_question(a) == normalize_question(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("no signs of stroke", "signs of stroke"),
+    ("I never had a stroke", "I had a stroke"),
+    ("I need help, stroke!", "stroke"),
+    ("who is at risk of stroke", "risk of stroke"),
+])
+def test_negations_and_rule_keywords_change_the_key(a, b):
+    assert normalize_question(a) != normalize_question(b)
+
+
+def test_get_put_and_sources():
+    cache = AnswerCache()
+    cache.put("What is a stroke?", "An interruption of blood flow", "faq")
+    assert cache.get("what is stroke") == ("An interruption of blood flow", "faq")
+    assert cache.get("what is stroke", sources=("rules",)) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_stopword_only_questions_are_not_cached():
+    cache = AnswerCache()
+    cache.put("what is it?", "anything", "rules")
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_bounds():
+    cache = AnswerCache(max_entries=2, max_bytes=1000)
+    for word in ("aspirin", "statins", "warfarin"):
+        cache.put(word, word.upper(), "faq")
+    assert cache.get("aspirin") is None
+    assert cache.get("warfarin") == ("WARFARIN", "faq")
+
+    cache = AnswerCache(max_bytes=10)
+    cache.put("aspirin", "x" * 6, "faq")
+    cache.put("statins", "y" * 6, "faq")
+    assert cache.stats()["bytes"] <= 10
+    assert cache.get("aspirin") is None
+
+
+def test_ttl():
+    cache = AnswerCache(ttl=0.05)
+    cache.put("aspirin", "answer", "faq")
+    time.sleep(0.1)
+    assert cache.get("aspirin") is None
+    assert cache.stats()["expirations"] == 1
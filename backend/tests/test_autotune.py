@@ -0,0 +1,52 @@
+import json
+import sys
+
+import autotune_inference
+from inference_profile import load_profile
+
+
+def fake_results(latency_ms: float):
+    return {batch_size: {"latency_ms_p50": latency_ms * (1 + batch_size / 8), "latency_ms_p95": latency_ms * 2,
+                         "throughput_ips": batch_size / (latency_ms * (1 + batch_size / 8)) * 1000}
+            for batch_size in (1, 2, 4, 8)}
+
+
+def test_best_batch_size_prefers_the_smallest_near_best():
+    results = {1: {"throughput_ips": 100}, 4: {"throughput_ips": 390}, 8: {"throughput_ips": 400}}
+    assert autotune_inference.best_batch_size(results) == 4
+    assert autotune_inference.thread_candidates(6) == [1, 2, 4, 6]
+
+
+def test_sweep_includes_the_tf_default_as_baseline(tmp_path, monkeypatch, capsys):
+    model = tmp_path / "model.h5"
+    model.write_bytes(b"weights")
+    output = tmp_path / "profile.json"
+    configs = []
+
+    def run_config(intra, inter, xla, args):
+        configs.append((intra, inter, xla))
+        # Explicit pools beat the default here, XLA beats no XLA
+        return fake_results(10.0 if (intra, inter) == (0, 0) else 8.0 - xla - intra / 10)
+
+    monkeypatch.setattr(autotune_inference, "MODEL_PATH", str(model))
+    monkeypatch.setattr(autotune_inference, "run_config", run_config)
+    monkeypatch.setattr(autotune_inference, "cpu_limit", lambda: 2)
+    monkeypatch.setattr(sys, "argv", ["autotune_inference.py", "--quick", "--batch-sizes", "1,2,4,8",
+                                      "--output", str(output)])
+    autotune_inference.main()
+
+    assert configs[:2] == [(0, 0, False), (0, 0, True)]
+    profile = json.loads(output.read_text())
+    assert (profile["intra_op_threads"], profile["jit_compile"]) == (2, True)
+    assert profile["baseline_latency_ms_p50"] > profile["latency_ms_p50"]
+    assert "TF default" in capsys.readouterr().out
+    assert load_profile(str(output))["batch_size"] in (1, 2, 4, 8)
+
+
+def test_invalid_profiles_are_ignored(tmp_path):
+    path = tmp_path / "profile.json"
+    assert load_profile(str(path)) is None
+    path.write_text('{"intra_op_threads": 2}')
+    assert load_profile(str(path)) is None
+    path.write_text('not json')
+    assert load_profile(str(path)) is None
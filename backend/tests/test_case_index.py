@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+
+from case_index import CaseIndex, RecentEmbeddings, normalize, save_index, train_ivf
+
+
+@pytest.fixture(scope="module")
+def cases(tmp_path_factory):
+    rng = np.random.default_rng(5)
+    embeddings = rng.normal(size=(400, 16)).astype(np.float32)
+    labels = ["stroke" if n % 3 == 0 else "normal" for n in range(len(embeddings))]
+    directory = str(tmp_path_factory.mktemp("case_index"))
+    save_index(directory, embeddings, [f"scan_{n}.png" for n in range(len(embeddings))], labels,
+               nlist=12, model_path="models/stroke_cnn_model.h5", model_id="0123456789abcdef")
+    return CaseIndex(directory), normalize(embeddings), np.array(labels)
+
+
+def brute_force(embeddings, labels, query, name, k):
+    scores = embeddings @ normalize(query)
+    rows = np.flatnonzero(labels == name)
+    return set(rows[np.argsort(-scores[rows])[:k]].tolist())
+
+
+def test_ivf_partitions_every_row():
+    data = normalize(np.random.default_rng(1).normal(size=(100, 8)))
+    centroids, order, offsets = train_ivf(data, nlist=7)
+    assert len(centroids) == 7
+    assert sorted(order.tolist()) == list(range(100))
+    assert offsets[0] == 0 and offsets[-1] == 100
+
+
+def test_full_probe_matches_brute_force(cases):
+    index, embeddings, labels = cases
+    query = np.random.default_rng(2).normal(size=16)
+    results = index.search(query, k=5, nprobe=index.nlist)
+    assert set(results) == {"normal", "stroke"}
+    for name, found in results.items():
+        assert {case["case_id"] for case in found} == brute_force(embeddings, labels, query, name, 5)
+        similarities = [case["similarity"] for case in found]
+        assert similarities == sorted(similarities, reverse=True)
+
+
+def test_narrow_probe_finds_the_query_itself(cases):
+    index, embeddings, labels = cases
+    for row in (0, 1, 200):
+        found = index.search(embeddings[row], k=3, nprobe=1)[labels[row]]
+        assert found[0]["case_id"] == row
+        assert found[0]["path"] == f"scan_{row}.png"
+
+
+def test_metadata_and_dimension_check(cases):
+    index, _, _ = cases
+    assert index.model_id == "0123456789abcdef"
+    with pytest.raises(ValueError):
+        index.search(np.ones(8))
+
+
+def test_index_from_another_model_is_refused(cases, backend_main, monkeypatch, capsys):
+    index, _, _ = cases
+    monkeypatch.setattr(backend_main, "CASE_INDEX_DIR", os.path.dirname(index.embeddings.filename))
+    monkeypatch.setattr(backend_main, "TENSORFLOW_AVAILABLE", True)
+    monkeypatch.setattr(backend_main, "stroke_model", object())
+    monkeypatch.setattr(backend_main, "stroke_model_id", "fedcba9876543210")
+    monkeypatch.setattr(backend_main, "case_index", None)
+    backend_main.load_case_index()
+    assert backend_main.case_index is None
+    assert "rebuild" in capsys.readouterr().out
+
+
+def test_recent_embeddings_are_bounded():
+    recent = RecentEmbeddings(max_entries=2)
+    for scan_id in ("a", "b", "c"):
+        recent.put(scan_id, np.ones(4))
+    assert recent.get("a") is None
+    assert recent.get("c").dtype == np.float32
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from chat_generation import GenerationQueueFull, GenerationWorker
+
+
+class FakeModel:
+    """generate_batch stand-in: records batch sizes, replies with the upper-cased prompt"""
+
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+        self.threads = set()
+
+    def __call__(self, prompts, max_new_tokens, on_text=None):
+        self.batches.append(list(prompts))
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("out of memory")
+        replies = [prompt.strip().upper() for prompt in prompts]
+        if on_text is not None:
+            for row, reply in enumerate(replies):
+                for word in reply.split():
+                    on_text(row, word + " ")
+        return replies
+
+
+def run_with_worker(worker: GenerationWorker, scenario):
+    async def main():
+        worker.start()
+        try:
+            return await scenario()
+        finally:
+            worker.stop()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_prompts_share_one_batch():
+    model = FakeModel()
+    worker = GenerationWorker(model, max_batch=8, max_wait=0.1)
+
+    async def scenario():
+        return await asyncio.gather(*(worker.generate(f"prompt {n}") for n in range(5)))
+
+    replies = run_with_worker(worker, scenario)
+    assert [reply["text"] for reply in replies] == [f"PROMPT {n}" for n in range(5)]
+    assert [len(batch) for batch in model.batches] == [5]
+    assert {reply["batch_size"] for reply in replies} == {5}
+    # Generation runs on the worker thread, never on the event loop
+    assert model.threads == {"chat-generation"}
+    assert worker.stats()["batch_size"]["count"] == 1
+
+
+def test_batches_are_capped_at_max_batch():
+    model = FakeModel(delay=0.01)
+    worker = GenerationWorker(model, max_batch=2, max_wait=0.1)
+
+    async def scenario():
+        return await asyncio.gather(*(worker.generate(str(n)) for n in range(5)))
+
+    replies = run_with_worker(worker, scenario)
+    assert [reply["text"] for reply in replies] == [str(n) for n in range(5)]
+    assert [len(batch) for batch in model.batches] == [2, 2, 1]
+
+
+def test_event_loop_stays_responsive_while_generating():
+    worker = GenerationWorker(FakeModel(delay=0.3), max_wait=0)
+
+    async def scenario():
+        ticks = 0
+        task = asyncio.ensure_future(worker.generate("slow"))
+        while not task.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        return ticks
+
+    assert run_with_worker(worker, scenario) >= 10
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    worker = GenerationWorker(FakeModel(fail=True), max_wait=0.05)
+
+    async def scenario():
+        return await asyncio.gather(worker.generate("a"), worker.generate("b"), return_exceptions=True)
+
+    results = run_with_worker(worker, scenario)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert worker.stats()["failed"] == 2
+
+
+def test_full_queue_rejects_without_waiting():
+    # Not started: nothing drains the queue
+    worker = GenerationWorker(FakeModel(), max_queue=1)
+
+    async def scenario():
+        first = asyncio.ensure_future(worker.generate("queued"))
+        await asyncio.sleep(0)
+        with pytest.raises(GenerationQueueFull):
+            await worker.generate("rejected")
+        first.cancel()
+
+    asyncio.run(scenario())
+    assert worker.stats()["rejected"] == 1
+
+
+class WordTokenizer:
+    """Tokenizer stand-in for BatchTextStreamer: one token id per word piece"""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def decode(self, tokens, skip_special_tokens=True):
+        return "".join(self.pieces[token] for token in tokens)
+
+
+class Column(list):
+    def tolist(self):
+        return list(self)
+
+
+def test_batch_streamer_emits_whole_words_per_row():
+    from chat_generation import BatchTextStreamer
+
+    emitted = {0: [], 1: []}
+    tokenizer = WordTokenizer({1: "Call", 2: " 108", 3: " now", 4: "Rest", 5: " we", 6: "ll"})
+    streamer = BatchTextStreamer(tokenizer, 2, lambda row, text: emitted[row].append(text))
+    streamer.put(Column([[0], [0]]))  # decoder start tokens are skipped
+    for step in ([1, 4], [2, 5], [3, 6]):
+        streamer.put(Column(step))
+    streamer.end()
+    assert emitted[0] == ["Call ", "108 ", "now"]
+    # "we" is held back until "ll" completes the word
+    assert emitted[1] == ["Rest ", "well"]
+
+
+def test_stream_yields_tokens_then_the_result():
+    worker = GenerationWorker(FakeModel(), max_wait=0.05)
+
+    async def scenario():
+        async def collect(prompt):
+            return [event async for event in worker.stream(prompt)]
+
+        streamed, plain = await asyncio.gather(collect("call an ambulance"), worker.generate("plain"))
+        return streamed, plain
+
+    streamed, plain = run_with_worker(worker, scenario)
+    assert [value for kind, value in streamed if kind == "token"] == ["CALL ", "AN ", "AMBULANCE "]
+    assert streamed[-1][0] == "done"
+    assert streamed[-1][1]["text"] == "CALL AN AMBULANCE"
+    # Streaming (greedy) and plain requests never share a batch
+    assert plain["batch_size"] == 1
+
+
+def test_stream_raises_generation_errors():
+    worker = GenerationWorker(FakeModel(fail=True), max_wait=0)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            async for _ in worker.stream("x"):
+                pass
+
+    run_with_worker(worker, scenario)
+
+
+def test_sse_endpoint_streams_model_tokens(app_client, backend_main, monkeypatch):
+    worker = GenerationWorker(FakeModel(delay=0), max_wait=0)
+    worker.start()
+    monkeypatch.setattr(backend_main, "chat_worker", worker)
+    monkeypatch.setattr(backend_main.chat_model, "wake", lambda: True)
+    try:
+        with app_client.stream("POST", "/api/chat/stream", json={"message": "qwerty uiop"}) as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            lines = list(response.iter_lines())
+    finally:
+        worker.stop()
+    events = [line for line in lines if line.startswith("event:")]
+    assert events == ["event: token", "event: token", "event: done"]
+    done = json.loads([line for line in lines if line.startswith("data:")][-1][len("data: "):])
+    assert done["source"] == "model"
+    assert done["response"] == "QWERTY UIOP"
+    assert done["ttft_ms"] is not None
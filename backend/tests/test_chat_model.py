@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+import chat_model
+from chat_model import (ChatModel, ChatModelManager, STATE_FAILED, STATE_LOADED, STATE_LOADING,
+                        STATE_UNLOADED)
+
+
+def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_first_wake_loads_in_the_background():
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        release.wait(2)
+        loads.append(1)
+        return ChatModel("tiny", None, object(), quantized=True)
+
+    manager = ChatModelManager(loader, idle_unload=0)
+    # Requests are answered without the model (FAQ / rules) while it loads
+    assert manager.wake() is False
+    assert manager.state == STATE_LOADING
+    assert manager.wake() is False
+    release.set()
+    wait_for(lambda: manager.state == STATE_LOADED)
+    assert manager.wake() is True
+    assert len(loads) == 1
+    assert manager.stats()["quantized"] is True
+
+
+def test_failed_load_is_not_retried_on_every_request(monkeypatch):
+    attempts = []
+
+    def loader():
+        attempts.append(1)
+        raise OSError("no network")
+
+    manager = ChatModelManager(loader, idle_unload=0)
+    manager.wake()
+    wait_for(lambda: manager.state == STATE_FAILED)
+    assert manager.wake() is False
+    time.sleep(0.05)
+    assert len(attempts) == 1
+    assert "no network" in manager.stats()["error"]
+
+    monkeypatch.setattr(chat_model, "RETRY_AFTER_SECONDS", 0)
+    manager.wake()
+    wait_for(lambda: len(attempts) == 2)
+    assert len(attempts) == 2
+
+
+def test_idle_model_is_unloaded_but_not_while_in_use():
+    manager = ChatModelManager(lambda: ChatModel("tiny", None, object(), False), idle_unload=0.05)
+    manager.load()
+    assert manager.state == STATE_LOADED
+    with manager.use():
+        time.sleep(0.1)
+        assert manager.unload() is False
+    # use() refreshed last_used: still not idle long enough
+    assert manager.unload() is False
+    time.sleep(0.1)
+    assert manager.unload() is True
+    assert manager.state == STATE_UNLOADED
+    with pytest.raises(RuntimeError):
+        with manager.use():
+            pass
+
+
+def test_reaper_unloads_and_wake_reloads():
+    manager = ChatModelManager(lambda: ChatModel("tiny", None, object(), False), idle_unload=0.05)
+    manager.load()
+    manager.start()
+    try:
+        wait_for(lambda: manager.state == STATE_UNLOADED)
+        assert manager.stats()["unloads"] == 1
+        manager.wake()
+        wait_for(lambda: manager.state == STATE_LOADED)
+        assert manager.stats()["loads"] == 2
+    finally:
+        manager.stop()
+
+
+def test_disabled_manager_never_loads():
+    manager = ChatModelManager(lambda: pytest.fail("loaded"), enabled=False)
+    manager.load()
+    assert manager.wake() is False
+    assert manager.stats()["state"] == "disabled"
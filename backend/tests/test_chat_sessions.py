@@ -0,0 +1,51 @@
+import time
+
+from chat_sessions import SessionStore
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+def test_session_history_is_trimmed_to_its_budget():
+    store = SessionStore(session_tokens=10, count_tokens=words)
+    for n in range(5):
+        store.append("s1", f"question {n}", f"answer {n}")
+    history = store.history("s1")
+    assert history["tokens"] <= 10
+    assert history["turns"][-1]["user"] == "question 4"
+    assert store.total_tokens == history["tokens"]
+
+
+def test_prompt_fits_the_budget():
+    store = SessionStore(count_tokens=words)
+    store.append("s1", "first question here", "first answer here")
+    store.append("s1", "second question", "second answer")
+    prompt = store.prompt("s1", "third", budget=6)
+    # Newest turn only: 1 + 4 tokens fit, adding the older turn (6) would not
+    assert prompt == "  ".join([" second question", "second answer", " third"])
+    assert store.prompt("unknown", "hello", budget=6) == " hello"
+
+
+def test_total_budget_evicts_least_recently_used_sessions():
+    store = SessionStore(max_total_tokens=14, count_tokens=words)
+    store.append("old", "a b c", "d e f")
+    store.append("new", "a b c", "d e f")
+    store.append("old", "g", "h")
+    store.append("third", "a b c", "d e f")
+    assert store.history("new") is None
+    assert store.history("old") is not None
+    assert store.total_tokens <= 14
+    assert store.stats()["evicted"] == 1
+
+
+def test_max_sessions_and_ttl():
+    store = SessionStore(max_sessions=2, ttl=0.05, count_tokens=words)
+    for session_id in ("a", "b", "c"):
+        store.append(session_id, "q", "a")
+    assert store.stats()["sessions"] == 2
+    assert store.history("a") is None
+    time.sleep(0.1)
+    assert store.stats()["sessions"] == 0
+    assert store.total_tokens == 0
+    assert not store.has_history("b")
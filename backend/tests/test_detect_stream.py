@@ -0,0 +1,42 @@
+import glob
+import os
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def scan():
+    path = sorted(glob.glob(os.path.join(BACKEND_DIR, 'training_data', 'stroke', '*.png')))[0]
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_stages_in_order(app_client, scan):
+    with app_client.websocket_connect("/ws/detect-stroke") as ws:
+        ws.send_bytes(scan)
+        stages = []
+        while not stages or stages[-1]["stage"] not in ("complete", "error"):
+            stages.append(ws.receive_json())
+    names = [message["stage"] for message in stages]
+    assert names[0] == "accepted"
+    assert names[-1] == "complete"
+    prediction = next(message for message in stages if message["stage"] == "prediction")
+    assert prediction["result"]["scan_id"] == stages[0]["scan_id"]
+
+
+def test_text_frame_gets_an_error_and_the_socket_stays_usable(app_client, scan):
+    with app_client.websocket_connect("/ws/detect-stroke") as ws:
+        ws.send_text("hello")
+        assert ws.receive_json()["stage"] == "error"
+        ws.send_bytes(scan)
+        assert ws.receive_json()["stage"] == "accepted"
+
+
+def test_invalid_query_parameter_closes_with_policy_violation(app_client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with app_client.websocket_connect("/ws/detect-stroke?mc_samples=lots") as ws:
+            ws.receive_json()
+    assert closed.value.code == 1008
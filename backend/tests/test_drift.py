@@ -0,0 +1,78 @@
+import numpy as np
+from PIL import Image
+
+from drift import DecayedHistogram, DriftMonitor, INTENSITY_BINS, MIN_OBSERVATIONS, psi, scan_summary
+
+
+def reference_for(image: Image.Image, pixels: np.ndarray, confidence: float = 50.0) -> dict:
+    """A reference profile made of a single repeated scan"""
+    monitor = DriftMonitor()
+    monitor.observe(image, pixels, confidence)
+    report = monitor.report()
+    profile = {name: feature["current"] for name, feature in report["features"].items()}
+    return {**profile, "samples": 1}
+
+
+def gray_pixels(value: float) -> np.ndarray:
+    return np.full((128, 128, 1), value, dtype=np.float32)
+
+
+def test_psi():
+    uniform = np.ones(10)
+    assert psi(uniform, uniform) == 0
+    assert psi(uniform, np.eye(10)[0]) > 1
+
+
+def test_decayed_histogram_favours_recent_observations():
+    histogram = DecayedHistogram(2, half_life=10)
+    for _ in range(100):
+        histogram.add(0)
+    for _ in range(30):
+        histogram.add(1)
+    assert histogram.distribution()[1] > 0.8
+    assert histogram.observations == 130
+    assert abs(histogram.distribution().sum() - 1) < 1e-9
+
+
+def test_summary_without_image_skips_size_and_mode():
+    summary = scan_summary(None, gray_pixels(0.5))
+    assert set(summary) == {"intensity", "mean_intensity"}
+    assert summary["intensity"].argmax() == INTENSITY_BINS // 2
+
+
+def test_status_warms_up_then_tracks_drift():
+    image = Image.new('RGBA', (512, 512))
+    monitor = DriftMonitor(reference_for(image, gray_pixels(0.3)))
+    assert monitor.report()["status"] == "unknown"
+    for _ in range(MIN_OBSERVATIONS - 1):
+        monitor.observe(image, gray_pixels(0.3), 50.0)
+    assert monitor.report()["status"] == "warming_up"
+    monitor.observe(image, gray_pixels(0.3), 50.0)
+    assert monitor.report()["status"] == "stable"
+
+    for _ in range(MIN_OBSERVATIONS):
+        monitor.observe(image, gray_pixels(0.9), 50.0)
+    report = monitor.report()
+    assert report["status"] == "significant_drift"
+    assert report["features"]["intensity"]["status"] == "significant_drift"
+
+
+def test_color_mode_is_informational_only():
+    # Training PNGs are RGBA, uploads are usually RGB or L: same grayscale input to the model
+    monitor = DriftMonitor(reference_for(Image.new('RGBA', (512, 512)), gray_pixels(0.3)))
+    for n in range(MIN_OBSERVATIONS):
+        monitor.observe(Image.new('RGB' if n % 2 else 'L', (512, 512)), gray_pixels(0.3), 50.0)
+    report = monitor.report()
+    mode = report["features"]["mode"]
+    assert mode["informational"] is True
+    assert mode["status"] == "significant_drift"
+    assert report["max_psi"] < mode["psi"]
+    assert report["status"] == "stable"
+
+
+def test_tensor_inputs_leave_size_and_mode_unscored():
+    monitor = DriftMonitor(reference_for(Image.new('L', (128, 128)), gray_pixels(0.3)))
+    monitor.observe(None, gray_pixels(0.3), 50.0)
+    features = monitor.report()["features"]
+    assert "psi" not in features["size"] and "psi" not in features["mode"]
+    assert features["intensity"]["psi"] == 0
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from explainability import DEGRADE_AT, LEVELS, DeferredScans, ExplainabilityController
+
+
+def test_degrades_with_requests_in_flight_and_recovers_one_level_at_a_time():
+    controller = ExplainabilityController(max_in_flight=2, recover_after=10)
+    assert controller.choose(now=0) == "full"
+
+    queued = [0]
+    controller.queue_depth = lambda: queued[0]
+    queued[0] = 5  # pressure 2.5
+    assert controller.choose(now=1) == "deferred"
+
+    queued[0] = 0
+    assert controller.choose(now=2) == "deferred"   # calm period starts
+    assert controller.choose(now=11) == "deferred"
+    assert controller.choose(now=12) == "heatmap"
+    assert controller.choose(now=22) == "low_res"
+    assert controller.stats()["transitions"] == 3
+
+
+def test_hysteresis_keeps_the_level_near_the_threshold():
+    controller = ExplainabilityController(max_in_flight=10, recover_after=0)
+    depth = [11]
+    controller.queue_depth = lambda: depth[0]
+    assert controller.choose(now=0) == "low_res"
+    # Below the threshold but above RECOVER_RATIO of it: stays degraded
+    depth[0] = 9
+    for now in range(1, 5):
+        assert controller.choose(now=now) == "low_res"
+
+
+def test_latency_includes_the_explanation():
+    # Scoring alone is under target; with a full Grad-CAM pass the detection is not
+    controller = ExplainabilityController(target_latency_ms=1000, alpha=1.0)
+    controller.record_latency(1.2)
+    assert controller.choose(now=0) == LEVELS[1]
+    # A cheaper explanation lowers the observed latency, so pressure can drop again
+    controller.record_latency(0.5)
+    assert controller.pressure() < DEGRADE_AT[0]
+
+
+def test_track_counts_in_flight():
+    controller = ExplainabilityController(max_in_flight=1)
+    with controller.track():
+        assert controller.pressure() == 1.0
+        with pytest.raises(RuntimeError):
+            with controller.track():
+                raise RuntimeError()
+        assert controller.in_flight == 1
+    assert controller.in_flight == 0
+
+
+def test_fixed_level():
+    controller = ExplainabilityController(fixed_level="heatmap", max_in_flight=1)
+    controller.queue_depth = lambda: 100
+    assert controller.choose() == "heatmap"
+    assert controller.stats()["mode"] == "fixed"
+    with pytest.raises(ValueError):
+        ExplainabilityController(fixed_level="blurry")
+
+
+def test_deferred_scans_are_bounded():
+    scans = DeferredScans(max_entries=2)
+    for scan_id in ("a", "b", "c"):
+        scans.put(scan_id, scan_id, None)
+    assert scans.pop("a") is None
+    assert scans.pop("c") == ("c", None)
+    assert scans.pop("c") is None
+
+
+def test_detection_latency_covers_grad_cam(app_client, backend_main, scan_bytes, monkeypatch):
+    recorded = []
+    explain_scan = backend_main.explain_scan
+
+    def slow_explain(*args):
+        time.sleep(0.2)
+        return explain_scan(*args)
+
+    monkeypatch.setattr(backend_main, "explain_scan", slow_explain)
+    monkeypatch.setattr(backend_main.explainability, "record_latency", recorded.append)
+    monkeypatch.setattr(backend_main, "cached_stroke_result", lambda key: None)
+    app_client.post("/api/detect-stroke", files={"file": ("scan.png", scan_bytes, "image/png")})
+    assert recorded and recorded[0] >= 0.2
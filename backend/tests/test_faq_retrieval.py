@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from faq_retrieval import FaqIndex, analyze
+
+FAQ_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'faq.jsonl')
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FaqIndex.from_file(FAQ_PATH)
+
+
+@pytest.mark.parametrize("question", [
+    "What are stroke symptoms?",
+    "what is a TIA",
+    "What is aphasia?",
+])
+def test_confident_answers(index, question):
+    passage = index.best(question)
+    assert passage is not None
+    assert passage["confidence"] >= index.min_confidence
+
+
+def test_confidence_is_bounded(index):
+    for result in index.search("stroke symptoms treatment recovery", k=5):
+        assert 0 < result["confidence"] <= 1
+
+
+@pytest.mark.parametrize("question", ["stroke", "strokes?", "qwerty asdf", ""])
+def test_single_common_term_or_unknown_words_are_rejected(index, question):
+    assert index.best(question) is None
+
+
+def test_help_is_not_a_stopword():
+    assert "help" in analyze("I need help")
+
+
+@pytest.mark.parametrize("message", [
+    "help stroke",
+    "I need help, stroke!",
+    "emergency stroke",
+    "call 911",
+    # Greetings and questions rank above emergency in the intent table
+    "hello, emergency!",
+    "hi, please help, my dad is having a stroke",
+    "who do I call in an emergency",
+    "call 108 now, what are the signs",
+])
+def test_emergencies_skip_faq_and_cache(app_client, backend_main, message):
+    emergency = backend_main.intent_matcher.match_with_response("emergency")[1]
+    for _ in range(2):
+        reply = app_client.post("/api/chat", json={"message": message}).json()
+        assert reply["response"] == emergency
+        assert reply["source"] == "rules"
+        assert reply["cached"] is False
+
+
+def test_knowledge_base_answers_are_cached(app_client):
+    first = app_client.post("/api/chat", json={"message": "What are the symptoms of a stroke?"}).json()
+    second = app_client.post("/api/chat", json={"message": "stroke symptoms"}).json()
+    assert first["source"] == "faq"
+    assert second["response"] == first["response"]
+    assert second["cached"] is True
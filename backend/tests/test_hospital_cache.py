@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from benchmark_hospitals import synthetic_facilities
+from hospital_cache import HospitalTileCache, etag_matches, geohash, radius_bucket, response_etag
+from hospital_index import HospitalIndex, save_facilities, FLAG_NEUROLOGY
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    facilities, _ = synthetic_facilities(20000, cities=50, seed=3)
+    path = str(tmp_path_factory.mktemp("hospitals") / "hospitals.npz")
+    save_facilities(path, facilities)
+    return HospitalIndex(path)
+
+
+def test_tile_cache_agrees_with_the_index(index):
+    cache = HospitalTileCache(index, max_candidates=200)
+    rng = np.random.default_rng(11)
+    rows = rng.choice(index.count, 300)
+    lats = index.lat[rows] + rng.normal(0, 0.05, len(rows))
+    lons = index.lon[rows] + rng.normal(0, 0.05, len(rows))
+    cases = [(10, 20, 0), (50, 20, 0), (None, 20, 0), (None, 5, FLAG_NEUROLOGY), (500, 10, 0)]
+    for lat, lon in zip(lats, lons):
+        for radius, k, flags in cases:
+            cached, _ = cache.search(float(lat), float(lon), radius, k, flags)
+            direct = index.search(float(lat), float(lon), radius, k, flags)
+            assert [f["distance_km"] for f in cached] == [f["distance_km"] for f in direct]
+            assert {f["name"] for f in cached} == {f["name"] for f in direct}
+    stats = cache.stats()
+    assert stats["hits"] > 0
+    assert stats["bypassed"] == len(lats)
+
+
+def test_geohash_and_buckets():
+    tile, (lat_min, lat_max, lon_min, lon_max) = geohash(57.64911, 10.40744, 5)
+    assert tile == "u4pru"
+    assert lat_min <= 57.64911 <= lat_max and lon_min <= 10.40744 <= lon_max
+    assert radius_bucket(None) is None
+    assert radius_bucket(7) == 10
+    assert radius_bucket(1000) is False
+
+
+def test_weak_etag():
+    etag = response_etag({"hospitals": []})
+    assert etag.startswith('W/"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag[2:], etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('W/"other"', etag)
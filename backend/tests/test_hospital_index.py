@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from hospital_index import (FLAG_EMERGENCY, FLAG_HOSPITAL, FLAG_NEUROLOGY, HospitalIndex, haversine_km,
+                            load_hospital_index, save_facilities)
+
+
+def random_facilities(count: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    # Clusters at the antimeridian and near the poles next to uniform noise
+    lats = np.concatenate([rng.uniform(-89.9, 89.9, count // 2), rng.normal(0, 1, count // 4),
+                           rng.uniform(85, 89.9, count - count // 2 - count // 4)])
+    lons = np.concatenate([rng.uniform(-180, 180, count // 2),
+                           (rng.normal(180, 0.5, count // 4) + 180) % 360 - 180,
+                           rng.uniform(-180, 180, count - count // 2 - count // 4)])
+    flags = rng.choice([FLAG_HOSPITAL, FLAG_HOSPITAL | FLAG_NEUROLOGY, FLAG_HOSPITAL | FLAG_EMERGENCY], count)
+    return [{"lat": float(lat), "lon": float(lon), "flags": int(flag), "name": f"Facility {i} – Ü",
+             "phone": str(i)} for i, (lat, lon, flag) in enumerate(zip(lats, lons, flags))]
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("hospitals") / "hospitals.npz")
+    save_facilities(path, random_facilities(5000), cell_degrees=0.5)
+    return HospitalIndex(path)
+
+
+def brute_force(index, lat, lon, radius_km, k, flags=0):
+    distances = haversine_km(lat, lon, index.lat, index.lon)
+    rows = np.arange(index.count)
+    mask = ((index.flags & flags) == flags) & (distances <= (radius_km if radius_km is not None else np.inf))
+    rows, distances = rows[mask], distances[mask]
+    order = np.argsort(distances, kind='stable')[:k]
+    return distances[order]
+
+
+QUERIES = [(0.5, 179.9), (0.0, -179.95), (89.5, 10.0), (-89.0, -45.0), (45.0, 7.0), (12.3, 99.9)]
+
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+@pytest.mark.parametrize("radius_km, k, flags", [
+    (50, 10, 0), (300, 25, 0), (1000, 5, FLAG_NEUROLOGY), (None, 15, 0), (None, 3, FLAG_EMERGENCY),
+])
+def test_search_matches_brute_force(index, lat, lon, radius_km, k, flags):
+    found = index.search(lat, lon, radius_km, k, flags)
+    expected = brute_force(index, lat, lon, radius_km, k, flags)
+    assert [f["distance_km"] for f in found] == [round(float(d), 2) for d in expected]
+    if flags & FLAG_NEUROLOGY:
+        assert all(f["neurology"] for f in found)
+
+
+def test_random_queries_match_brute_force(index):
+    rng = np.random.default_rng(3)
+    for lat, lon in zip(rng.uniform(-90, 90, 200), rng.uniform(-180, 180, 200)):
+        found = index.search(float(lat), float(lon), 500, 10)
+        expected = brute_force(index, float(lat), float(lon), 500, 10)
+        assert [f["distance_km"] for f in found] == [round(float(d), 2) for d in expected]
+
+
+def test_text_columns_and_stats(index):
+    facility = index.search(45.0, 7.0, None, 1)[0]
+    assert facility["name"].endswith("– Ü")
+    assert facility["address"] == ""
+    stats = index.stats()
+    assert stats["facilities"] == 5000
+    assert 0 < stats["neurology"] < 5000
+
+
+def test_missing_or_invalid_index(tmp_path):
+    assert load_hospital_index(str(tmp_path / "missing.npz")) is None
+    broken = tmp_path / "broken.npz"
+    broken.write_bytes(b"not a zip")
+    assert load_hospital_index(str(broken)) is None
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from intent_matcher import IntentMatcher
+
+INTENTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'intents.json')
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return IntentMatcher.from_file(INTENTS_PATH)
+
+
+@pytest.mark.parametrize("message", ["this", "which one", "history", "thistle"])
+def test_keywords_match_whole_words_only(matcher, message):
+    # "hi" is a greeting keyword; substrings of other words are not
+    assert matcher.match(message) != "greeting"
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("Hi!", "greeting"),
+    ("good morning", "greeting"),
+    ("What are the symptoms?", "symptoms"),
+    ("how do I prevent it", "prevention"),
+    ("preventing a second one", "prevention"),
+    ("who is at risk", "risk_factors"),
+    ("call 911", "emergency"),
+    ("please help", "emergency"),
+])
+def test_intents(matcher, message, intent):
+    assert matcher.match(message) == intent
+
+
+def test_prefix_keywords_anchor_at_word_start(matcher):
+    # 'symptom*' must not match inside another word
+    assert matcher.match("asymptomatic") != "symptoms"
+
+
+def test_first_intent_in_table_wins(matcher):
+    assert matcher.match("hello, what are the symptoms") == "greeting"
+
+
+def test_fallback(matcher):
+    intent, response = matcher.match_with_response("qwerty")
+    assert intent is None
+    assert response == matcher.fallback
+
+
+@pytest.mark.parametrize("message, intents", [
+    ("hello, emergency!", ["greeting", "emergency"]),
+    ("who do I call in an emergency", ["risk_factors", "emergency"]),
+    ("good morning, what are the symptoms", ["greeting", "symptoms"]),
+    ("qwerty", []),
+])
+def test_matches_returns_every_intent_in_priority_order(matcher, message, intents):
+    assert matcher.matches(message) == intents
+
+
+def test_shared_keywords_and_overlapping_phrases():
+    matcher = IntentMatcher([
+        {"name": "a", "keywords": ["pain"], "phrases": ["chest pain"], "response": "A"},
+        {"name": "b", "keywords": ["pain", "arm*"], "phrases": ["pain left"], "response": "B"},
+    ], fallback="?")
+    assert matcher.matches("pain") == ["a", "b"]
+    assert matcher.matches("chest pain left arm") == ["a", "b"]
+    assert matcher.match("armpit") == "b"
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+from jobs import JobStore, JobManager, JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED
+
+
+def run_jobs(manager: JobManager, recover: bool = True, settle: float = 0.3):
+    async def scenario():
+        await manager.start(recover=recover)
+        await asyncio.sleep(settle)
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    store = JobStore(db_path=db_path)
+    queued = store.create("work", {"n": 1})
+    running = store.create("work", {"n": 2})
+    store.update(running["id"], status=JOB_RUNNING)
+    store.close()
+
+    manager = JobManager(JobStore(db_path=db_path), {"work": lambda job_id, payload: payload["n"] * 10})
+    run_jobs(manager)
+
+    reopened = JobStore(db_path=db_path)
+    assert reopened.get(queued["id"])["status"] == JOB_COMPLETED
+    assert reopened.get(queued["id"])["result"] == 10
+    assert reopened.get(running["id"])["result"] == 20
+    # Finished jobs drop their input payload
+    assert reopened.get(running["id"])["payload"] is None
+
+
+def test_interrupted_job_without_payload_fails(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    store = JobStore(db_path=db_path)
+    job = store.create("work", None)
+    store.close()
+
+    manager = JobManager(JobStore(db_path=db_path), {"work": lambda job_id, payload: 1})
+    run_jobs(manager)
+
+    job = JobStore(db_path=db_path).get(job["id"])
+    assert job["status"] == JOB_FAILED
+    assert "restart" in job["error"]
+
+
+def test_eviction_keeps_unfinished_jobs(tmp_path):
+    store = JobStore(db_path=str(tmp_path / "jobs.db"), max_jobs=3)
+    pending = store.create("work", {})
+    finished = []
+    for _ in range(4):
+        job = store.create("work", {})
+        store.update(job["id"], status=JOB_COMPLETED, result=True)
+        finished.append(job["id"])
+    store.create("work", {})
+
+    assert store.get(pending["id"])["status"] == JOB_QUEUED
+    # Oldest finished jobs go first, from memory and from the database
+    assert store.get(finished[0]) is None
+    assert JobStore(db_path=str(tmp_path / "jobs.db")).get(finished[0]) is None
+    assert store.get(finished[-1]) is not None
+
+
+def test_shared_store_runs_each_job_once(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    store = JobStore(db_path=db_path)
+    ids = [store.create("work", {"n": n})["id"] for n in range(10)]
+    store.close()
+
+    runs = []
+    lock = threading.Lock()
+
+    def handler(job_id, payload):
+        with lock:
+            runs.append(job_id)
+        return payload["n"]
+
+    async def scenario():
+        # Two worker processes sharing JOB_STORE_PATH, as with serve.py
+        first = JobManager(JobStore(db_path=db_path), {"work": handler})
+        second = JobManager(JobStore(db_path=db_path), {"work": handler})
+        await first.start(recover=False)
+        await second.start(recover=False)
+        submitted = first.submit("work", {"n": 99})
+        await asyncio.sleep(0.3)
+        # The other process reports the status of a job it never saw
+        status = second.store.get(submitted["id"])["status"]
+        await first.stop()
+        await second.stop()
+        return status
+
+    assert asyncio.run(scenario()) == JOB_COMPLETED
+    assert sorted(runs) == sorted(set(runs))
+    assert set(ids) <= set(runs)
+
+
+def test_claim_is_exclusive(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    first = JobStore(db_path=db_path)
+    job = first.create("work", {})
+    second = JobStore(db_path=db_path)
+
+    assert first.claim(job["id"]) is not None
+    assert second.claim(job["id"]) is None
+    assert second.get(job["id"])["status"] == JOB_RUNNING
+
+
+def test_waiters_see_jobs_finished_by_another_process(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+
+    def slow(job_id, payload):
+        time.sleep(0.3)
+        return "done"
+
+    async def scenario():
+        runner = JobManager(JobStore(db_path=db_path), {"work": slow})
+        # A second worker process: its condition is never notified for this job
+        other = JobManager(JobStore(db_path=db_path), {"work": slow})
+        await runner.start(recover=False)
+        await other.start(recover=False)
+        job = runner.submit("work", {})
+
+        start = time.monotonic()
+        waited = await other.wait(job["id"], timeout=10)
+        wait_seconds = time.monotonic() - start
+
+        second = runner.submit("work", {})
+        statuses = []
+        async for update in other.watch(second["id"], heartbeat=10):
+            statuses.append(update["status"] if update else None)
+        await runner.stop()
+        await other.stop()
+        return waited, wait_seconds, statuses
+
+    waited, wait_seconds, statuses = asyncio.run(scenario())
+    assert waited["status"] == JOB_COMPLETED
+    assert wait_seconds < 2
+    assert statuses[-1] == JOB_COMPLETED
+    assert None not in statuses
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from loop_monitor import LoopLagMonitor
+from metrics import Histogram
+
+
+def blocking_sleep(seconds: float):
+    time.sleep(seconds)
+
+
+def run_blocked(monitor: LoopLagMonitor, block: float):
+    async def scenario():
+        await monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_sleep(block)  # a blocking call inside async code
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+
+def test_lag_histogram_records_blocking():
+    monitor = LoopLagMonitor(interval=0.01)
+    run_blocked(monitor, 0.2)
+    lag = monitor.stats()["lag_ms"]
+    assert lag["count"] >= 3
+    assert lag["max"] >= 150
+    assert monitor.stats()["stalls_captured"] == 0
+
+
+def test_stall_capture_names_the_blocking_call():
+    monitor = LoopLagMonitor(interval=0.01, stall_threshold=0.05, capture_stalls=True)
+    run_blocked(monitor, 0.3)
+    stalls = monitor.recent_stalls()
+    # One stall per blocking episode, with its duration kept up to date
+    assert len(stalls) == 1
+    assert stalls[0]["blocked_ms"] >= 200
+    assert any("blocking_sleep" in line for line in stalls[0]["stack"])
+    assert monitor.recent_stalls(limit=0) == []
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(1, 10, 100))
+    assert histogram.quantile(0.5) is None
+    for value in (0.5, 5, 5, 50):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert (snapshot["count"], snapshot["max"], snapshot["p50"]) == (4, 50, 10)
+    assert [bucket["count"] for bucket in snapshot["buckets"]] == [1, 3, 4, 4]
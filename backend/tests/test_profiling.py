@@ -0,0 +1,101 @@
+import json
+import marshal
+import time
+from collections import Counter
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import ProfilingMiddleware, RequestProfiler, collapsed_stacks, speedscope_profile
+
+
+def busy_handler_work(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def make_client(profiler: RequestProfiler) -> TestClient:
+    app = FastAPI()
+
+    # async: cprofile mode profiles the event-loop thread
+    @app.get("/api/work")
+    async def work():
+        busy_handler_work(0.1)
+        return {"ok": True}
+
+    @app.get("/api/other")
+    def other():
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return TestClient(app)
+
+
+def test_token_header_profiles_one_request():
+    profiler = RequestProfiler(token="secret", sample_interval=0.002)
+    client = make_client(profiler)
+    assert "x-profile-id" not in client.get("/api/work").headers
+    assert "x-profile-id" not in client.get("/api/work", headers={"X-Profile": "wrong"}).headers
+
+    response = client.get("/api/work", headers={"X-Profile": "secret"})
+    record = profiler.get(response.headers["x-profile-id"])
+    assert record["status_code"] == 200
+    assert record["summary"]["samples"] > 0
+    assert "busy_handler_work" in record["artifacts"]["collapsed"].decode()
+    speedscope = json.loads(record["artifacts"]["speedscope"])
+    assert speedscope["profiles"][0]["type"] == "sampled"
+
+
+def test_armed_profiler_matches_prefix_and_count():
+    profiler = RequestProfiler()
+    client = make_client(profiler)
+    assert not profiler.active
+    profiler.arm(2, "/api/work", mode="cprofile")
+    assert "x-profile-id" not in client.get("/api/other").headers
+    ids = [client.get("/api/work").headers.get("x-profile-id") for _ in range(3)]
+    assert ids[0] and ids[1] and ids[2] is None
+    record = profiler.get(ids[0])
+    assert record["mode"] == "cprofile"
+    assert any("busy_handler_work" in key[2] for key in marshal.loads(record["artifacts"]["pstats"]))
+    assert [view["id"] for view in profiler.list()] == [ids[1], ids[0]]
+    with pytest.raises(ValueError):
+        profiler.arm(1, mode="perf")
+
+
+def test_ring_buffer_and_single_session():
+    profiler = RequestProfiler(max_profiles=2)
+    session = profiler.begin("GET", "/a", "sample")
+    assert profiler.begin("GET", "/b", "sample") is None
+    profiler.finish(session, 200)
+    for _ in range(2):
+        profiler.finish(profiler.begin("GET", "/c", "sample"), 200)
+    assert len(profiler.list()) == 2
+    assert profiler.get(session.id) is None
+
+
+def test_export_formats():
+    samples = Counter({"main;handler;work": 3, "main;handler": 1})
+    assert collapsed_stacks(samples) == "main;handler;work 3\nmain;handler 1\n"
+    profile = speedscope_profile(samples, "GET /", 5.0)
+    assert [frame["name"] for frame in profile["shared"]["frames"]] == ["main", "handler", "work"]
+    assert profile["profiles"][0]["endValue"] == 20.0
+
+
+def test_admin_endpoints_need_the_token(app_client, backend_main, monkeypatch):
+    assert app_client.get("/api/admin/profiles").status_code == 403
+    monkeypatch.setattr(backend_main, "ADMIN_TOKEN", "admin")
+    headers = {"X-Admin-Token": "admin"}
+    assert app_client.get("/api/admin/profiles", headers={"X-Admin-Token": "nope"}).status_code == 403
+
+    armed = app_client.post("/api/admin/profiling", headers=headers,
+                            json={"count": 1, "path_prefix": "/api/health", "mode": "sample"})
+    assert armed.json()["armed"] == 1
+    profile_id = app_client.get("/api/health").headers["x-profile-id"]
+    detail = app_client.get(f"/api/admin/profiles/{profile_id}", headers=headers).json()
+    assert detail["formats"] == ["collapsed", "speedscope"]
+    download = app_client.get(f"/api/admin/profiles/{profile_id}/download?format=collapsed", headers=headers)
+    assert download.status_code == 200
+    assert app_client.get(f"/api/admin/profiles/{profile_id}/download?format=pstats",
+                          headers=headers).status_code == 404
@@ -0,0 +1,74 @@
+import os
+
+from result_store import ScanResultStore, scan_hash, is_scan_hash, model_fingerprint
+
+SCAN = scan_hash(b"scan bytes")
+
+
+def test_key_depends_on_model_and_variant():
+    keys = {
+        ScanResultStore.key(SCAN),
+        ScanResultStore.key(SCAN, model="0123456789abcdef"),
+        ScanResultStore.key(SCAN, "robust-mc0"),
+        ScanResultStore.key(SCAN, "robust-mc0", model="0123456789abcdef"),
+    }
+    assert len(keys) == 4
+    assert all(key.startswith(SCAN) for key in keys)
+    assert is_scan_hash(SCAN)
+
+
+def test_model_fingerprint(tmp_path):
+    model = tmp_path / "model.h5"
+    model.write_bytes(b"weights v1")
+    first = model_fingerprint(str(model))
+    model.write_bytes(b"weights v2")
+    assert model_fingerprint(str(model)) != first
+    assert model_fingerprint(None) == "dummy"
+
+
+def test_results_survive_restart(tmp_path):
+    key = ScanResultStore.key(SCAN)
+    ScanResultStore(directory=str(tmp_path)).put(key, {"confidence": 42.0})
+    store = ScanResultStore(directory=str(tmp_path))
+    assert store.get(key) == {"confidence": 42.0}
+    assert store.get(ScanResultStore.key(SCAN, model="other")) is None
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    store = ScanResultStore(max_entries=2, directory=str(tmp_path), max_files=3)
+    keys = [ScanResultStore.key(scan_hash(bytes([n]))) for n in range(5)]
+    for key in keys:
+        store.put(key, {"key": key})
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{key}.json" for key in keys[2:])
+    assert store.stats()["files_evicted"] == 2
+
+    # The bound also applies to files left by an earlier process
+    assert len(os.listdir(tmp_path)) == 3
+    ScanResultStore(directory=str(tmp_path), max_files=1)
+    assert os.listdir(tmp_path) == [f"{keys[-1]}.json"]
+
+
+def test_no_temp_files_left(tmp_path):
+    store = ScanResultStore(directory=str(tmp_path))
+    for n in range(3):
+        store.put(ScanResultStore.key(SCAN), {"n": n})
+    assert os.listdir(tmp_path) == [f"{ScanResultStore.key(SCAN)}.json"]
+
+
+def test_stored_results_need_the_result_token(app_client, scan_bytes):
+    detected = app_client.post("/api/detect-stroke", files={"file": ("scan.png", scan_bytes, "image/png")}).json()
+    scan_id, token = detected["scan_id"], detected["result_token"]
+    assert token
+
+    # The hash alone is echoed back as scan_id, so it must not unlock the result
+    for guess in (None, "", "0" * 32):
+        check = app_client.post("/api/scans/check", json={"sha256": scan_id, "result_token": guess}).json()
+        assert check["found"] is False
+        assert "result" not in check
+    check = app_client.post("/api/scans/check", json={"sha256": scan_id, "result_token": token}).json()
+    assert check["found"] is True
+    assert check["result"]["confidence"] == detected["confidence"]
+    assert check["result"]["result_token"] == token
+
+    similar = app_client.get("/api/similar-cases", params={"scan_id": scan_id})
+    assert similar.status_code == 403
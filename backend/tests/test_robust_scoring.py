@@ -0,0 +1,36 @@
+import numpy as np
+
+
+def test_tta_batch_holds_original_flip_and_shifts(backend_main):
+    image = np.arange(16 * 16, dtype=np.float32).reshape(1, 16, 16, 1)
+    batch = backend_main.build_tta_batch(image)
+    assert batch.shape == (6, 16, 16, 1)
+    np.testing.assert_array_equal(batch[0], image[0])
+    np.testing.assert_array_equal(batch[1], image[0][:, ::-1])
+
+
+def test_shift_fills_the_exposed_border_with_black(backend_main):
+    image = np.ones((8, 8, 1), dtype=np.float32)
+    shifted = backend_main.shift_image(image, 2, -3)
+    assert shifted[:2].sum() == 0
+    assert shifted[:, -3:].sum() == 0
+    assert shifted[2:, :-3].min() == 1
+    np.testing.assert_array_equal(backend_main.shift_image(image, 0, 0), image)
+
+
+def test_mc_samples_are_capped_in_the_result_key(backend_main):
+    scan_id = "a" * 64
+    capped = backend_main.result_cache_key(scan_id, robust=True, mc_samples=10 ** 6)
+    assert capped == backend_main.result_cache_key(scan_id, robust=True, mc_samples=backend_main.MAX_MC_SAMPLES)
+    assert capped != backend_main.result_cache_key(scan_id)
+
+
+def test_robust_detection(app_client, scan_bytes):
+    response = app_client.post(
+        "/api/detect-stroke?robust=true&mc_samples=2",
+        files={"file": ("scan.png", scan_bytes, "image/png")}
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["robust_samples"] >= 1
+    assert 0 <= result["confidence"] <= 100
@@ -0,0 +1,57 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from scan_filter import ScanPrefilter, rejection_reason, scan_features
+
+
+def synthetic_scan(size: int = 128) -> Image.Image:
+    """Bright textured ellipse on a black background, like a brain slice"""
+    y, x = np.mgrid[:size, :size]
+    inside = ((x - size / 2) / (size * 0.3)) ** 2 + ((y - size / 2) / (size * 0.38)) ** 2 <= 1
+    pixels = np.where(inside, 90 + np.random.default_rng(0).integers(0, 120, (size, size)), 0)
+    return Image.fromarray(pixels.astype(np.uint8), 'L')
+
+
+def test_brain_scan_passes():
+    assert rejection_reason(scan_features(synthetic_scan())) is None
+
+
+def test_color_image_is_rejected():
+    photo = Image.fromarray(np.dstack([
+        np.full((64, 64), 200, np.uint8), np.full((64, 64), 40, np.uint8), np.full((64, 64), 90, np.uint8)
+    ]))
+    assert "color" in rejection_reason(scan_features(photo))
+
+
+def test_blank_image_is_rejected():
+    assert "blank" in rejection_reason(scan_features(Image.new('L', (64, 64), 0)))
+
+
+def test_light_background_is_rejected():
+    document = np.full((64, 64), 240, np.uint8)
+    document[20:40, 10:50] = np.random.default_rng(1).integers(0, 255, (20, 40))
+    assert "dark background" in rejection_reason(scan_features(Image.fromarray(document)))
+
+
+def test_stats_count_rejections_and_saved_compute():
+    prefilter = ScanPrefilter()
+    prefilter.record_pipeline_time(0.5)
+    assert prefilter.check(synthetic_scan()) is None
+    assert prefilter.check(Image.new('L', (64, 64), 0)) is not None
+    stats = prefilter.stats()
+    assert stats["checked"] == 2
+    assert stats["rejected"] == 1
+    assert stats["compute_saved_ms"] == 500.0
+
+
+def test_disabled_prefilter_accepts_everything():
+    assert ScanPrefilter(enabled=False).check(Image.new('L', (64, 64), 0)) is None
+
+
+def test_endpoint_rejects_non_scans_with_422(app_client):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (255, 0, 0)).save(buffer, format='PNG')
+    response = app_client.post("/api/detect-stroke", files={"file": ("selfie.png", buffer.getvalue(), "image/png")})
+    assert response.status_code == 422
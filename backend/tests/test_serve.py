@@ -0,0 +1,64 @@
+import argparse
+import gc
+import os
+import time
+
+import numpy as np
+import pytest
+
+import serve
+from jobs import JobStore, JOB_QUEUED, JOB_RUNNING
+from procmem import memory_summary, read_smaps_rollup
+
+linux_only = pytest.mark.skipif(read_smaps_rollup() is None, reason="needs /proc/<pid>/smaps_rollup")
+
+
+@linux_only
+def test_forked_child_shares_the_parents_pages():
+    weights = np.ones(64 * 1024 ** 2 // 8)  # 64 MB, like model weights loaded in the master
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        float(weights.sum())  # read only: pages stay shared
+        os.write(write, b"x")
+        time.sleep(5)
+        os._exit(0)
+    try:
+        os.close(write)
+        os.read(read, 1)
+        child = memory_summary(pid)
+        assert child["shared_mb"] >= 60
+        assert child["unique_mb"] < child["shared_mb"]
+    finally:
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+
+
+def test_memory_summary_of_missing_process():
+    assert memory_summary(2 ** 22 + 1) is None
+
+
+def test_listening_socket_is_inherited_by_workers():
+    sock = serve.bind_socket("127.0.0.1", 0)
+    try:
+        assert sock.get_inheritable()
+    finally:
+        sock.close()
+
+
+def test_master_requeues_interrupted_jobs_once(tmp_path, backend_main, monkeypatch):
+    db_path = str(tmp_path / "jobs.db")
+    store = JobStore(db_path=db_path)
+    job = store.create("detect", {})
+    store.update(job["id"], status=JOB_RUNNING)
+    store.close()
+
+    monkeypatch.setattr(backend_main, "JOB_STORE_PATH", db_path)
+    monkeypatch.setattr(backend_main, "jobs_recovered", False)
+    try:
+        serve.load_in_master(argparse.Namespace(preload=False, chatbot=False))
+    finally:
+        gc.unfreeze()
+    assert backend_main.jobs_recovered is True
+    assert JobStore(db_path=db_path).get(job["id"])["status"] == JOB_QUEUED
@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+
+from shadow import ShadowEvaluator
+
+
+class FixedModel:
+    def __init__(self, confidence: float):
+        self.confidence = confidence
+
+    def predict(self, tensor, verbose=0):
+        return np.array([[self.confidence]])
+
+
+def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_shadow_results_are_compared_with_production():
+    evaluator = ShadowEvaluator("candidate.h5", lambda path: FixedModel(0.7), sample_rate=1.0)
+    evaluator.start()
+    tensor = np.zeros((1, 128, 128, 1), dtype=np.float32)
+    evaluator.offer(tensor, primary_confidence=60.0, primary_latency_ms=5.0, scan_id="a")
+    evaluator.offer(tensor, primary_confidence=20.0, primary_latency_ms=7.0, scan_id="b")
+    wait_for(lambda: evaluator.stats()["evaluated"] == 2)
+
+    stats = evaluator.stats()
+    assert stats["status"] == "running"
+    assert stats["evaluated"] == 2
+    assert stats["agreement_rate"] == 0.5
+    assert stats["confidence_delta"]["max_abs"] == 50.0
+    assert [record["scan_id"] for record in stats["recent"]] == ["a", "b"]
+
+
+def test_offer_never_blocks_when_the_queue_is_full():
+    # The loader never finishes, so nothing is taken off the queue
+    evaluator = ShadowEvaluator("candidate.h5", lambda path: time.sleep(60), sample_rate=1.0, max_queue=2)
+    evaluator.start()
+    tensor = np.zeros((1, 128, 128, 1), dtype=np.float32)
+    start = time.perf_counter()
+    for _ in range(5):
+        evaluator.offer(tensor, 50.0, 1.0)
+    assert time.perf_counter() - start < 0.5
+    stats = evaluator.stats()
+    assert stats["status"] == "loading"
+    assert (stats["offered"], stats["dropped"], stats["queued"]) == (2, 3, 2)
+
+
+def test_sampling_and_load_errors():
+    unsampled = ShadowEvaluator("candidate.h5", lambda path: FixedModel(0.5), sample_rate=0.0)
+    unsampled.offer(np.zeros(1), 50.0, 1.0)
+    assert unsampled.stats()["offered"] == 0
+
+    def broken(path):
+        raise OSError("no such model")
+
+    failed = ShadowEvaluator("missing.h5", broken, sample_rate=1.0)
+    failed.start()
+    wait_for(lambda: failed.error is not None)
+    failed.offer(np.zeros(1), 50.0, 1.0)
+    stats = failed.stats()
+    assert stats["status"] == "error"
+    assert "no such model" in stats["error"]
+    assert stats["offered"] == 0
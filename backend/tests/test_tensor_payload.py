@@ -0,0 +1,65 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+SHAPE = "128,128,1"
+
+
+def npy(array: np.ndarray, version=None) -> bytes:
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, array, version=version)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("version", [(1, 0), (2, 0)])
+def test_npy_versions(backend_main, version):
+    array = np.full((128, 128, 1), 0.5, dtype=np.float32)
+    tensor = backend_main.parse_tensor_payload(npy(array, version))
+    assert tensor.shape == (1, 128, 128, 1)
+    assert float(tensor.max()) == 0.5
+
+
+def test_npy_version_3_is_rejected(backend_main):
+    body = bytearray(npy(np.zeros((128, 128, 1), dtype=np.float32), (2, 0)))
+    body[6] = 3
+    with pytest.raises(ValueError, match="format 3.0"):
+        backend_main.parse_tensor_payload(bytes(body))
+
+
+def test_raw_uint8_is_scaled(backend_main):
+    body = np.full(128 * 128, 255, dtype=np.uint8).tobytes()
+    tensor = backend_main.parse_tensor_payload(body, SHAPE, "uint8")
+    assert tensor.dtype == np.float32
+    assert float(tensor.max()) == 1.0
+
+
+@pytest.mark.parametrize("dtype", ["float16", "float32"])
+@pytest.mark.parametrize("value", [np.nan, np.inf, -0.1, 1.5, 255.0])
+def test_float_values_must_be_finite_and_in_range(backend_main, dtype, value):
+    array = np.zeros(128 * 128, dtype=dtype)
+    array[7] = value
+    with pytest.raises(ValueError, match="finite"):
+        backend_main.parse_tensor_payload(array.tobytes(), SHAPE, dtype)
+
+
+@pytest.mark.parametrize("body, shape, dtype", [
+    (np.zeros(64 * 64, dtype=np.uint8).tobytes(), "64,64,1", "uint8"),
+    (np.zeros(128 * 128, dtype=np.int32).tobytes(), SHAPE, "int32"),
+    (np.zeros(128 * 128, dtype=np.uint8).tobytes(), None, None),
+])
+def test_bad_shapes_and_dtypes(backend_main, body, shape, dtype):
+    with pytest.raises(ValueError):
+        backend_main.parse_tensor_payload(body, shape, dtype)
+
+
+def test_endpoint_rejects_invalid_tensors_with_400(app_client, scan_bytes):
+    array = np.full(128 * 128, np.nan, dtype=np.float32)
+    response = app_client.post("/api/detect-stroke/tensor", content=array.tobytes(),
+                               headers={"X-Tensor-Shape": SHAPE, "X-Tensor-Dtype": "float32"})
+    assert response.status_code == 400
+
+    image = Image.open(io.BytesIO(scan_bytes)).convert('L').resize((128, 128))
+    valid = (np.asarray(image, dtype=np.float32) / 255.0).reshape(128, 128, 1)
+    assert app_client.post("/api/detect-stroke/tensor", content=npy(valid)).status_code == 200
@@ -0,0 +1,102 @@
+import json
+import os
+
+import pytest
+
+from tracing import JsonlSpanExporter, Tracer, current_span, parse_traceparent, process_path
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+PARENT_ID = "b7ad6b7169203331"
+
+
+@pytest.mark.parametrize("value, expected", [
+    (f"00-{TRACE_ID}-{PARENT_ID}-01", (TRACE_ID, PARENT_ID, True)),
+    (f"00-{TRACE_ID}-{PARENT_ID}-00", (TRACE_ID, PARENT_ID, False)),
+    (f"ff-{TRACE_ID}-{PARENT_ID}-01", None),
+    (f"00-{'0' * 32}-{PARENT_ID}-01", None),
+    (f"00-{TRACE_ID}-xyz-01", None),
+    (None, None),
+])
+def test_parse_traceparent(value, expected):
+    assert parse_traceparent(value) == expected
+
+
+def read_spans(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_child_spans_continue_the_incoming_trace(tmp_path):
+    exporter = JsonlSpanExporter(str(tmp_path / "spans.jsonl"))
+    tracer = Tracer(exporter, sample_rate=0.0)
+
+    @tracer.traced("stage")
+    def stage():
+        return current_span().name
+
+    with tracer.start_trace("GET /", f"00-{TRACE_ID}-{PARENT_ID}-01") as root:
+        assert stage() == "stage"
+        with tracer.span("inner", size=3):
+            pass
+    exporter.flush()
+
+    spans = {span["name"]: span for span in read_spans(exporter.path)}
+    assert set(spans) == {"GET /", "stage", "inner"}
+    assert {span["trace_id"] for span in spans.values()} == {TRACE_ID}
+    assert spans["GET /"]["parent_span_id"] == PARENT_ID
+    assert spans["stage"]["parent_span_id"] == root.span_id
+    assert spans["inner"]["attributes"] == {"size": 3}
+
+
+def test_unsampled_traces_record_nothing(tmp_path):
+    exporter = JsonlSpanExporter(str(tmp_path / "spans.jsonl"))
+    tracer = Tracer(exporter, sample_rate=0.0)
+    with tracer.start_trace("GET /") as root:
+        with tracer.span("inner"):
+            pass
+    assert root.traceparent.endswith("-00")
+    exporter.flush()
+    assert not os.path.exists(exporter.path)
+
+
+def test_buffer_is_bounded_and_files_rotate(tmp_path):
+    exporter = JsonlSpanExporter(str(tmp_path / "spans.jsonl"), max_bytes=1, backups=2, max_buffer=2)
+    tracer = Tracer(exporter, sample_rate=1.0)
+    for _ in range(3):
+        tracer.start_trace("a").end()
+    assert exporter.dropped == 1
+    for _ in range(3):
+        exporter.flush()
+        tracer.start_trace("b").end()
+    exporter.flush()
+    names = sorted(os.listdir(tmp_path))
+    assert names == sorted(os.path.basename(exporter.path) + suffix for suffix in ("", ".1", ".2"))
+
+
+def test_every_process_writes_its_own_file(tmp_path):
+    base = str(tmp_path / "spans.jsonl")
+    # Created before the fork, like the exporter main.py builds at import
+    exporter = JsonlSpanExporter(base, flush_interval=0.01)
+    tracer = Tracer(exporter, sample_rate=1.0)
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            exporter.start()
+            tracer.start_trace("child").end()
+            exporter.stop()
+        finally:
+            os._exit(0)
+    exporter.start()
+    tracer.start_trace("parent").end()
+    exporter.stop()
+    os.waitpid(pid, 0)
+
+    assert exporter.path == process_path(base, os.getpid())
+    assert [span["name"] for span in read_spans(exporter.path)] == ["parent"]
+    assert [span["name"] for span in read_spans(process_path(base, pid))] == ["child"]
+
+
+def test_responses_carry_the_server_traceparent(app_client):
+    response = app_client.get("/api/health", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+    assert parse_traceparent(response.headers["traceparent"])[0] == TRACE_ID
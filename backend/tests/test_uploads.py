@@ -0,0 +1,112 @@
+import asyncio
+import base64
+import hashlib
+import os
+import time
+
+import pytest
+
+from uploads import ResumableUploads, UploadError, parse_checksum_header
+
+
+async def body(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def dropped(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+    raise ConnectionResetError("client went away")
+
+
+def checksum(data: bytes, algorithm: str = "sha256") -> str:
+    return f"{algorithm} {base64.b64encode(hashlib.new(algorithm, data).digest()).decode()}"
+
+
+def test_chunks_assemble_the_file(tmp_path):
+    uploads = ResumableUploads(directory=str(tmp_path))
+    upload = uploads.create(10, "scan.png", "image/png")
+    offset = asyncio.run(uploads.append(upload["id"], 0, body(b"01234")))
+    offset = asyncio.run(uploads.append(upload["id"], offset, body(b"56", b"789"), checksum(b"56789")))
+    meta = uploads.get(upload["id"])
+    assert offset == meta["offset"] == 10
+    assert uploads.is_complete(meta)
+    assert uploads.file_hash(upload["id"], block_size=3) == hashlib.sha256(b"0123456789").hexdigest()
+
+
+def test_resume_after_dropped_connection(tmp_path):
+    uploads = ResumableUploads(directory=str(tmp_path))
+    upload = uploads.create(6)
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(uploads.append(upload["id"], 0, dropped(b"abc")))
+    # Bytes received before the drop are kept, and a new store (server restart) sees them
+    restarted = ResumableUploads(directory=str(tmp_path))
+    assert restarted.get(upload["id"])["offset"] == 3
+    assert asyncio.run(restarted.append(upload["id"], 3, body(b"def"))) == 6
+
+
+@pytest.mark.parametrize("offset, chunk, header, status", [
+    (2, b"ab", None, 409),
+    (0, b"abcdefg", None, 413),
+    (0, b"ab", checksum(b"xy"), 460),
+])
+def test_rejected_chunks_are_discarded(tmp_path, offset, chunk, header, status):
+    uploads = ResumableUploads(directory=str(tmp_path))
+    upload = uploads.create(6)
+    with pytest.raises(UploadError) as error:
+        asyncio.run(uploads.append(upload["id"], offset, body(chunk), header))
+    assert error.value.status_code == status
+    assert uploads.get(upload["id"])["offset"] == 0
+
+
+@pytest.mark.parametrize("length, status", [(0, 400), (-1, 400), (101, 413)])
+def test_create_validates_length(tmp_path, length, status):
+    with pytest.raises(UploadError) as error:
+        ResumableUploads(directory=str(tmp_path), max_bytes=100).create(length)
+    assert error.value.status_code == status
+
+
+def test_checksum_header():
+    assert parse_checksum_header(None) is None
+    assert parse_checksum_header(checksum(b"x", "md5"))[0] == "md5"
+    for header in ("sha256", "crc32 AAAA", "sha256 abc"):
+        with pytest.raises(UploadError):
+            parse_checksum_header(header)
+
+
+def test_unknown_ids_and_expired_uploads(tmp_path):
+    uploads = ResumableUploads(directory=str(tmp_path), ttl_seconds=60)
+    for upload_id in ("missing", "../etc"):
+        with pytest.raises(UploadError) as error:
+            uploads.get(upload_id)
+        assert error.value.status_code == 404
+
+    stale = uploads.create(4)
+    old = time.time() - 120
+    os.utime(uploads.data_path(stale["id"]), (old, old))
+    fresh = uploads.create(4)
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{fresh['id']}.{ext}" for ext in ("json", "part"))
+
+
+def test_upload_endpoints(app_client, scan_bytes):
+    created = app_client.post("/api/uploads", headers={"Upload-Length": str(len(scan_bytes))})
+    assert created.status_code == 201
+    location = created.headers["Location"]
+    half = len(scan_bytes) // 2
+
+    patched = app_client.patch(location, content=scan_bytes[:half], headers={"Upload-Offset": "0"})
+    assert patched.status_code == 204
+    assert app_client.post(f"{location}/finalize").status_code == 409
+    assert app_client.head(location).headers["Upload-Offset"] == str(half)
+
+    conflict = app_client.patch(location, content=scan_bytes[half:], headers={"Upload-Offset": "0"})
+    assert conflict.status_code == 409
+    app_client.patch(location, content=scan_bytes[half:],
+                     headers={"Upload-Offset": str(half), "Upload-Checksum": checksum(scan_bytes[half:])})
+
+    result = app_client.post(f"{location}/finalize")
+    assert result.status_code == 200
+    assert result.json()["scan_id"] == hashlib.sha256(scan_bytes).hexdigest()
+    # The raw upload is gone once the result is stored
+    assert app_client.head(location).status_code == 404
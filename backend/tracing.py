@@ -0,0 +1,306 @@
+"""
+BrainHealth AI - Lightweight Tracing
+Per-request spans with OpenTelemetry-compatible IDs and W3C `traceparent`
+propagation, exported in batches by a background thread
+
+- The current span lives in a contextvar, so it follows the request into
+  run_in_threadpool stages; background jobs carry a traceparent in their payload
+- Head sampling: an incoming sampled traceparent is honoured, otherwise a new
+  trace is recorded with probability `sample_rate`. Unsampled requests still
+  get IDs (for propagation) but record nothing
+- Finished spans go into a bounded buffer; the exporter thread writes them as
+  JSON lines to a size-rotated file. The request path never touches the disk,
+  and spans are dropped (and counted) if the buffer is full
+- Each process writes (and rotates) its own file, with its pid in the name
+  (traces/spans.jsonl -> traces/spans.<pid>.jsonl), so pre-forked workers never
+  append to or rename a file another worker is writing
+"""
+
+import functools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+SERVICE_NAME = 'brainhealth-ai'
+
+
+def process_path(path: str, pid: Optional[int] = None) -> str:
+    """Per-process variant of an export path: spans.jsonl -> spans.<pid>.jsonl"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+def new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+def parse_traceparent(value: Optional[str]):
+    """'00-<32 hex trace id>-<16 hex parent id>-<2 hex flags>' -> (trace_id, parent_id, sampled)"""
+    if not value:
+        return None
+    parts = value.strip().split('-')
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[0] == 'ff':
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+class Span:
+    """A timed operation; recording spans are exported when they end"""
+
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'sampled', 'kind',
+                 'attributes', 'start_ns', 'end_ns', 'status', '_token')
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str],
+                 sampled: bool, kind: str = 'internal', attributes: Optional[Dict[str, Any]] = None,
+                 start_ns: Optional[int] = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = 'OK'
+        self._token = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def end(self, end_ns: Optional[int] = None):
+        if self.end_ns is None:
+            self.end_ns = end_ns or time.time_ns()
+            if self.sampled:
+                self.tracer.exporter.export(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.sampled:
+            self.status = 'ERROR'
+            self.attributes['error'] = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self.end()
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "service.name": SERVICE_NAME,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class JsonlSpanExporter:
+    """Bounded span buffer flushed to a rotating JSON-lines file by a background thread"""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 ** 2, backups: int = 3,
+                 max_buffer: int = 10000, flush_interval: float = 1.0, batch_size: int = 512):
+        self.base_path = path
+        self.path = process_path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._buffer: deque = deque()
+        self._max_buffer = max_buffer
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # Resolved here, not in __init__: the exporter may be created before a fork
+        self.path = process_path(self.base_path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def export(self, span: Span):
+        """Request path: append to the buffer, never blocks on I/O"""
+        if len(self._buffer) >= self._max_buffer:
+            self.dropped += 1
+            return
+        self._buffer.append(span)
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        lines = []
+        while self._buffer:
+            lines.append(json.dumps(self._buffer.popleft().to_dict()))
+        if not lines:
+            return
+        try:
+            self._rotate_if_needed()
+            with open(self.path, 'a') as f:
+                f.write("\n".join(lines) + "\n")
+            self.exported += len(lines)
+        except OSError as e:
+            self.dropped += len(lines)
+            print(f"❌ Span export failed: {e}")
+
+    def _rotate_if_needed(self):
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except FileNotFoundError:
+            return
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class Tracer:
+    """Creates spans under the current context and decides sampling for new traces"""
+
+    def __init__(self, exporter: JsonlSpanExporter, sample_rate: float = 0.1, enabled: bool = True):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None, kind: str = 'server',
+                    attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None) -> Span:
+        """Root span of a request or job, continuing an incoming traceparent if there is one"""
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = new_trace_id(), None
+            sampled = random.random() < self.sample_rate
+        return Span(self, name, trace_id, parent_id, self.enabled and sampled, kind, attributes, start_ns)
+
+    def span(self, name: str, **attributes) -> Span:
+        """Child of the current span (a new root when called outside any trace)"""
+        parent = _current_span.get()
+        if parent is None:
+            return self.start_trace(name, kind='internal', attributes=attributes)
+        return Span(self, name, parent.trace_id, parent.span_id, parent.sampled, 'internal',
+                    attributes if parent.sampled else None)
+
+    def traced(self, name: Optional[str] = None) -> Callable:
+        """Decorator: run the function inside a child span (only when a trace is active)"""
+        def decorator(func):
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                parent = _current_span.get()
+                if parent is None or not parent.sampled:
+                    return func(*args, **kwargs)
+                with Span(self, span_name, parent.trace_id, parent.span_id, True):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "export_path": self.exporter.path,
+            "exported": self.exporter.exported,
+            "dropped": self.exporter.dropped,
+            "buffered": len(self.exporter._buffer),
+        }
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the server span of every HTTP request"""
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b'traceparent':
+                traceparent = value.decode('latin-1')
+                break
+        span = self.tracer.start_trace(f"{scope['method']} {scope['path']}", traceparent)
+        span.set_attribute("http.method", scope["method"])
+        span.set_attribute("http.target", scope["path"])
+
+        async def send_with_traceparent(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = 'ERROR'
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"traceparent", span.traceparent.encode())]
+                }
+            await send(message)
+
+        with span:
+            await self.app(scope, receive, send_with_traceparent)
@@ -0,0 +1,166 @@
+"""
+BrainHealth AI - Resumable Uploads
+tus-style chunked upload protocol for large scans over unreliable networks
+
+create -> PATCH chunks at an offset (optionally with a checksum) -> finalize.
+Chunks are streamed straight to a file on disk, the file size is the source of
+truth for the current offset, so an interrupted upload (or a server restart)
+resumes from the last byte received instead of starting over.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+CHECKSUM_ALGORITHMS = ('sha256', 'sha1', 'md5')
+
+
+class UploadError(Exception):
+    """Upload protocol violation; status_code follows the tus conventions"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def parse_checksum_header(value: Optional[str]):
+    """Parse 'Upload-Checksum: <algorithm> <base64 digest>'"""
+    if not value:
+        return None
+    try:
+        algorithm, digest = value.strip().split(' ', 1)
+        algorithm = algorithm.lower()
+        expected = base64.b64decode(digest)
+    except ValueError:
+        raise UploadError(400, "Upload-Checksum must be '<algorithm> <base64 digest>'")
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(400, f"Unsupported checksum algorithm, use one of {', '.join(CHECKSUM_ALGORITHMS)}")
+    return algorithm, expected
+
+
+class ResumableUploads:
+    """On-disk store of in-progress uploads"""
+
+    def __init__(self, directory: str = 'uploads', max_bytes: int = 1024 ** 3, ttl_seconds: int = 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._locks: Dict[str, asyncio.Lock] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.json")
+
+    def data_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def create(self, length: int, filename: str = '', content_type: str = '') -> Dict:
+        if length <= 0:
+            raise UploadError(400, "Upload-Length must be a positive integer")
+        if length > self.max_bytes:
+            raise UploadError(413, f"Upload exceeds the maximum size of {self.max_bytes} bytes")
+
+        self.purge_expired()
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "id": upload_id,
+            "length": length,
+            "filename": filename,
+            "content_type": content_type,
+            "created_at": time.time(),
+        }
+        with open(self._meta_path(upload_id), 'w') as f:
+            json.dump(meta, f)
+        open(self.data_path(upload_id), 'wb').close()
+        return {**meta, "offset": 0}
+
+    def get(self, upload_id: str) -> Dict:
+        if not upload_id.isalnum():
+            raise UploadError(404, "Upload not found")
+        try:
+            with open(self._meta_path(upload_id)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise UploadError(404, "Upload not found")
+        meta["offset"] = os.path.getsize(self.data_path(upload_id))
+        return meta
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes],
+                     checksum_header: Optional[str] = None) -> int:
+        """Stream one PATCH body to disk at `offset`; returns the new offset"""
+        checksum = parse_checksum_header(checksum_header)
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        if lock.locked():
+            raise UploadError(423, "Another chunk for this upload is still being written")
+
+        async with lock:
+            meta = self.get(upload_id)
+            if offset != meta["offset"]:
+                raise UploadError(409, f"Upload-Offset mismatch, server has {meta['offset']} bytes")
+
+            digest = hashlib.new(checksum[0]) if checksum else None
+            written = 0
+            f = open(self.data_path(upload_id), 'r+b')
+            try:
+                f.seek(offset)
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if offset + written + len(chunk) > meta["length"]:
+                        raise UploadError(413, "Chunk goes past the declared Upload-Length")
+                    await run_in_threadpool(f.write, chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+                    written += len(chunk)
+
+                if digest is not None and digest.digest() != checksum[1]:
+                    raise UploadError(460, "Checksum mismatch, chunk discarded")
+            except BaseException as e:
+                # Without a checksum, bytes that arrived before a dropped connection are kept
+                # (as in tus) so the client resumes after them; a chunk that failed
+                # verification is discarded and resent from the same offset
+                if isinstance(e, UploadError) or checksum is not None:
+                    f.truncate(offset)
+                raise
+            finally:
+                f.close()
+
+            return offset + written
+
+    def is_complete(self, meta: Dict) -> bool:
+        return meta["offset"] == meta["length"]
+
+    def file_hash(self, upload_id: str, block_size: int = 1024 * 1024) -> str:
+        """SHA-256 of the assembled file, read in blocks"""
+        digest = hashlib.sha256()
+        with open(self.data_path(upload_id), 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def delete(self, upload_id: str):
+        self._locks.pop(upload_id, None)
+        for path in (self._meta_path(upload_id), self.data_path(upload_id)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def purge_expired(self):
+        """Remove uploads that were abandoned for longer than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            upload_id = name[:-len('.json')]
+            data_path = self.data_path(upload_id)
+            last_activity = os.path.getmtime(data_path) if os.path.exists(data_path) else 0
+            lock = self._locks.get(upload_id)
+            if last_activity < cutoff and not (lock and lock.locked()):
+                self.delete(upload_id)
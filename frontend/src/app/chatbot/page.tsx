@@ -3,7 +3,6 @@
 import { useState, useRef, useEffect } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import { Bot, Send, User, Sparkles } from 'lucide-react'
-import axios from 'axios'
 
 interface Message {
   id: number
@@ -23,7 +22,10 @@ export default function ChatbotPage() {
   ])
   const [input, setInput] = useState('')
   const [loading, setLoading] = useState(false)
+  const [streaming, setStreaming] = useState(false)
   const messagesEndRef = useRef<HTMLDivElement>(null)
+  // Conversation context lives on the server, keyed by this id
+  const sessionId = useRef<string | null>(null)
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' })
@@ -47,20 +49,53 @@ export default function ChatbotPage() {
     setInput('')
     setLoading(true)
 
+    const botId = messages.length + 2
+    const updateBot = (update: (message: Message) => Message) =>
+      setMessages(prev => prev.map(message => (message.id === botId ? update(message) : message)))
+
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
-      const response = await axios.post(`${apiUrl}/api/chat`, {
-        message: input
+      // Server-Sent Events over fetch: the reply is shown token by token as it is generated
+      const response = await fetch(`${apiUrl}/api/chat/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message: input, session_id: sessionId.current })
       })
-
-      const botMessage: Message = {
-        id: messages.length + 2,
-        text: response.data.response,
-        sender: 'bot',
-        timestamp: response.data.timestamp
+      if (!response.ok || !response.body) {
+        throw new Error(`Chat request failed (${response.status})`)
       }
 
-      setMessages(prev => [...prev, botMessage])
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let started = false
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const events = buffer.split('\n\n')
+        buffer = events.pop() || ''
+
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1]
+          const data = raw.match(/^data: (.*)$/m)?.[1]
+          if (!event || !data) continue
+          const payload = JSON.parse(data)
+
+          if (event === 'error') throw new Error(payload.detail)
+          if (!started) {
+            started = true
+            setStreaming(true)
+            setMessages(prev => [...prev, { id: botId, text: '', sender: 'bot', timestamp: '' }])
+          }
+          if (event === 'token') {
+            updateBot(message => ({ ...message, text: message.text + payload.text }))
+          } else if (event === 'done') {
+            sessionId.current = payload.session_id
+            updateBot(message => ({ ...message, text: payload.response, timestamp: payload.timestamp }))
+          }
+        }
+      }
     } catch (error) {
       const errorMessage: Message = {
         id: messages.length + 2,
@@ -68,9 +103,10 @@ export default function ChatbotPage() {
         sender: 'bot',
         timestamp: new Date().toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit' })
       }
-      setMessages(prev => [...prev, errorMessage])
+      setMessages(prev => [...prev.filter(message => message.id !== botId), errorMessage])
     } finally {
       setLoading(false)
+      setStreaming(false)
     }
   }
 
@@ -178,7 +214,7 @@ export default function ChatbotPage() {
               </AnimatePresence>
 
               {/* Loading Indicator */}
-              {loading && (
+              {loading && !streaming && (
                 <motion.div
                   initial={{ opacity: 0 }}
                   animate={{ opacity: 1 }}
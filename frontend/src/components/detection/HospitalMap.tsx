@@ -1,6 +1,6 @@
 'use client'
 
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { MapContainer, TileLayer, Marker, Popup } from 'react-leaflet'
 import { ExternalLink, Phone, Navigation } from 'lucide-react'
 import axios from 'axios'
@@ -29,6 +29,7 @@ export default function HospitalMap() {
   const [hospitals, setHospitals] = useState<Hospital[]>([])
   const [loading, setLoading] = useState(true)
   const [userLocation, setUserLocation] = useState<[number, number]>([28.6139, 77.2090])
+  const lastQuery = useRef<string | null>(null)
 
   useEffect(() => {
     // Get user location
@@ -49,11 +50,17 @@ export default function HospitalMap() {
   }, [])
 
   const fetchHospitals = async (lat: number, lon: number) => {
+    // ~11 m precision: repeated fixes of the same spot share one URL, so the browser
+    // reuses the cached response (Cache-Control) or revalidates it by ETag
+    const query = `lat=${lat.toFixed(4)}&lon=${lon.toFixed(4)}`
+    if (query === lastQuery.current) return
+    lastQuery.current = query
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
-      const response = await axios.get(`${apiUrl}/api/hospitals?lat=${lat}&lon=${lon}`)
+      const response = await axios.get(`${apiUrl}/api/hospitals?${query}`)
       setHospitals(response.data.hospitals)
     } catch (error) {
+      lastQuery.current = null
       console.error('Error fetching hospitals:', error)
     } finally {
       setLoading(false)